@@ -1,6 +1,7 @@
-import base64
 import datetime
 import hashlib
+import json
+import math
 import mimetypes
 import os
 import re
@@ -12,8 +13,9 @@ import random
 import traceback
 from pathlib import Path
 from urllib.parse import urlparse, quote, unquote
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 import pytz
 import yaml
 
@@ -33,18 +35,21 @@ from app.schemas.types import EventType
 from app.schemas import ServiceInfo
 from app.utils.http import RequestUtils
 from app.utils.url import UrlUtils
-from app.plugins.mediacovergeneratorashan.style.style_static_1 import create_style_static_1
-from app.plugins.mediacovergeneratorashan.style.style_static_2 import create_style_static_2
-from app.plugins.mediacovergeneratorashan.style.style_static_3  import create_style_static_3
-from app.plugins.mediacovergeneratorashan.style.style_static_4 import create_style_static_4
-from app.plugins.mediacovergeneratorashan.style.style_animated_1 import create_style_animated_1
-from app.plugins.mediacovergeneratorashan.style.style_animated_2 import create_style_animated_2
-from app.plugins.mediacovergeneratorashan.style.style_animated_3 import create_style_animated_3
-from app.plugins.mediacovergeneratorashan.style.style_animated_4 import create_style_animated_4
 from app.plugins.mediacovergeneratorashan.utils.image_manager import ResolutionConfig, ImageResourceManager
 from app.plugins.mediacovergeneratorashan.utils.network_helper import NetworkHelper, validate_font_file
 from app.plugins.mediacovergeneratorashan.utils.performance_helper import PerformanceMonitor, ProgressTracker, memory_efficient_operation
 from app.plugins.mediacovergeneratorashan.utils.color_helper import ColorHelper
+from app.plugins.mediacovergeneratorashan.utils.concurrency_helper import LibraryJob, KeyedLocks, CoalescingQueue, \
+    SharedRenderRegistry, AnyEvent
+from app.plugins.mediacovergeneratorashan.utils.job_manager import CoverJob, CoverJobManager
+from app.plugins.mediacovergeneratorashan.utils.server_health import ServerHealthTracker, CircuitOpenError
+from app.plugins.mediacovergeneratorashan.utils.render_backend import RenderBackend, RenderResult
+from app.plugins.mediacovergeneratorashan.utils.animation_encoder import probe_ffmpeg, resolve_encoder
+from app.plugins.mediacovergeneratorashan.utils.frame_parallel import shutdown_frame_executor
+from app.plugins.mediacovergeneratorashan.utils.pipeline_helper import StagedPipeline, PipelineStage
+from app.plugins.mediacovergeneratorashan.utils.http_pool import MediaServerSessionPool, iter_json_array
+from app.plugins.mediacovergeneratorashan.utils.poster_cache import PosterCache
+from app.plugins.mediacovergeneratorashan.utils.library_index import LibraryCache
 
 
 class MediaCoverGeneratorAshan(_PluginBase):
@@ -84,8 +89,6 @@ class MediaCoverGeneratorAshan(_PluginBase):
     _all_libraries = []
     _include_libraries = []
     _sort_by = 'Random'
-    _monitor_sort = ''
-    _current_updating_items = set()
     _covers_output = ''
     _covers_input = ''
     _zh_font_url = ''
@@ -106,7 +109,6 @@ class MediaCoverGeneratorAshan(_PluginBase):
     _blur_size = 50
     _color_ratio = 0.8
     _use_primary = False
-    _seen_keys = set()
     _zh_font_custom = ''
     _en_font_custom = ''
     _zh_font_preset = 'chaohei'
@@ -125,6 +127,10 @@ class MediaCoverGeneratorAshan(_PluginBase):
     _animation_format = 'apng'
     _animation_resolution = '320x180'
     _animation_reduce_colors = 'medium'
+    _animation_export_mode = 'pipe'
+    _animation_encoder = 'auto'
+    # 按 ffmpeg 探测结果解析出的实际编码器
+    _animation_encoder_backend = 'ffmpeg'
     _animated_2_image_count = 6
     _animated_2_departure_type = 'fly'
     _style_naming_v2 = True
@@ -135,9 +141,68 @@ class MediaCoverGeneratorAshan(_PluginBase):
     _covers_history_limit_per_library = 10
     _covers_page_history_limit = 50
     _page_tab = "generate-tab"
+    _library_workers = 2
+    _fetch_workers = 2
+    _download_workers = 3
+    _upload_workers = 2
+    _pipeline_queue_size = 2
+    _server_concurrency = 3
+    _server_health = None
+    _circuit_failure_threshold = 5
+    _circuit_cooldown = 60
+    _render_backend_mode = 'thread'
+    _render_processes = 2
+    _render_timeout = 600
+    _animation_frame_workers = 1
+    _frame_workers = 1
+    _render_backend = None
+    _transfer_queue = None
+    _skip_unchanged = True
+    _verify_server_image_tag = True
+    _share_mirrored_renders = True
+    # 下载图片时请求服务器缩放：画布宽度倍数、宽度上下限与 JPEG 质量
+    IMAGE_FETCH_HEADROOM = 1.5
+    IMAGE_FETCH_MIN_WIDTH = 400
+    IMAGE_FETCH_MAX_WIDTH = 3840
+    IMAGE_FETCH_QUALITY = 90
+    _connect_timeout = 5
+    _read_timeout = 30
+    _session_pool = None
+    _poster_cache_size = 512
+    _poster_cache = None
+    # 最近一次批量更新的计数与各阶段耗时，供基准测试读取
+    _last_run_stats = None
+    # 增量查询缓存的媒体项字段与有效期（秒），过期后全量扫描一次
+    SELECTION_CACHE_FIELDS = (
+        "Id", "Name", "Type", "DateCreated", "SeriesId", "AlbumId",
+        "ImageTags", "BackdropImageTags", "PrimaryImageTag", "PrimaryImageItemId",
+        "AlbumPrimaryImageTag", "SeriesPrimaryImageTag",
+        "ParentBackdropItemId", "ParentBackdropImageTags", "ProviderIds",
+    )
+    SELECTION_CACHE_TTL = 24 * 3600
+    # 媒体项分页：首页大小、页大小上下限、估算页大小时的最低有效率与单库扫描上限
+    ITEM_PAGE_INITIAL = 50
+    ITEM_PAGE_MIN = 20
+    ITEM_PAGE_MAX = 200
+    ITEM_PAGE_MIN_HIT_RATE = 0.05
+    ITEM_SCAN_LIMIT = 1000
+    # 媒体库列表缓存有效期（秒）
+    LIBRARY_CACHE_TTL = 300
 
     def __init__(self):
         super().__init__()
+        # 运行期共享状态，按实例持有并加锁，避免并发任务互相干扰
+        self._current_updating_items = set()
+        self._updating_items_lock = threading.Lock()
+        self._history_lock = threading.Lock()
+        self._fingerprint_lock = threading.Lock()
+        self._selection_lock = threading.Lock()
+        self._library_cache = LibraryCache(self.LIBRARY_CACHE_TTL)
+        self._history_executor = None
+        self._history_executor_lock = threading.Lock()
+        # 立即生成任务在后台排队执行，任务记录在插件重新初始化后保留
+        self._job_manager = CoverJobManager(self.__run_cover_job)
+        self._library_dir_locks = KeyedLocks()
 
     def __format_log_context(self, **kwargs) -> str:
         parts: List[str] = []
@@ -268,12 +333,61 @@ class MediaCoverGeneratorAshan(_PluginBase):
                 self._animation_reduce_colors = animation_reduce_colors
             else:
                 self._animation_reduce_colors = "medium"
+            self._animation_export_mode = config.get("animation_export_mode", "pipe")
+            if self._animation_export_mode not in ["pipe", "bmp"]:
+                self._animation_export_mode = "pipe"
+            self._animation_encoder = config.get("animation_encoder", "auto")
+            if self._animation_encoder not in ["auto", "ffmpeg", "native"]:
+                self._animation_encoder = "auto"
 
             self._animated_2_image_count = config.get("animated_2_image_count", 6)
             self._animated_2_departure_type = config.get("animated_2_departure_type", "fly")
             self._clean_images = config.get("clean_images", False)
             self._clean_fonts = config.get("clean_fonts", False)
             self._save_recent_covers = config.get("save_recent_covers", True)
+            self._skip_unchanged = config.get("skip_unchanged", True)
+            self._verify_server_image_tag = config.get("verify_server_image_tag", True)
+            self._share_mirrored_renders = config.get("share_mirrored_renders", True)
+            self._connect_timeout = self.__clamp_value(
+                config.get("connect_timeout", 5),
+                1,
+                60,
+                5,
+                "connect_timeout[init_plugin]",
+                int,
+            )
+            self._poster_cache_size = self.__clamp_value(
+                config.get("poster_cache_size", 512),
+                0,
+                102400,
+                512,
+                "poster_cache_size[init_plugin]",
+                int,
+            )
+            self._read_timeout = self.__clamp_value(
+                config.get("read_timeout", 30),
+                5,
+                600,
+                30,
+                "read_timeout[init_plugin]",
+                int,
+            )
+            self._circuit_failure_threshold = self.__clamp_value(
+                config.get("circuit_failure_threshold", 5),
+                1,
+                100,
+                5,
+                "circuit_failure_threshold[init_plugin]",
+                int,
+            )
+            self._circuit_cooldown = self.__clamp_value(
+                config.get("circuit_cooldown", 60),
+                5,
+                3600,
+                60,
+                "circuit_cooldown[init_plugin]",
+                int,
+            )
             self._covers_history_limit_per_library = self.__clamp_value(
                 config.get("covers_history_limit_per_library", 10),
                 1,
@@ -291,6 +405,81 @@ class MediaCoverGeneratorAshan(_PluginBase):
                 int,
             )
             self._page_tab = config.get("page_tab", "generate-tab")
+            self._library_workers = self.__clamp_value(
+                config.get("library_workers", 2),
+                1,
+                16,
+                2,
+                "library_workers[init_plugin]",
+                int,
+            )
+            self._fetch_workers = self.__clamp_value(
+                config.get("fetch_workers", 2),
+                1,
+                16,
+                2,
+                "fetch_workers[init_plugin]",
+                int,
+            )
+            self._download_workers = self.__clamp_value(
+                config.get("download_workers", 3),
+                1,
+                16,
+                3,
+                "download_workers[init_plugin]",
+                int,
+            )
+            self._upload_workers = self.__clamp_value(
+                config.get("upload_workers", 2),
+                1,
+                16,
+                2,
+                "upload_workers[init_plugin]",
+                int,
+            )
+            self._pipeline_queue_size = self.__clamp_value(
+                config.get("pipeline_queue_size", 2),
+                1,
+                64,
+                2,
+                "pipeline_queue_size[init_plugin]",
+                int,
+            )
+            self._server_concurrency = self.__clamp_value(
+                config.get("server_concurrency", 3),
+                1,
+                16,
+                3,
+                "server_concurrency[init_plugin]",
+                int,
+            )
+            self._render_backend_mode = config.get("render_backend", "thread")
+            if self._render_backend_mode not in ["thread", "process"]:
+                self._render_backend_mode = "thread"
+            self._render_processes = self.__clamp_value(
+                config.get("render_processes", 2),
+                1,
+                32,
+                2,
+                "render_processes[init_plugin]",
+                int,
+            )
+            self._render_timeout = self.__clamp_value(
+                config.get("render_timeout", 600),
+                30,
+                3600,
+                600,
+                "render_timeout[init_plugin]",
+                int,
+            )
+            self._animation_frame_workers = self.__clamp_value(
+                config.get("animation_frame_workers", 1),
+                1,
+                32,
+                1,
+                "animation_frame_workers[init_plugin]",
+                int,
+            )
 
             if self._resolution not in ["1080p", "720p", "480p"]:
                 self._resolution = "480p"
@@ -311,6 +500,13 @@ class MediaCoverGeneratorAshan(_PluginBase):
         self._bg_color_mode = (config or {}).get("bg_color_mode", "auto")
         self._custom_bg_color = (config or {}).get("custom_bg_color", "")
 
+        # 单服务器健康度跟踪：自适应并发上限与熔断
+        self._server_health = ServerHealthTracker(
+            limit=self._server_concurrency,
+            failure_threshold=self._circuit_failure_threshold,
+            cooldown=self._circuit_cooldown,
+        )
+
         # 初始化分辨率配置（确保安全初始化）
         try:
             self._resolution_config = ResolutionConfig(self._resolution)
@@ -318,6 +514,8 @@ class MediaCoverGeneratorAshan(_PluginBase):
             logger.warning(f"分辨率配置初始化失败，使用默认配置: {e}")
             self._resolution_config = ResolutionConfig("480p")
 
+        # 服务器配置可能已变化，重新获取媒体库列表
+        self._library_cache.invalidate()
         if self._selected_servers:
             self._servers = self.mediaserver_helper.get_services(
                 name_filters=self._selected_servers
@@ -334,6 +532,44 @@ class MediaCoverGeneratorAshan(_PluginBase):
         # 停止现有任务
         self.stop_service()
 
+        # 媒体服务器长连接会话，连接数与单服务器请求上限一致
+        self._session_pool = MediaServerSessionPool(
+            pool_size=self._server_concurrency,
+            connect_timeout=self._connect_timeout,
+            read_timeout=self._read_timeout,
+        )
+
+        # 海报缓存
+        if self._poster_cache_size:
+            try:
+                self._poster_cache = PosterCache(data_path / 'poster_cache', self._poster_cache_size * 1024 * 1024)
+            except Exception as e:
+                logger.warning(f"初始化海报缓存失败，将直接下载: {e}")
+                self._poster_cache = None
+
+        # 动图编码器：探测一次 ffmpeg，auto 时据此选择
+        if self._animation_encoder != "native":
+            ffmpeg_ok = probe_ffmpeg()
+            logger.info(f"ffmpeg 探测结果: {'可用' if ffmpeg_ok else '不可用'}")
+        self._animation_encoder_backend = resolve_encoder(self._animation_encoder)
+        logger.info(f"动图编码器: {self._animation_encoder_backend}")
+
+        # 渲染后端（进程内或独立进程池）
+        _, _, zh_preset_paths, en_preset_paths = self.__get_font_presets()
+        self._render_backend = RenderBackend(
+            mode=self._render_backend_mode,
+            processes=self._render_processes,
+            timeout=self._render_timeout,
+            font_paths=tuple(p for p in list(zh_preset_paths.values()) + list(en_preset_paths.values()) if p),
+        )
+        # 独立渲染进程中动图逐帧渲染，总进程数只由渲染进程数决定；进程内渲染时帧进程数不超过 CPU 核数
+        if self._render_backend_mode == "process":
+            self._frame_workers = 1
+            if self._animation_frame_workers > 1:
+                logger.info("独立渲染进程池模式下动图在渲染进程内逐帧渲染，动图帧渲染进程数不生效")
+        else:
+            self._frame_workers = min(self._animation_frame_workers, os.cpu_count() or 1)
+
         cleanup_triggered = False
         if self._clean_images:
             self.__clean_generated_images()
@@ -403,13 +639,14 @@ class MediaCoverGeneratorAshan(_PluginBase):
             return cover_style, "static"
         return "static_1", "static"
 
-    def __is_single_image_style(self) -> bool:
-        return self._cover_style in ["static_1", "static_2", "static_4"]
+    @staticmethod
+    def __is_single_image_style(style: str) -> bool:
+        return style in ["static_1", "static_2", "static_4"]
 
-    def __get_required_items(self) -> int:
-        if self._cover_style in ["static_3", "animated_3"]:
+    def __get_required_items(self, style: str) -> int:
+        if style in ["static_3", "animated_3"]:
             return 9
-        if self._cover_style in ["animated_1", "animated_2", "animated_4"]:
+        if style in ["animated_1", "animated_2", "animated_4"]:
             return self.__get_animated_2_required_items()
         return 1
 
@@ -469,6 +706,8 @@ class MediaCoverGeneratorAshan(_PluginBase):
             "animation_format": self._animation_format,
             "animation_resolution": self._animation_resolution,
             "animation_reduce_colors": self._animation_reduce_colors,
+            "animation_export_mode": self._animation_export_mode,
+            "animation_encoder": self._animation_encoder,
             "animated_2_image_count": self._animated_2_image_count,
             "animated_2_departure_type": self._animated_2_departure_type,
             "bg_color_mode": self._bg_color_mode,
@@ -476,9 +715,27 @@ class MediaCoverGeneratorAshan(_PluginBase):
             "clean_images": self._clean_images,
             "clean_fonts": self._clean_fonts,
             "save_recent_covers": self._save_recent_covers,
+            "skip_unchanged": self._skip_unchanged,
+            "verify_server_image_tag": self._verify_server_image_tag,
+            "share_mirrored_renders": self._share_mirrored_renders,
+            "connect_timeout": self._connect_timeout,
+            "read_timeout": self._read_timeout,
+            "circuit_failure_threshold": self._circuit_failure_threshold,
+            "circuit_cooldown": self._circuit_cooldown,
+            "poster_cache_size": self._poster_cache_size,
             "covers_history_limit_per_library": self._covers_history_limit_per_library,
             "covers_page_history_limit": self._covers_page_history_limit,
             "page_tab": self._page_tab,
+            "library_workers": self._library_workers,
+            "fetch_workers": self._fetch_workers,
+            "download_workers": self._download_workers,
+            "upload_workers": self._upload_workers,
+            "pipeline_queue_size": self._pipeline_queue_size,
+            "server_concurrency": self._server_concurrency,
+            "render_backend": self._render_backend_mode,
+            "render_processes": self._render_processes,
+            "animation_frame_workers": self._animation_frame_workers,
+            "render_timeout": self._render_timeout,
             "style_naming_v2": True,
         })
 
@@ -604,6 +861,8 @@ class MediaCoverGeneratorAshan(_PluginBase):
                         removed += 1
                 except Exception as e:
                     logger.warning(f"清理图片失败 {entry}: {e}")
+        if self._poster_cache:
+            self._poster_cache.clear()
         logger.info(f"清理图片完成（含旧版 covers 兼容目录），共清理 {removed} 项")
 
     def __clean_downloaded_fonts(self):
@@ -706,6 +965,48 @@ class MediaCoverGeneratorAshan(_PluginBase):
                 "methods": ["POST", "GET"],
                 "summary": "立即生成媒体库封面(兼容无前导斜杠)",
             },
+            {
+                "path": "/generate_jobs",
+                "endpoint": self.api_generate_jobs,
+                "auth": "bear",
+                "methods": ["GET"],
+                "summary": "最近的立即生成任务",
+            },
+            {
+                "path": "generate_jobs",
+                "endpoint": self.api_generate_jobs,
+                "auth": "bear",
+                "methods": ["GET"],
+                "summary": "最近的立即生成任务(兼容无前导斜杠)",
+            },
+            {
+                "path": "/generate_job",
+                "endpoint": self.api_generate_job,
+                "auth": "bear",
+                "methods": ["GET"],
+                "summary": "查询立即生成任务进度",
+            },
+            {
+                "path": "generate_job",
+                "endpoint": self.api_generate_job,
+                "auth": "bear",
+                "methods": ["GET"],
+                "summary": "查询立即生成任务进度(兼容无前导斜杠)",
+            },
+            {
+                "path": "/cancel_generate_job",
+                "endpoint": self.api_cancel_generate_job,
+                "auth": "bear",
+                "methods": ["POST", "GET"],
+                "summary": "取消立即生成任务",
+            },
+            {
+                "path": "cancel_generate_job",
+                "endpoint": self.api_cancel_generate_job,
+                "auth": "bear",
+                "methods": ["POST", "GET"],
+                "summary": "取消立即生成任务(兼容无前导斜杠)",
+            },
             {
                 "path": "/set_cover_style",
                 "endpoint": self.api_set_cover_style,
@@ -776,8 +1077,10 @@ class MediaCoverGeneratorAshan(_PluginBase):
             logger.error(f"【MediaCoverGeneratorAshan】删除封面文件失败: {e}", exc_info=True)
             return {"code": 1, "msg": f"封面文件删除失败: {e}"}
 
-    def api_generate_now(self, style: str = ""):
-        old_style = self._cover_style
+    def api_generate_now(self, style: str = "", libraries: Any = None):
+        """
+        提交立即生成任务并立即返回任务 ID；libraries 为 "服务器-媒体库ID" 或媒体库名称（逗号分隔或列表），为空时更新全部
+        """
         try:
             if not self._enabled:
                 logger.warning("【MediaCoverGeneratorAshan】立即生成失败：插件未启用，请先在设置页启用插件并保存")
@@ -794,18 +1097,74 @@ class MediaCoverGeneratorAshan(_PluginBase):
                 "static_1", "static_2", "static_3", "static_4",
                 "animated_1", "animated_2", "animated_3", "animated_4",
             }
-            if target_style:
-                if target_style not in allowed_styles:
-                    return {"code": 1, "msg": f"不支持的风格: {target_style}"}
-                self._cover_style = target_style
-            logger.info(f"【MediaCoverGeneratorAshan】收到立即生成请求，风格: {self._cover_style}")
-            tips = self.__update_all_libraries()
-            return {"code": 0, "msg": tips or "封面生成任务已完成"}
+            if target_style and target_style not in allowed_styles:
+                return {"code": 1, "msg": f"不支持的风格: {target_style}"}
+            library_keys, unknown = self.__resolve_library_keys(libraries)
+            if unknown:
+                return {"code": 1, "msg": f"未找到媒体库: {'、'.join(unknown)}"}
+            job = self._job_manager.submit(library_keys, target_style)
+            running = self._job_manager.running()
+            logger.info(f"【MediaCoverGeneratorAshan】收到立即生成请求，任务 {job.id}，"
+                        f"风格: {target_style or self._cover_style}，"
+                        f"媒体库: {'、'.join(library_keys) if library_keys else '全部'}")
+            msg = f"封面生成任务已提交，任务 ID {job.id}"
+            if running and running is not job:
+                msg += f"，将在任务 {running.id} 完成后开始"
+            return {"code": 0, "msg": msg, "data": job.to_dict()}
         except Exception as e:
             logger.error(f"【MediaCoverGeneratorAshan】立即生成失败: {e}", exc_info=True)
             return {"code": 1, "msg": f"封面生成失败: {e}"}
-        finally:
-            self._cover_style = old_style
+
+    def api_generate_jobs(self):
+        """最近的立即生成任务"""
+        return {"code": 0, "data": [job.to_dict() for job in self._job_manager.list()]}
+
+    def api_generate_job(self, job_id: str = ""):
+        """查询立即生成任务的进度"""
+        job = self._job_manager.get((job_id or "").strip())
+        if not job:
+            return {"code": 1, "msg": f"任务不存在: {job_id}"}
+        return {"code": 0, "data": job.to_dict()}
+
+    def api_cancel_generate_job(self, job_id: str = ""):
+        """取消排队中的任务，运行中的任务在各媒体库当前阶段结束后停止"""
+        job = self._job_manager.cancel((job_id or "").strip())
+        if not job:
+            return {"code": 1, "msg": f"任务不存在: {job_id}"}
+        if job.status == CoverJob.CANCELLED:
+            return {"code": 0, "msg": f"任务 {job.id} 已取消", "data": job.to_dict()}
+        if job.finished:
+            return {"code": 1, "msg": f"任务 {job.id} 已结束", "data": job.to_dict()}
+        logger.info(f"【MediaCoverGeneratorAshan】正在取消封面生成任务 {job.id}")
+        return {"code": 0, "msg": f"任务 {job.id} 正在取消", "data": job.to_dict()}
+
+    def __resolve_library_keys(self, libraries: Any) -> Tuple[Optional[List[str]], List[str]]:
+        """
+        将媒体库参数解析为 "服务器-媒体库ID" 列表，支持直接传 ID 键、"服务器: 名称" 或仅名称；
+        返回 (键列表，未匹配项)，参数为空时键列表为 None
+        """
+        if not libraries:
+            return None, []
+        if isinstance(libraries, str):
+            libraries = re.split(r"[,，]", libraries)
+        names = [str(part).strip() for part in libraries if str(part).strip()]
+        if not names:
+            return None, []
+        keys, unknown = [], []
+        for name in names:
+            matched = [
+                lib["value"] for lib in self._all_libraries or []
+                if name in (lib["value"], lib["name"]) or lib["name"].split(": ", 1)[-1] == name
+            ]
+            if matched:
+                keys.extend(key for key in matched if key not in keys)
+            else:
+                unknown.append(name)
+        return keys, unknown
+
+    def __run_cover_job(self, job: CoverJob) -> Optional[str]:
+        """在任务线程中执行立即生成，指定风格只在本次任务内生效"""
+        return self.__update_all_libraries(libraries=job.libraries, cover_job=job)
 
     def api_set_cover_style(self, style: str = ""):
         try:
@@ -1068,16 +1427,382 @@ class MediaCoverGeneratorAshan(_PluginBase):
                         'component': 'VCol',
                         'props': {
                             'cols': 12,
-                            'md': 4
+                            'md': 4
+                        },
+                        'content': [
+                            {
+                                'component': 'VTextField',
+                                'props': {
+                                    'model': 'covers_history_limit_per_library',
+                                    'label': '媒体库历史封面数量',
+                                    'prependInnerIcon': 'mdi-history',
+                                    'hint': '单个媒体库封面保留上限，默认 10',
+                                    'persistentHint': True
+                                }
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VCol',
+                        'props': {
+                            'cols': 12,
+                            'md': 4
+                        },
+                        'content': [
+                            {
+                                'component': 'VTextField',
+                                'props': {
+                                    'model': 'covers_page_history_limit',
+                                    'label': '历史封面显示数量',
+                                    'prependInnerIcon': 'mdi-image-multiple-outline',
+                                    'hint': '历史封面「显示数量」，默认 50',
+                                    'persistentHint': True
+                                },
+                            }
+                        ]
+                    }
+                ]
+            },
+            {
+                'component': 'VRow',
+                'content': [
+                    {
+                        'component': 'VCol',
+                        'props': {
+                            'cols': 12,
+                            'md': 4
+                        },
+                        'content': [
+                            {
+                                'component': 'VTextField',
+                                'props': {
+                                    'model': 'library_workers',
+                                    'label': '并发渲染媒体库数',
+                                    'type': 'number',
+                                    'prependInnerIcon': 'mdi-layers-triple-outline',
+                                    'hint': '渲染阶段同时处理的媒体库数量，默认 2',
+                                    'persistentHint': True
+                                }
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VCol',
+                        'props': {
+                            'cols': 12,
+                            'md': 4
+                        },
+                        'content': [
+                            {
+                                'component': 'VTextField',
+                                'props': {
+                                    'model': 'server_concurrency',
+                                    'label': '单服务器并发请求数',
+                                    'type': 'number',
+                                    'prependInnerIcon': 'mdi-server-network',
+                                    'hint': '单台媒体服务器同时处理的请求上限，服务器变慢或出错时自动下调，默认 3',
+                                    'persistentHint': True
+                                }
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VCol',
+                        'props': {
+                            'cols': 12,
+                            'md': 4
+                        },
+                        'content': [
+                            {
+                                'component': 'VSelect',
+                                'props': {
+                                    'model': 'render_backend',
+                                    'label': '渲染方式',
+                                    'items': [
+                                        {'title': '插件进程内渲染', 'value': 'thread'},
+                                        {'title': '独立渲染进程池', 'value': 'process'}
+                                    ],
+                                    'prependInnerIcon': 'mdi-cpu-64-bit',
+                                    'hint': '进程池可利用多核，渲染卡死或崩溃不影响主程序',
+                                    'persistentHint': True
+                                }
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VCol',
+                        'props': {
+                            'cols': 12,
+                            'md': 4
+                        },
+                        'content': [
+                            {
+                                'component': 'VTextField',
+                                'props': {
+                                    'model': 'render_processes',
+                                    'label': '渲染进程数',
+                                    'type': 'number',
+                                    'prependInnerIcon': 'mdi-chip',
+                                    'hint': '仅独立渲染进程池模式生效，默认 2',
+                                    'persistentHint': True
+                                }
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VCol',
+                        'props': {
+                            'cols': 12,
+                            'md': 4
+                        },
+                        'content': [
+                            {
+                                'component': 'VTextField',
+                                'props': {
+                                    'model': 'render_timeout',
+                                    'label': '单次渲染超时（秒）',
+                                    'type': 'number',
+                                    'prependInnerIcon': 'mdi-timer-sand',
+                                    'hint': '超时的渲染进程会被终止，默认 600',
+                                    'persistentHint': True
+                                }
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VCol',
+                        'props': {
+                            'cols': 12,
+                            'md': 4
+                        },
+                        'content': [
+                            {
+                                'component': 'VTextField',
+                                'props': {
+                                    'model': 'animation_frame_workers',
+                                    'label': '动图帧渲染进程数',
+                                    'type': 'number',
+                                    'prependInnerIcon': 'mdi-animation-play-outline',
+                                    'hint': '仅进程内渲染模式生效，动态封面按帧区间分给多个进程并行渲染，1 为不并行；不超过 CPU 核数',
+                                    'persistentHint': True
+                                }
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VCol',
+                        'props': {
+                            'cols': 12,
+                            'md': 4
+                        },
+                        'content': [
+                            {
+                                'component': 'VSwitch',
+                                'props': {
+                                    'model': 'skip_unchanged',
+                                    'label': '跳过未变化的媒体库',
+                                    'hint': '所选媒体项、风格参数、标题、字体与分辨率均未变化时不重新生成上传',
+                                    'persistentHint': True
+                                }
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VCol',
+                        'props': {
+                            'cols': 12,
+                            'md': 4
+                        },
+                        'content': [
+                            {
+                                'component': 'VSwitch',
+                                'props': {
+                                    'model': 'verify_server_image_tag',
+                                    'label': '校验服务器封面',
+                                    'hint': '封面内容与上次上传相同时，再确认服务器上的封面未被改动才跳过上传',
+                                    'persistentHint': True
+                                }
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VCol',
+                        'props': {
+                            'cols': 12,
+                            'md': 4
+                        },
+                        'content': [
+                            {
+                                'component': 'VSwitch',
+                                'props': {
+                                    'model': 'share_mirrored_renders',
+                                    'label': '镜像媒体库共享封面',
+                                    'hint': '多台服务器上标题、风格与所选影片（按 TMDB/IMDB 等 ID 比对）相同的媒体库只渲染一次',
+                                    'persistentHint': True
+                                }
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VCol',
+                        'props': {
+                            'cols': 12,
+                            'md': 4
+                        },
+                        'content': [
+                            {
+                                'component': 'VTextField',
+                                'props': {
+                                    'model': 'connect_timeout',
+                                    'label': '连接超时（秒）',
+                                    'type': 'number',
+                                    'prependInnerIcon': 'mdi-lan-connect',
+                                    'hint': '与媒体服务器建立连接的超时时间，默认 5',
+                                    'persistentHint': True
+                                }
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VCol',
+                        'props': {
+                            'cols': 12,
+                            'md': 4
+                        },
+                        'content': [
+                            {
+                                'component': 'VTextField',
+                                'props': {
+                                    'model': 'read_timeout',
+                                    'label': '读取超时（秒）',
+                                    'type': 'number',
+                                    'prependInnerIcon': 'mdi-timer-outline',
+                                    'hint': '单次请求等待响应的超时时间，默认 30',
+                                    'persistentHint': True
+                                }
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VCol',
+                        'props': {
+                            'cols': 12,
+                            'md': 4
+                        },
+                        'content': [
+                            {
+                                'component': 'VTextField',
+                                'props': {
+                                    'model': 'circuit_failure_threshold',
+                                    'label': '熔断失败次数',
+                                    'type': 'number',
+                                    'prependInnerIcon': 'mdi-flash-alert-outline',
+                                    'hint': '单台服务器连续失败达到该次数后暂停请求，并跳过其剩余媒体库，默认 5',
+                                    'persistentHint': True
+                                }
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VCol',
+                        'props': {
+                            'cols': 12,
+                            'md': 4
+                        },
+                        'content': [
+                            {
+                                'component': 'VTextField',
+                                'props': {
+                                    'model': 'circuit_cooldown',
+                                    'label': '熔断冷却（秒）',
+                                    'type': 'number',
+                                    'prependInnerIcon': 'mdi-timer-sand',
+                                    'hint': '熔断后等待多久再放行探测请求，探测成功即恢复，默认 60',
+                                    'persistentHint': True
+                                }
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VCol',
+                        'props': {
+                            'cols': 12,
+                            'md': 4
+                        },
+                        'content': [
+                            {
+                                'component': 'VTextField',
+                                'props': {
+                                    'model': 'poster_cache_size',
+                                    'label': '海报缓存上限（MB）',
+                                    'type': 'number',
+                                    'prependInnerIcon': 'mdi-harddisk',
+                                    'hint': '按图片 tag 缓存下载过的海报，0 为不缓存，默认 512',
+                                    'persistentHint': True
+                                }
+                            }
+                        ]
+                    },
+                ]
+            },
+            {
+                'component': 'VRow',
+                'content': [
+                    {
+                        'component': 'VCol',
+                        'props': {
+                            'cols': 12,
+                            'md': 3
+                        },
+                        'content': [
+                            {
+                                'component': 'VTextField',
+                                'props': {
+                                    'model': 'fetch_workers',
+                                    'label': '查询并发数',
+                                    'type': 'number',
+                                    'prependInnerIcon': 'mdi-database-search-outline',
+                                    'hint': '流水线查询媒体项阶段的线程数，默认 2',
+                                    'persistentHint': True
+                                }
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VCol',
+                        'props': {
+                            'cols': 12,
+                            'md': 3
+                        },
+                        'content': [
+                            {
+                                'component': 'VTextField',
+                                'props': {
+                                    'model': 'download_workers',
+                                    'label': '下载并发数',
+                                    'type': 'number',
+                                    'prependInnerIcon': 'mdi-download-multiple',
+                                    'hint': '流水线下载海报阶段的线程数，默认 3',
+                                    'persistentHint': True
+                                }
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VCol',
+                        'props': {
+                            'cols': 12,
+                            'md': 3
                         },
                         'content': [
                             {
                                 'component': 'VTextField',
                                 'props': {
-                                    'model': 'covers_history_limit_per_library',
-                                    'label': '媒体库历史封面数量',
-                                    'prependInnerIcon': 'mdi-history',
-                                    'hint': '单个媒体库封面保留上限，默认 10',
+                                    'model': 'upload_workers',
+                                    'label': '上传并发数',
+                                    'type': 'number',
+                                    'prependInnerIcon': 'mdi-upload-multiple',
+                                    'hint': '流水线上传封面阶段的线程数，默认 2',
                                     'persistentHint': True
                                 }
                             }
@@ -1087,24 +1812,24 @@ class MediaCoverGeneratorAshan(_PluginBase):
                         'component': 'VCol',
                         'props': {
                             'cols': 12,
-                            'md': 4
+                            'md': 3
                         },
                         'content': [
                             {
                                 'component': 'VTextField',
                                 'props': {
-                                    'model': 'covers_page_history_limit',
-                                    'label': '历史封面显示数量',
-                                    'prependInnerIcon': 'mdi-image-multiple-outline',
-                                    'hint': '历史封面「显示数量」，默认 50',
+                                    'model': 'pipeline_queue_size',
+                                    'label': '阶段队列深度',
+                                    'type': 'number',
+                                    'prependInnerIcon': 'mdi-tray-full',
+                                    'hint': '相邻阶段之间最多排队的媒体库数，默认 2',
                                     'persistentHint': True
-                                },
+                                }
                             }
                         ]
-                    }
+                    },
                 ]
             },
-            
         ]
         # 更多参数标签
         single_tab = [
@@ -1890,6 +2615,53 @@ class MediaCoverGeneratorAshan(_PluginBase):
                                             }
                                         ]
                                     },
+                                    {
+                                        'component': 'VRow',
+                                        'props': {'class': 'mt-2'},
+                                        'content': [
+                                            {
+                                                'component': 'VCol',
+                                                'props': {'cols': 12, 'md': 4},
+                                                'content': [
+                                                    {
+                                                        'component': 'VSelect',
+                                                        'props': {
+                                                            'model': 'animation_export_mode',
+                                                            'label': '动图导出方式',
+                                                            'hint': '仅 ffmpeg 编码器有效。管道：边渲染边编码，不写临时帧文件；BMP：先写出全部帧再编码，用于排查问题',
+                                                            'persistentHint': True,
+                                                            'items': [
+                                                                {'title': '管道直传', 'value': 'pipe'},
+                                                                {'title': 'BMP 临时文件', 'value': 'bmp'}
+                                                            ],
+                                                            'prependInnerIcon': 'mdi-pipe'
+                                                        }
+                                                    }
+                                                ]
+                                            },
+                                            {
+                                                'component': 'VCol',
+                                                'props': {'cols': 12, 'md': 4},
+                                                'content': [
+                                                    {
+                                                        'component': 'VSelect',
+                                                        'props': {
+                                                            'model': 'animation_encoder',
+                                                            'label': '动图编码器',
+                                                            'hint': '自动：检测到 ffmpeg 时使用 ffmpeg，否则使用内置编码器（无需 ffmpeg）',
+                                                            'persistentHint': True,
+                                                            'items': [
+                                                                {'title': '自动', 'value': 'auto'},
+                                                                {'title': 'ffmpeg', 'value': 'ffmpeg'},
+                                                                {'title': '内置 (Pillow)', 'value': 'native'}
+                                                            ],
+                                                            'prependInnerIcon': 'mdi-movie-cog-outline'
+                                                        }
+                                                    }
+                                                ]
+                                            }
+                                        ]
+                                    },
  
                                 ]
                             }
@@ -1993,7 +2765,7 @@ class MediaCoverGeneratorAshan(_PluginBase):
                                                             'model': 'delay',
                                                             'label': '入库延迟（秒）',
                                                             'placeholder': '60',
-                                                            'hint': '根据实际情况调整延迟时间',
+                                                            'hint': '该时间内连续入库的媒体会合并为一次封面更新',
                                                             'persistentHint': True
                                                         }
                                                     }
@@ -2244,14 +3016,34 @@ class MediaCoverGeneratorAshan(_PluginBase):
             "animation_format": "apng",
             "animation_resolution": "320x180",
             "animation_reduce_colors": "medium",
+            "animation_export_mode": "pipe",
+            "animation_encoder": "auto",
             "animated_2_image_count": 6,
             "animated_2_departure_type": "fly",
             "clean_images": False,
             "clean_fonts": False,
             "save_recent_covers": True,
+            "skip_unchanged": True,
+            "verify_server_image_tag": True,
+            "share_mirrored_renders": True,
+            "connect_timeout": 5,
+            "read_timeout": 30,
+            "circuit_failure_threshold": 5,
+            "circuit_cooldown": 60,
+            "poster_cache_size": 512,
             "covers_history_limit_per_library": 10,
             "covers_page_history_limit": 50,
             "page_tab": "generate-tab",
+            "library_workers": 2,
+            "fetch_workers": 2,
+            "download_workers": 3,
+            "upload_workers": 2,
+            "pipeline_queue_size": 2,
+            "server_concurrency": 3,
+            "render_backend": "thread",
+            "render_processes": 2,
+            "animation_frame_workers": 1,
+            "render_timeout": 600,
             "style_naming_v2": True,
         }
 
@@ -2789,7 +3581,7 @@ class MediaCoverGeneratorAshan(_PluginBase):
     @eventmanager.register(EventType.TransferComplete)
     def update_library_cover(self, event: Event):
         """
-        媒体整理完成后，更新所在库封面
+        媒体整理完成后，将媒体加入合并队列，由后台线程在延迟窗口结束后统一更新所在库封面
         """
         if not self._enabled:
             return
@@ -2810,15 +3602,28 @@ class MediaCoverGeneratorAshan(_PluginBase):
         # logger.info(f"监控到的媒体信息：{mediainfo}")
         if not mediainfo:
             return
-            
-        # 开始前清理可能遗留的停止信号，防止阻塞监控
-        self._event.clear()
 
-        # Delay
-        if self._delay:
-            logger.info(f"延迟 {self._delay} 秒后开始更新封面")
-            time.sleep(int(self._delay))
-            
+        if not self._transfer_queue:
+            self._transfer_queue = CoalescingQueue(
+                self.__process_transfer_batch,
+                window=self.__transfer_window(),
+                name="入库封面队列",
+            )
+        # 同一部剧集的多集入库只保留最后一次
+        media_key = (mediainfo.type, mediainfo.tmdb_id or mediainfo.douban_id or mediainfo.title_year)
+        self._transfer_queue.submit(media_key, mediainfo)
+        logger.info(f"{mediainfo.title_year} 已加入封面更新队列，{self.__transfer_window():.0f} 秒内无新入库后开始更新")
+
+    def __transfer_window(self) -> float:
+        try:
+            return max(1.0, float(self._delay or 0))
+        except (TypeError, ValueError):
+            return 60.0
+
+    def __resolve_transfer_target(self, mediainfo: MediaInfo) -> Optional[Tuple[str, dict, str]]:
+        """
+        查询入库媒体所在的服务器、媒体库与媒体项 ID
+        """
         # Query the item in media server
         existsinfo = self.mschain.media_exists(mediainfo=mediainfo)
         if not existsinfo or not existsinfo.itemid:
@@ -2826,81 +3631,118 @@ class MediaCoverGeneratorAshan(_PluginBase):
             existsinfo = self.mschain.media_exists(mediainfo=mediainfo)
             if not existsinfo:
                 logger.warning(f"{mediainfo.title_year} 不存在媒体库中，可能服务器还未扫描完成，建议设置合适的延迟时间")
-                return
+                return None
         
         # Get item details including backdrop
         iteminfo = self.mschain.iteminfo(server=existsinfo.server, item_id=existsinfo.itemid)
         # logger.info(f"获取到媒体项 {mediainfo.title_year} 详情：{iteminfo}")
         if not iteminfo:
             logger.warning(f"获取 {mediainfo.title_year} 详情失败")
-            return
+            return None
             
         # Try to get library ID
-        library_id = None
-        library = {}
-        item_id = existsinfo.itemid
+        library = None
         server = existsinfo.server
-        service = self._servers.get(server)
-        if service:
-            libraries = self.__get_server_libraries(service)
-        if libraries and not library_id:
-            library = next(
-                (library
-                 for library in libraries if library.get('Locations', []) 
-                 and any(iteminfo.path.startswith(path) for path in library.get('Locations', []))),
-                None
+        service = self._servers.get(server) if self._servers else None
+        if service and iteminfo.path:
+            library = self._library_cache.find_by_path(
+                server, iteminfo.path, lambda: self.__fetch_server_libraries(service)
             )
         
         if not library:
             logger.warning(f"找不到 {mediainfo.title_year} 所在媒体库")
-            return
-        if service.type == 'emby':
-            library_id = library.get("Id")
-        else:
-            library_id = library.get("ItemId")
-        if self._include_libraries and f"{server}-{library_id}" not in self._include_libraries:
-            logger.info(f"{server}：{library['Name']} 不在列表中，跳过更新封面")
-            return
+            return None
+        return server, library, existsinfo.itemid
 
-        update_key = (server, item_id)
-        if update_key in self._current_updating_items:
-            logger.info(f"媒体库 {server}：{library['Name']} 的项目 {mediainfo.title_year} 正在更新中，跳过此次更新")
+    def __process_transfer_batch(self, batch: List[Tuple[Any, MediaInfo]]):
+        """
+        处理一个窗口内合并后的入库媒体，每个 (服务器, 媒体库) 只生成一次封面，使用最新入库的媒体项
+        """
+        if not self._enabled or not self._transfer_monitor:
             return
-        # self.clean_cover_history(save=True)
-        old_history = self.get_data('cover_history') or []
-        # 新增去重判断逻辑
-        latest_item = max(
-            (item for item in old_history if str(item.get("library_id")) == str(library_id)),
-            key=lambda x: x["timestamp"],
-            default=None
-        )
-        if latest_item and str(latest_item.get("item_id")) == str(item_id):
-            logger.info(f"媒体 {mediainfo.title_year} 在库中是最新记录，不更新封面图")
+        # 开始前清理可能遗留的停止信号，防止阻塞监控
+        self._event.clear()
+
+        # 批次内按提交顺序排列，后入库的覆盖先入库的
+        targets: Dict[Tuple[str, str], Tuple[dict, str, MediaInfo]] = {}
+        for _, mediainfo in batch:
+            if self._event.is_set():
+                return
+            try:
+                target = self.__resolve_transfer_target(mediainfo)
+            except Exception as e:
+                logger.error(f"查询 {mediainfo.title_year} 所在媒体库失败: {e}")
+                continue
+            if not target:
+                continue
+            server, library, item_id = target
+            library_id = LibraryJob(server, self._servers.get(server), library).library_id
+            targets.pop((server, library_id), None)
+            targets[(server, library_id)] = (library, item_id, mediainfo)
+        if not targets:
             return
-        
+        logger.info(f"入库队列合并 {len(batch)} 个媒体为 {len(targets)} 个媒体库封面更新")
+
         # 安全地获取字体和翻译
         try:
             self.__get_fonts()
         except Exception as e:
             logger.error(f"初始化字体或翻译时出错: {e}")
             # 继续执行，但可能会影响封面生成质量
-        new_history = self.update_cover_history(
-            server=server, 
-            library_id=library_id, 
-            item_id=item_id
-        )
-        # logger.info(f"最新数据： {new_history}")
-        self._monitor_sort = 'DateCreated'
-        self._current_updating_items.add(update_key)
-        if self.__update_library(service, library):
-            self._monitor_sort = ''
-            self._current_updating_items.remove(update_key)
-            logger.info(f"媒体库 {server}：{library['Name']} 封面更新成功")
+
+        for (server, library_id), (library, item_id, mediainfo) in targets.items():
+            if self._event.is_set():
+                logger.info("媒体库封面更新服务停止")
+                return
+            self.__update_library_for_item(server, library, library_id, item_id, mediainfo)
+
+    def __update_library_for_item(self, server: str, library: dict, library_id: str, item_id: str,
+                                  mediainfo: MediaInfo):
+        if self._include_libraries and f"{server}-{library_id}" not in self._include_libraries:
+            logger.info(f"{server}：{library['Name']} 不在列表中，跳过更新封面")
+            return
+
+        update_key = (server, library_id)
+        with self._updating_items_lock:
+            if update_key in self._current_updating_items:
+                logger.info(f"媒体库 {server}：{library['Name']} 正在更新中，跳过 {mediainfo.title_year} 触发的更新")
+                return
+            self._current_updating_items.add(update_key)
+        try:
+            # self.clean_cover_history(save=True)
+            old_history = self.get_data('cover_history') or []
+            # 新增去重判断逻辑
+            latest_item = max(
+                (item for item in old_history if str(item.get("library_id")) == str(library_id)),
+                key=lambda x: x["timestamp"],
+                default=None
+            )
+            if latest_item and str(latest_item.get("item_id")) == str(item_id):
+                logger.info(f"媒体 {mediainfo.title_year} 在库中是最新记录，不更新封面图")
+                return
+            self.update_cover_history(
+                server=server, 
+                library_id=library_id, 
+                item_id=item_id
+            )
+            job = LibraryJob(server, self._servers.get(server), library, monitor_sort='DateCreated',
+                             style=self._cover_style)
+            if self.__run_library_job(job):
+                logger.info(f"媒体库 {server}：{library['Name']} 封面更新成功")
+            else:
+                logger.warning(f"媒体库 {server}：{library['Name']} 封面更新失败")
+        except Exception as e:
+            logger.error(f"媒体库 {server}：{library['Name']} 封面更新异常: {e}")
+        finally:
+            # 无论成功与否都释放，避免失败后该库永远被跳过
+            with self._updating_items_lock:
+                self._current_updating_items.discard(update_key)
 
     
-    def __update_all_libraries(self):
+    def __update_all_libraries(self, libraries: Optional[List[str]] = None, cover_job: Optional[CoverJob] = None):
         """
-        更新所有媒体库封面
+        更新所有媒体库封面；libraries 为 "服务器-媒体库ID" 列表时只更新这些媒体库（不受媒体库范围设置限制），
+        cover_job 为立即生成任务时同步进度，并可通过其取消信号中止
         """
         if not self._enabled:
             return
@@ -2916,93 +3758,602 @@ class MediaCoverGeneratorAshan(_PluginBase):
         logger.info("开始更新媒体库封面 ...")
         # 开始前确保停止信号已清除
         self._event.clear()
-        total_success_count = 0
-        total_fail_count = 0
+        if self._session_pool:
+            self._session_pool.reset_stats()
+        if self._poster_cache:
+            self._poster_cache.reset_stats()
+        if self._server_health:
+            self._server_health.reset_stats()
+        # 立即生成任务可指定风格，只用于本次创建的媒体库任务
+        style = (cover_job.style if cover_job else None) or self._cover_style
+        cover_style = {
+            "static_1": "静态 1",
+            "static_2": "静态 2",
+            "static_3": "静态 3",
+            "static_4": "静态 4（全屏模糊）",
+            "animated_1": "卡片翻转动画",
+            "animated_2": "帷幕切换动画",
+            "animated_3": "斜向滚动动画",
+            "animated_4": "全屏模糊渐变"
+        }.get(style, "静态 1")
+        logger.info(f"当前风格 {cover_style}")
+
+        # 扫描所有媒体库，生成任务列表
+        libraries_filter = set(libraries) if libraries is not None else None
+        jobs: List[LibraryJob] = []
+        server_counts: Dict[str, List[int]] = {}
         for server, service in self._servers.items():
-            # 扫描所有媒体库
             logger.info(f"当前服务器 {server}")
-            cover_style = {
-                "static_1": "静态 1",
-                "static_2": "静态 2",
-                "static_3": "静态 3",
-                "static_4": "静态 4（全屏模糊）",
-                "animated_1": "卡片翻转动画",
-                "animated_2": "帷幕切换动画",
-                "animated_3": "斜向滚动动画",
-                "animated_4": "全屏模糊渐变"
-            }.get(self._cover_style, "静态 1")
-            logger.info(f"当前风格 {cover_style}")
-            # 获取媒体库列表
-            libraries = self.__get_server_libraries(service)
-            if not libraries:
+            server_libraries = self.__get_server_libraries(service, refresh=True)
+            if not server_libraries:
                 logger.warning(f"服务器 {server} 的媒体库列表获取失败")
                 continue
-            server_success_count = 0
-            server_fail_count = 0
-            for library in libraries:
-                if self._event.is_set():
-                    logger.info("媒体库封面更新服务停止")
-                    self._event.clear()
-                    return
-                if service.type == 'emby':
-                    library_id = library.get("Id")
-                else:
-                    library_id = library.get("ItemId")
-                if self._include_libraries and f"{server}-{library_id}" not in self._include_libraries:
+            server_counts[server] = [0, 0, 0, 0]
+            for library in server_libraries:
+                job = LibraryJob(server, service, library, style=style)
+                if libraries_filter is not None:
+                    if f"{server}-{job.library_id}" not in libraries_filter:
+                        continue
+                elif self._include_libraries and f"{server}-{job.library_id}" not in self._include_libraries:
                     logger.info(f"{server}：{library['Name']} 不在列表中，跳过更新封面")
                     continue
-                if self.__update_library(service, library):
-                    logger.info(f"媒体库 {server}：{library['Name']} 封面更新成功")
-                    server_success_count += 1
+                jobs.append(job)
+
+        total_success_count = 0
+        total_fail_count = 0
+        total_skip_count = 0
+        total_same_count = 0
+        total_circuit_count = 0
+        total_shared_count = 0
+        counts_lock = threading.Lock()
+        # 立即生成任务被取消时与插件停止信号同样处理
+        stop_event = AnyEvent(self._event, cover_job.cancel_event if cover_job else None)
+        # 镜像媒体库共享渲染，仅在本次批量更新内有效
+        share_registry = SharedRenderRegistry() if self._share_mirrored_renders else None
+        # 主任务未能生成共享封面时，镜像任务在独立线程中补做，不占用流水线工作线程
+        fallback_executor = ThreadPoolExecutor(max_workers=self._library_workers,
+                                               thread_name_prefix="mirror-fallback")
+
+        def run_orphan(mirror: LibraryJob):
+            result = self.__run_orphan_mirror(mirror)
+            if result is not None:
+                count_job(mirror, result)
+
+        def on_job_done(job: LibraryJob, result: Optional[bool]):
+            self.__release_library_dir(job)
+            if job.deferred:
+                # 已挂到其他服务器主任务名下，结果随主任务回填
+                return
+            orphans = job.share_group.close() if job.share_group else []
+            if orphans and result is not None and not stop_event.is_set():
+                logger.info(f"媒体库 {job.server}：{job.library_name} 未能生成共享封面，"
+                            f"{len(orphans)} 个镜像媒体库改为独立处理")
+                for mirror in orphans:
+                    fallback_executor.submit(run_orphan, mirror)
+            if result is None:
+                # 停止信号触发后未执行完的任务
+                return
+            count_job(job, result)
+            for mirror in job.mirrors:
+                if mirror.result is not None:
+                    count_job(mirror, mirror.result)
+
+        def count_job(job: LibraryJob, result: bool):
+            nonlocal total_success_count, total_fail_count, total_skip_count, total_same_count, total_circuit_count, \
+                total_shared_count
+            if cover_job:
+                cover_job.advance(f"{job.server}：{job.library_name}")
+            with counts_lock:
+                if result and job.shared_from is not None:
+                    total_shared_count += 1
+                if job.circuit_skipped:
+                    server_counts[job.server][3] += 1
+                    total_circuit_count += 1
+                elif job.skipped:
+                    server_counts[job.server][2] += 1
+                    total_skip_count += 1
+                elif result:
+                    logger.info(f"媒体库 {job.server}：{job.library_name} 封面更新成功")
+                    server_counts[job.server][0] += 1
                     total_success_count += 1
+                    if job.upload_skipped:
+                        total_same_count += 1
                 else:
-                    logger.warning(f"媒体库 {server}：{library['Name']} 封面更新失败")
-                    server_fail_count += 1
+                    logger.warning(f"媒体库 {job.server}：{job.library_name} 封面更新失败")
+                    server_counts[job.server][1] += 1
                     total_fail_count += 1
-            logger.info(f"媒体库 {server} 处理结束：成功 {server_success_count} 个，失败 {server_fail_count} 个")
-        tips = f"媒体库封面更新任务结束，成功 {total_success_count} 个，失败 {total_fail_count} 个"
+
+        queue_size = self._pipeline_queue_size
+        pipeline = StagedPipeline(
+            [
+                PipelineStage("查询", self.__with_circuit_check(lambda job: self.__stage_select_shared(job, share_registry)),
+                              self._fetch_workers, queue_size),
+                PipelineStage("下载", self.__with_circuit_check(self.__stage_download), self._download_workers,
+                              queue_size),
+                PipelineStage("渲染", self.__with_circuit_check(self.__stage_render), self._library_workers,
+                              queue_size),
+                PipelineStage("上传", self.__with_circuit_check(self.__stage_upload), self._upload_workers,
+                              queue_size),
+            ],
+            stop_event=stop_event,
+            on_done=on_job_done,
+        )
+        if cover_job:
+            cover_job.start_progress(len(jobs))
+            cover_job.pipeline = pipeline
+        run_started = time.monotonic()
+        logger.info(f"共 {len(jobs)} 个媒体库待更新，阶段并发 查询 {self._fetch_workers} / 下载 {self._download_workers} / "
+                    f"渲染 {self._library_workers} / 上传 {self._upload_workers}，队列深度 {queue_size}，"
+                    f"单服务器请求上限 {self._server_health.limit}")
+        pipeline.run(jobs)
+        fallback_executor.shutdown(wait=True)
+        self._last_run_stats = {
+            "libraries": len(jobs),
+            "elapsed": time.monotonic() - run_started,
+            "success": total_success_count,
+            "fail": total_fail_count,
+            "skip": total_skip_count,
+            "same": total_same_count,
+            "circuit": total_circuit_count,
+            "shared": total_shared_count,
+            "stages": pipeline.stage_stats(),
+        }
+        if cover_job and cover_job.cancel_event.is_set():
+            logger.info(f"封面生成任务 {cover_job.id} 已取消，已完成 {total_success_count} 个媒体库")
+            return f"任务已取消，已完成 {total_success_count} 个媒体库"
+        if self._event.is_set():
+            logger.info("媒体库封面更新服务停止")
+            self._event.clear()
+            return
+        circuit_servers = []
+        for server, (server_success_count, server_fail_count, server_skip_count,
+                     server_circuit_count) in server_counts.items():
+            message = f"媒体库 {server} 处理结束：成功 {server_success_count} 个，失败 {server_fail_count} 个，" \
+                      f"未变化跳过 {server_skip_count} 个"
+            if server_circuit_count:
+                circuit_servers.append(f"{server}（{server_circuit_count} 个）")
+                logger.warning(f"{message}，服务器熔断跳过 {server_circuit_count} 个")
+            else:
+                logger.info(message)
+        if self._server_health:
+            health_stats = self._server_health.format_stats()
+            if health_stats:
+                logger.info(f"媒体服务器健康度：{health_stats}")
+        if self._session_pool:
+            connection_stats = self._session_pool.format_stats()
+            if connection_stats:
+                logger.info(f"媒体服务器连接复用：{connection_stats}")
+        if self._poster_cache:
+            self._poster_cache.flush()
+            logger.info(f"海报缓存：{self._poster_cache.format_stats()}")
+        tips = f"媒体库封面更新任务结束，成功 {total_success_count} 个（其中与服务器封面相同未上传 {total_same_count} 个），" \
+               f"失败 {total_fail_count} 个，未变化跳过 {total_skip_count} 个"
+        if total_shared_count:
+            tips += f"，{total_shared_count} 个镜像媒体库共用了其他服务器的渲染结果"
+        if circuit_servers:
+            tips += f"，服务器异常熔断跳过 {total_circuit_count} 个：{'、'.join(circuit_servers)}"
         logger.info(tips)
         return tips
-                 
 
-    def __update_library(self, service, library):
-        library_name = library['Name']
-        logger.info(f"媒体库 {service.name}：{library_name} 开始准备更新封面")
-        # 自定义图像路径
-        image_path = self.__check_custom_image(library_name)
-        # 从配置获取标题和背景颜色
-        title_result = self.__get_title_from_config(library_name)
-        if len(title_result) == 3:
-            title = (title_result[0], title_result[1])
-            config_bg_color = title_result[2]
+    def __run_library_job(self, job: LibraryJob,
+                          stages: Optional[List[Callable[[LibraryJob], bool]]] = None) -> Optional[bool]:
+        """
+        按顺序执行单个媒体库的全部阶段（或指定的后续阶段），收到停止信号时返回 None
+        """
+        if stages is None:
+            stages = [self.__stage_select, self.__stage_download, self.__stage_render, self.__stage_upload]
+        try:
+            for stage in stages:
+                if self._event.is_set():
+                    return None
+                if not stage(job):
+                    if job.skipped:
+                        return True
+                    return None if self._event.is_set() else False
+            return True
+        finally:
+            self.__release_library_dir(job)
+
+    def __stage_select_shared(self, job: LibraryJob, registry: Optional[SharedRenderRegistry]) -> bool:
+        """
+        批量更新的阶段一：筛选完成后按渲染键加入共享分组，挂到主任务名下的镜像任务在此退出流水线
+        """
+        if not self.__stage_select(job):
+            return False
+        if registry is None:
+            return True
+        try:
+            share_key = self.__build_share_key(job)
+        except Exception as e:
+            logger.warning(f"媒体库 {job.server}：{job.library_name} 计算共享渲染键失败: {e}")
+            return True
+        if not share_key:
+            return True
+        if registry.join(share_key, job):
+            logger.info(f"媒体库 {job.server}：{job.library_name} 与 {job.shared_from.server}：{job.shared_from.library_name} "
+                        f"内容相同，等待共用其渲染结果")
+            return False
+        if job.shared_from is not None:
+            logger.info(f"媒体库 {job.server}：{job.library_name} 复用 {job.shared_from.server}：{job.shared_from.library_name} "
+                        f"已生成的封面")
+        return True
+
+    def __run_orphan_mirror(self, mirror: LibraryJob) -> Optional[bool]:
+        """
+        主任务在上传前失败时，镜像任务从下载阶段起独立完成
+        """
+        mirror.shared_from = None
+        mirror.deferred = False
+        stages = [self.__with_circuit_check(stage)
+                  for stage in (self.__stage_download, self.__stage_render, self.__stage_upload)]
+        return self.__run_library_job(mirror, stages)
+
+    def __with_circuit_check(self, stage: Callable[[LibraryJob], bool]) -> Callable[[LibraryJob], bool]:
+        """
+        包装流水线阶段：所属服务器熔断中时不再执行，标记为熔断跳过
+        """
+        def run(job: LibraryJob) -> bool:
+            if self._server_health and self._server_health.is_open(job.server):
+                if not job.circuit_skipped:
+                    logger.warning(f"媒体服务器 {job.server} 熔断中，跳过媒体库 {job.library_name}")
+                job.circuit_skipped = True
+                return False
+            return stage(job)
+        return run
+
+    def __acquire_library_dir(self, job: LibraryJob) -> bool:
+        """
+        同名媒体库共用图片工作目录，从下载开始到渲染结束期间独占该目录
+        """
+        if job.dir_lock is not None:
+            return True
+        lock = self._library_dir_locks.get(self.__sanitize_filename(job.library_name))
+        while not lock.acquire(timeout=0.5):
+            if self._event.is_set():
+                return False
+        job.dir_lock = lock
+        return True
+
+    def __release_library_dir(self, job: LibraryJob):
+        lock, job.dir_lock = job.dir_lock, None
+        if lock is not None:
+            lock.release()
+
+    def __stage_select(self, job: LibraryJob) -> bool:
+        """
+        阶段一：解析标题配置，筛选用于生成封面的媒体项
+        """
+        service, library = job.service, job.library
+        library_name = library['Name']
+        logger.info(f"媒体库 {service.name}：{library_name} 开始准备更新封面")
+        # 自定义图像路径
+        job.custom_images = self.__check_custom_image(library_name)
+        # 从配置获取标题和背景颜色
+        title_result = self.__get_title_from_config(library_name)
+        if len(title_result) == 3:
+            title = (title_result[0], title_result[1])
+            job.config_bg_color = title_result[2]
+        else:
+            title = title_result
+            job.config_bg_color = None
+
+        # 防御性处理：若配置把中文标题置空，自动回退为媒体库名，避免“纯图片无标题”。
+        try:
+            if isinstance(title, tuple) and len(title) >= 2:
+                safe_zh = str(title[0]).strip() if title[0] is not None else ""
+                safe_en = str(title[1]).strip() if title[1] is not None else ""
+                if not safe_zh:
+                    self.__log_stage(
+                        "warning",
+                        "title",
+                        "中文标题为空，已自动回退为媒体库名",
+                        server=service.name,
+                        library=library_name,
+                    )
+                    title = (library_name, safe_en)
+        except Exception:
+            pass
+        job.title = title
+        if job.custom_images:
+            logger.info(f"媒体库 {service.name}：{library_name} 从自定义路径获取封面")
+        else:
+            job.items = self.__select_items_from_server(job)
+            if not job.items:
+                return False
+        return not self.__check_unchanged(job)
+
+    def __check_unchanged(self, job: LibraryJob) -> bool:
+        """
+        计算输入指纹，与上次成功上传时一致则标记任务为跳过
+        """
+        try:
+            job.fingerprint = self.__build_input_fingerprint(job)
+        except Exception as e:
+            logger.warning(f"媒体库 {job.server}：{job.library_name} 计算输入指纹失败: {e}")
+            job.fingerprint = None
+            return False
+        if not self._skip_unchanged or not job.fingerprint:
+            return False
+        with self._fingerprint_lock:
+            record = (self.get_data('cover_fingerprints') or {}).get(f"{job.server}-{job.library_id}")
+        if record and record.get("fingerprint") == job.fingerprint:
+            logger.info(f"媒体库 {job.server}：{job.library_name} 输入未变化，跳过下载、渲染与上传")
+            job.skipped = True
+            return True
+        return False
+
+    def __build_input_fingerprint(self, job: LibraryJob) -> Optional[str]:
+        """
+        封面输入指纹：所选媒体项的内容/图片键、风格及参数、标题、字体文件与分辨率
+        """
+        if job.custom_images:
+            sources = self.__custom_image_sources(job)
+        else:
+            sources = [
+                f"{self.__build_content_key(item)}|{self.__build_image_key(self.__get_image_url(item, job.style))}"
+                for item in job.items
+            ]
+        return self.__hash_render_inputs(job, sources)
+
+    def __build_share_key(self, job: LibraryJob) -> Optional[str]:
+        """
+        跨服务器共享渲染的键：以提供商 ID 代替服务器内的媒体项 ID，其余输入与指纹相同；
+        任一媒体项缺少提供商 ID 时不参与共享
+        """
+        if job.custom_images:
+            sources = self.__custom_image_sources(job)
+        else:
+            sources = []
+            for item in job.items:
+                providers = "|".join(
+                    f"{name.lower()}:{value}"
+                    for name, value in sorted((item.get("ProviderIds") or {}).items())
+                    if value
+                )
+                if not providers:
+                    return None
+                image_url = self.__get_image_url(item, job.style) or ""
+                image_type = "backdrop" if "/Images/Backdrop" in image_url else "primary"
+                sources.append(f"{item.get('Type')}|{providers}|{image_type}")
+        return self.__hash_render_inputs(job, sources)
+
+    @staticmethod
+    def __custom_image_sources(job: LibraryJob) -> List[str]:
+        sources = []
+        for path in job.custom_images:
+            stat = os.stat(path)
+            sources.append(f"file:{path}|{stat.st_size}|{int(stat.st_mtime)}")
+        return sources
+
+    def __hash_render_inputs(self, job: LibraryJob, sources: List[str]) -> str:
+        fonts = []
+        for font in (self._zh_font_path, self._en_font_path):
+            if font and os.path.exists(font):
+                stat = os.stat(font)
+                fonts.append(f"{font}|{stat.st_size}|{int(stat.st_mtime)}")
+            else:
+                fonts.append(str(font or ""))
+
+        if self._resolution_config is not None:
+            resolution = list(self._resolution_config.size)
+        else:
+            resolution = [self._resolution, self._custom_width, self._custom_height]
+
+        payload = {
+            "sources": sources,
+            "style": job.style,
+            "params": {
+                "zh_font_size": self._zh_font_size,
+                "en_font_size": self._en_font_size,
+                "zh_font_offset": self._zh_font_offset,
+                "title_spacing": self._title_spacing,
+                "en_line_spacing": self._en_line_spacing,
+                "title_scale": self._title_scale,
+                "blur": self._multi_1_blur,
+                "blur_size": self._blur_size,
+                "color_ratio": self._color_ratio,
+                "use_primary": self._use_primary,
+                "bg_color_mode": self._bg_color_mode,
+                "custom_bg_color": self._custom_bg_color,
+                "config_bg_color": job.config_bg_color,
+                "animation_duration": self._animation_duration,
+                "animation_scroll": self._animation_scroll,
+                "animation_fps": self._animation_fps,
+                "animation_format": self._animation_format,
+                "animation_resolution": self._animation_resolution,
+                "animation_reduce_colors": self._animation_reduce_colors,
+                "animation_encoder": self._animation_encoder_backend,
+                "animated_2_image_count": self._animated_2_image_count,
+                "animated_2_departure_type": self._animated_2_departure_type,
+            },
+            "title": list(job.title) if isinstance(job.title, (tuple, list)) else job.title,
+            "fonts": fonts,
+            "resolution": resolution,
+        }
+        raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def __save_fingerprint(self, job: LibraryJob):
+        if not job.fingerprint:
+            return
+        with self._fingerprint_lock:
+            fingerprints = self.get_data('cover_fingerprints') or {}
+            fingerprints[f"{job.server}-{job.library_id}"] = {
+                "fingerprint": job.fingerprint,
+                "timestamp": time.time(),
+            }
+            self.save_data('cover_fingerprints', fingerprints)
+
+    def __stage_download(self, job: LibraryJob) -> bool:
+        """
+        阶段二：下载所选媒体项的图片到媒体库工作目录
+        """
+        if job.shared_from is not None:
+            # 复用其他服务器已生成的封面
+            return True
+        if not self.__acquire_library_dir(job):
+            return False
+        if job.custom_images:
+            return True
+        service, library = job.service, job.library
+        logger.info(f"媒体库 {service.name}：{library['Name']} 从媒体项获取图片")
+        job.image_paths = []
+        job.updated_item_ids = []
+
+        def download(index: int) -> Optional[str]:
+            if self._event.is_set():
+                return None
+            image_url = self.__get_image_url(job.items[index], job.style)
+            if not image_url:
+                return None
+            # 文件名按选中顺序编号为 1~N.jpg，多图风格依此排列
+            return self.__download_image(service, self.__with_size_hint(image_url, job.style), library['Name'],
+                                         count=index + 1)
+
+        # 单个媒体库内的海报并发下载，并发数不超过单服务器请求上限
+        workers = max(1, min(len(job.items), self._server_health.current_limit(job.server)))
+        if workers == 1:
+            results = [download(i) for i in range(len(job.items))]
+        else:
+            with ThreadPoolExecutor(max_workers=workers,
+                                    thread_name_prefix=f"poster-{job.library_name}") as executor:
+                results = list(executor.map(download, range(len(job.items))))
+        if self._event.is_set():
+            logger.info("检测到停止信号，中断图片下载 ...")
+            return False
+        for item, image_path in zip(job.items, results):
+            if image_path:
+                job.image_paths.append(image_path)
+                job.updated_item_ids.append(self.__get_item_id(item, job.style))
+        return len(job.image_paths) > 0
+
+    def __stage_render(self, job: LibraryJob) -> bool:
+        """
+        阶段三：渲染封面，完成后释放工作目录
+        """
+        if job.shared_from is not None:
+            self.__record_cover_history(job, [self.__get_item_id(item, job.style) for item in job.items])
+            return True
+        service, library = job.service, job.library
+        try:
+            if job.custom_images:
+                image_path = job.custom_images[0]
+            elif self.__is_single_image_style(job.style):
+                image_path = job.image_paths[0]
+            else:
+                # 多图风格直接读取工作目录下的 1~N.jpg
+                image_path = None
+            job.image_data = self.__generate_image_from_path(
+                service.name, library['Name'], job.title, job.style, image_path, job.config_bg_color
+            )
+        finally:
+            self.__release_library_dir(job)
+        if not job.image_data:
+            return False
+        self.__record_cover_history(job, job.updated_item_ids)
+        return True
+
+    def __record_cover_history(self, job: LibraryJob, item_ids: List[str]):
+        # 更新ids
+        for item_id in reversed(item_ids):
+            if not item_id:
+                continue
+            self.update_cover_history(
+                server=job.server,
+                library_id=job.library_id,
+                item_id=item_id
+            )
+
+    def __stage_upload(self, job: LibraryJob) -> bool:
+        """
+        阶段四：上传封面到媒体服务器；作为共享渲染的主任务时，同时把封面并行上传到各镜像媒体库
+        """
+        mirrors = job.share_group.close(job.image_data) if job.share_group else []
+        if not mirrors:
+            return self.__upload_cover(job)
+        job.mirrors = mirrors
+        with ThreadPoolExecutor(max_workers=len(mirrors),
+                                thread_name_prefix=f"mirror-{job.library_name}") as executor:
+            futures = [executor.submit(self.__upload_mirror, job, mirror) for mirror in mirrors]
+            result = self.__upload_cover(job)
+            for mirror, future in zip(mirrors, futures):
+                try:
+                    mirror.result = future.result()
+                except Exception as e:
+                    logger.error(f"媒体库 {mirror.server}：{mirror.library_name} 上传共享封面异常: {e}")
+                    mirror.result = False
+        return result
+
+    def __upload_mirror(self, leader: LibraryJob, mirror: LibraryJob) -> Optional[bool]:
+        if self._event.is_set():
+            return None
+        if self._server_health and self._server_health.is_open(mirror.server):
+            logger.warning(f"媒体服务器 {mirror.server} 熔断中，跳过媒体库 {mirror.library_name}")
+            mirror.circuit_skipped = True
+            return False
+        mirror.image_data = leader.image_data
+        self.__record_cover_history(mirror, [self.__get_item_id(item, mirror.style) for item in mirror.items])
+        return self.__upload_cover(mirror)
+
+    def __upload_cover(self, job: LibraryJob) -> bool:
+        """
+        上传单个媒体库的封面，与服务器上现有封面相同时跳过
+        """
+        image = RenderResult.from_output(job.image_data)
+        content_hash = hashlib.sha256(image.data).hexdigest() if image else None
+        if content_hash and self.__is_same_as_last_upload(job, content_hash):
+            logger.info(f"媒体库 {job.server}：{job.library_name} 新封面与服务器上的封面相同，跳过上传")
+            job.upload_skipped = True
         else:
-            title = title_result
-            config_bg_color = None
+            if not self.__set_library_image(job.service, job.library, image):
+                return False
+            self.__save_upload_record(job, content_hash)
+        self.__save_fingerprint(job)
+        return True
 
-        # 防御性处理：若配置把中文标题置空，自动回退为媒体库名，避免“纯图片无标题”。
+    def __get_library_image_tag(self, job: LibraryJob) -> Optional[str]:
+        """查询媒体库当前的 Primary 图片 tag"""
+        url = f'[HOST]emby/Items?Ids={job.library_id}&EnableImageTypes=Primary&ImageTypeLimit=1' \
+              f'&EnableUserData=false&api_key=[APIKEY]'
         try:
-            if isinstance(title, tuple) and len(title) >= 2:
-                safe_zh = str(title[0]).strip() if title[0] is not None else ""
-                safe_en = str(title[1]).strip() if title[1] is not None else ""
-                if not safe_zh:
-                    self.__log_stage(
-                        "warning",
-                        "title",
-                        "中文标题为空，已自动回退为媒体库名",
-                        server=service.name,
-                        library=library_name,
-                    )
-                    title = (library_name, safe_en)
-        except Exception:
-            pass
-        if image_path:
-            logger.info(f"媒体库 {service.name}：{library_name} 从自定义路径获取封面")
-            image_data = self.__generate_image_from_path(service.name, library_name, title, image_path[0], config_bg_color)
-        else:
-            image_data = self.__generate_from_server(service, library, title)
+            res = self.__get_data(job.service, url)
+            if not res or res.status_code != 200:
+                return None
+            items = (res.json() or {}).get("Items") or []
+            if not items:
+                return None
+            return (items[0].get("ImageTags") or {}).get("Primary")
+        except Exception as e:
+            logger.debug(f"查询媒体库 {job.server}：{job.library_name} 封面 tag 失败: {e}")
+            return None
+
+    def __is_same_as_last_upload(self, job: LibraryJob, content_hash: str) -> bool:
+        """
+        内容哈希与上次成功上传一致，且（开启校验时）服务器上的封面 tag 未被外部修改；
+        输入未变化时跳过渲染由 skip_unchanged 在拉取阶段判断，这里只比较渲染结果
+        """
+        with self._fingerprint_lock:
+            record = (self.get_data('upload_records') or {}).get(f"{job.server}-{job.library_id}")
+        if not record or record.get("hash") != content_hash:
+            return False
+        if not self._verify_server_image_tag:
+            return True
+        current_tag = self.__get_library_image_tag(job)
+        return bool(current_tag) and current_tag == record.get("tag")
 
-        if image_data:
-            return self.__set_library_image(service, library, image_data)
+    def __save_upload_record(self, job: LibraryJob, content_hash: Optional[str]):
+        if not content_hash:
+            return
+        # 上传后服务器生成新的 tag，记录下来用于下次比对
+        tag = self.__get_library_image_tag(job) if self._verify_server_image_tag else None
+        with self._fingerprint_lock:
+            records = self.get_data('upload_records') or {}
+            records[f"{job.server}-{job.library_id}"] = {
+                "hash": content_hash,
+                "tag": tag,
+                "timestamp": time.time(),
+            }
+            self.save_data('upload_records', records)
 
     def __check_custom_image(self, library_name):
         if not self._covers_input:
@@ -3023,7 +4374,7 @@ class MediaCoverGeneratorAshan(_PluginBase):
         return images if images else None  # 或改为 return images if images else False
 
     @memory_efficient_operation
-    def __generate_image_from_path(self, server, library_name, title, image_path=None, config_bg_color=None):
+    def __generate_image_from_path(self, server, library_name, title, style, image_path=None, config_bg_color=None):
         logger.info(f"媒体库 {server}：{library_name} 正在生成封面图 ...")
 
         # 执行健康检查
@@ -3063,7 +4414,7 @@ class MediaCoverGeneratorAshan(_PluginBase):
             title_scale = 1.0
         if title_scale <= 0:
             title_scale = 1.0
-        if self._cover_style.startswith("animated"):
+        if style.startswith("animated"):
             zh_font_size = float(base_zh_font_size) * title_scale
             en_font_size = float(base_en_font_size) * title_scale
         else:
@@ -3127,31 +4478,31 @@ class MediaCoverGeneratorAshan(_PluginBase):
         }
 
         # 传递分辨率配置给图像生成函数
-        if self._cover_style == 'static_1':
-            image_data = create_style_static_1(image_path, title, font_path,
+        if style == 'static_1':
+            image_data = self._render_backend.render('static_1', image_path, title, font_path,
                                                 font_size=font_size,
                                                 font_offset=font_offset,
                                                 blur_size=blur_size,
                                                 color_ratio=color_ratio,
                                                 resolution_config=self._resolution_config,
                                                 bg_color_config=bg_color_config)
-        elif self._cover_style == 'static_2':
-            image_data = create_style_static_2(image_path, title, font_path,
+        elif style == 'static_2':
+            image_data = self._render_backend.render('static_2', image_path, title, font_path,
                                                 font_size=font_size,
                                                 font_offset=font_offset,
                                                 blur_size=blur_size,
                                                 color_ratio=color_ratio,
                                                 resolution_config=self._resolution_config,
                                                 bg_color_config=bg_color_config)
-        elif self._cover_style == 'static_4':
-            image_data = create_style_static_4(image_path, title, font_path,
+        elif style == 'static_4':
+            image_data = self._render_backend.render('static_4', image_path, title, font_path,
                                                 font_size=font_size,
                                                 font_offset=font_offset,
                                                 blur_size=blur_size,
                                                 color_ratio=color_ratio,
                                                 resolution_config=self._resolution_config,
                                                 bg_color_config=bg_color_config)
-        elif self._cover_style == 'static_3':
+        elif style == 'static_3':
             # 使用安全的文件名
             safe_library_name = self.__sanitize_filename(library_name)
             if image_path:
@@ -3161,7 +4512,7 @@ class MediaCoverGeneratorAshan(_PluginBase):
             logger.info(f"static_3: 准备图片目录 {library_dir}")
             if self.prepare_library_images(library_dir, required_items=9):
                 logger.info("static_3: 图片目录准备完成，开始生成封面")
-                image_data = create_style_static_3(library_dir, title, font_path,
+                image_data = self._render_backend.render('static_3', library_dir, title, font_path,
                                                     font_size=font_size,
                                                     font_offset=font_offset,
                                                     is_blur=self._multi_1_blur,
@@ -3171,7 +4522,7 @@ class MediaCoverGeneratorAshan(_PluginBase):
                                                     bg_color_config=bg_color_config)
             else:
                 logger.warning(f"static_3: 图片目录准备失败 {library_dir}")
-        elif self._cover_style == 'animated_3':
+        elif style == 'animated_3':
             # 动态封面强制使用 320x180 分辨率以保证性能
             anim_res = '320x180'
             logger.info(f"强制动图生成分辨率为: {anim_res}")
@@ -3186,7 +4537,7 @@ class MediaCoverGeneratorAshan(_PluginBase):
             logger.info(f"正在准备库图片目录: {library_dir}")
             if self.prepare_library_images(library_dir, required_items=9):
                 logger.info("库图片准备完成，开始调用 create_style_animated_3")
-                image_data = create_style_animated_3(library_dir, title, font_path,
+                image_data = self._render_backend.render('animated_3', library_dir, title, font_path,
                                                     font_size=font_size,
                                                     font_offset=font_offset,
                                                     is_blur=self._multi_1_blur,
@@ -3200,8 +4551,11 @@ class MediaCoverGeneratorAshan(_PluginBase):
                                                     animation_format=self._animation_format,
                                                     animation_resolution=anim_res,
                                                     animation_reduce_colors=self._animation_reduce_colors,
+                                                    animation_export_mode=self._animation_export_mode,
+                                                    animation_encoder=self._animation_encoder_backend,
+                                                    frame_workers=self._frame_workers,
                                                     stop_event=self._event)
-        elif self._cover_style == 'animated_1':
+        elif style == 'animated_1':
             # 动态封面强制使用 320x180 分辨率以保证性能
             anim_res = '320x180'
             logger.info(f"强制动图生成分辨率为: {anim_res}")
@@ -3218,7 +4572,7 @@ class MediaCoverGeneratorAshan(_PluginBase):
             logger.info(f"正在准备库图片目录: {library_dir}")
             if self.prepare_library_images(library_dir, required_items=animated_2_image_count):
                 logger.info("库图片准备完成，开始调用 create_style_animated_1")
-                image_data = create_style_animated_1(library_dir, title, font_path,
+                image_data = self._render_backend.render('animated_1', library_dir, title, font_path,
                                                     font_size=font_size,
                                                     font_offset=font_offset,
                                                     is_blur=self._multi_1_blur,
@@ -3231,10 +4585,13 @@ class MediaCoverGeneratorAshan(_PluginBase):
                                                     animation_format=self._animation_format,
                                                     animation_resolution=anim_res,
                                                     animation_reduce_colors=self._animation_reduce_colors,
+                                                    animation_export_mode=self._animation_export_mode,
+                                                    animation_encoder=self._animation_encoder_backend,
+                                                    frame_workers=self._frame_workers,
                                                     image_count=animated_2_image_count,
                                                     departure_type=self._animated_2_departure_type,
                                                     stop_event=self._event)
-        elif self._cover_style == 'animated_2':
+        elif style == 'animated_2':
             # 动态封面强制使用 320x180 分辨率以保证性能
             anim_res = '320x180'
             logger.info(f"强制动图生成分辨率为: {anim_res}")
@@ -3248,7 +4605,7 @@ class MediaCoverGeneratorAshan(_PluginBase):
             logger.info(f"正在准备库图片目录: {library_dir}")
             if self.prepare_library_images(library_dir, required_items=9):
                 logger.info("库图片准备完成，开始调用 create_style_animated_2")
-                image_data = create_style_animated_2(library_dir, title, font_path,
+                image_data = self._render_backend.render('animated_2', library_dir, title, font_path,
                                                     font_size=font_size,
                                                     font_offset=font_offset,
                                                     is_blur=self._multi_1_blur,
@@ -3261,9 +4618,12 @@ class MediaCoverGeneratorAshan(_PluginBase):
                                                     animation_format=self._animation_format,
                                                     animation_resolution=anim_res,
                                                     animation_reduce_colors=self._animation_reduce_colors,
+                                                    animation_export_mode=self._animation_export_mode,
+                                                    animation_encoder=self._animation_encoder_backend,
+                                                    frame_workers=self._frame_workers,
                                                     image_count=self.__get_animated_2_required_items(),
                                                     stop_event=self._event)
-        elif self._cover_style == 'animated_4':
+        elif style == 'animated_4':
             anim_res = '320x180'
             logger.info(f"强制动图生成分辨率为: {anim_res}")
 
@@ -3278,7 +4638,7 @@ class MediaCoverGeneratorAshan(_PluginBase):
             logger.info(f"正在准备库图片目录: {library_dir}")
             if self.prepare_library_images(library_dir, required_items=animated_2_image_count):
                 logger.info("库图片准备完成，开始调用 create_style_animated_4")
-                image_data = create_style_animated_4(library_dir, title, font_path,
+                image_data = self._render_backend.render('animated_4', library_dir, title, font_path,
                                                     font_size=font_size,
                                                     font_offset=font_offset,
                                                     is_blur=self._multi_1_blur,
@@ -3291,6 +4651,9 @@ class MediaCoverGeneratorAshan(_PluginBase):
                                                     animation_format=self._animation_format,
                                                     animation_resolution=anim_res,
                                                     animation_reduce_colors=self._animation_reduce_colors,
+                                                    animation_export_mode=self._animation_export_mode,
+                                                    animation_encoder=self._animation_encoder_backend,
+                                                    frame_workers=self._frame_workers,
                                                     image_count=animated_2_image_count,
                                                     stop_event=self._event)
         if not image_data:
@@ -3300,7 +4663,7 @@ class MediaCoverGeneratorAshan(_PluginBase):
                 "封面生成返回空结果",
                 server=server,
                 library=library_name,
-                style=self._cover_style,
+                style=style,
                 source_image=image_path,
                 zh_font=self._zh_font_path,
                 en_font=self._en_font_path,
@@ -3314,20 +4677,17 @@ class MediaCoverGeneratorAshan(_PluginBase):
             "封面生成完成",
             server=server,
             library=library_name,
-            style=self._cover_style,
+            style=style,
         )
         return image_data
     
-    def __generate_from_server(self, service, library, title):
-
+    def __select_items_from_server(self, job: LibraryJob) -> List[dict]:
+        """
+        从媒体服务器筛选生成封面所需的媒体项，单图风格返回 1 项，多图风格返回所需数量
+        """
+        service, library = job.service, job.library
         logger.info(f"媒体库 {service.name}：{library['Name']} 开始筛选媒体项")
-        required_items = self.__get_required_items()
-        
-        # 获取项目集合
-        items = []
-        offset = 0
-        batch_size = 50  # 每次获取的项目数量
-        max_attempts = 20  # 最大尝试次数，防止无限循环
+        required_items = self.__get_required_items(job.style)
         
         library_type = library.get('CollectionType')
         if service.type == 'emby':
@@ -3338,14 +4698,14 @@ class MediaCoverGeneratorAshan(_PluginBase):
         
         # 处理合集类型的特殊情况
         if library_type == "boxsets":
-            return self.__handle_boxset_library(service, library, title)
+            return self.__handle_boxset_library(job)
         elif library_type == "playlists":
-            return self.__handle_playlist_library(service, library, title)
+            return self.__handle_playlist_library(job)
         elif library_type == "music":
             include_types = 'MusicAlbum,Audio'
         else:
             # 基础类型映射
-            if self.__is_single_image_style():
+            if self.__is_single_image_style(job.style):
                 include_types = {
                     "PremiereDate": "Movie,Series",
                     "DateCreated": "Movie,Episode",
@@ -3359,41 +4719,179 @@ class MediaCoverGeneratorAshan(_PluginBase):
                     # 其他排序方式默认使用 Series 获取海报
                     include_types = "Movie,Series"
             logger.debug(f"媒体库筛选类型: {include_types}, 排序方式: {self._sort_by}")
-        self._seen_keys = set()
-        for attempt in range(max_attempts):
-            if self._event.is_set():
-                logger.info("检测到停止信号，中断媒体项获取 ...")
-                return False
-                
-            batch_items = self.__get_items_batch(service, parent_id,
-                                              offset=offset, limit=batch_size,
-                                              include_types=include_types)
-            
-            if not batch_items:
-                break  # 没有更多项目可获取
-                
-            # 筛选有效项目（有所需图片的项目）
-            valid_items = self.__filter_valid_items(batch_items)
-            items.extend(valid_items)
-            
-            # 如果已经有足够的有效项目，则停止获取
-            if len(items) >= required_items:
-                break
-                
-            offset += batch_size
-        
+
+        incremental = job.monitor_sort == 'DateCreated' or self._sort_by == 'DateCreated'
+        if job.monitor_sort:
+            # 入库监控模式下 __get_items_batch 固定查询电影与剧集
+            include_types = 'Movie,Episode'
+        cache_key = f"{service.name}-{library_id}"
+        cache_signature = f"{include_types}|{required_items}|{job.style}|{bool(self._use_primary)}"
+        if incremental:
+            cached_items = self.__select_items_incremental(job, parent_id, include_types, required_items,
+                                                           cache_key, cache_signature)
+            if cached_items:
+                return cached_items
+
+        items, newest_created = self.__scan_library_items(job, parent_id, include_types, required_items)
+        if self._event.is_set():
+            logger.info("检测到停止信号，中断媒体项获取 ...")
+            return []
+
         # 使用获取到的有效项目更新封面
         if len(items) > 0:
             logger.info(f"媒体库 {service.name}：{library['Name']} 找到 {len(items)} 个有效项目")
-            if self.__is_single_image_style():
-                return self.__update_single_image(service, library, title, items[0])
-            else:
-                return self.__update_grid_image(service, library, title, items[:required_items])
+            if incremental and newest_created:
+                self.__save_selection_cache(cache_key, cache_signature, newest_created, items[:required_items],
+                                            full_scan=True)
+            return items[:1] if self.__is_single_image_style(job.style) else items[:required_items]
         else:
             logger.warning(f"媒体库 {service.name}：{library['Name']} 无法找到有效的图片项目 (筛选类型: {include_types})")
-            return False
+            return []
         
-    def __handle_boxset_library(self, service, library, title):
+    def __next_page_size(self, scanned: int, valid: int, required_items: int) -> int:
+        """
+        按已扫描页的有效率估算凑够剩余数量所需的页大小
+        """
+        if scanned <= 0:
+            return self.ITEM_PAGE_INITIAL
+        hit_rate = max(valid / scanned, self.ITEM_PAGE_MIN_HIT_RATE)
+        missing = max(1, required_items - valid)
+        size = int(math.ceil(missing / hit_rate * 1.5))
+        size = max(self.ITEM_PAGE_MIN, min(size, self.ITEM_PAGE_MAX))
+        return min(size, max(1, self.ITEM_SCAN_LIMIT - scanned))
+
+    def __scan_library_items(self, job: LibraryJob, parent_id: str, include_types: str,
+                             required_items: int) -> Tuple[List[dict], Optional[str]]:
+        """
+        分页扫描媒体库，直到凑够有效项目或达到扫描上限。
+        页大小按有效率自适应；当前页预计不够时提前请求下一页，与当前页的解析筛选重叠
+        返回 (有效项目, 最新入库时间)
+        """
+        service = job.service
+        items: List[dict] = []
+        newest_created = None
+        scanned = 0
+        pages = 0
+        offset = 0
+        job.seen_keys = set()
+
+        def fetch(page_offset: int, page_size: int) -> List[dict]:
+            return self.__get_items_batch(service, parent_id, offset=page_offset, limit=page_size,
+                                          include_types=include_types, monitor_sort=job.monitor_sort)
+
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"prefetch-{job.library_name}")
+        prefetch = None
+        try:
+            page_size = self.__next_page_size(0, 0, required_items)
+            # 第一页在当前线程流式读取，凑够即停止读取
+            page = self.__iter_items(service, parent_id, offset=0, limit=page_size,
+                                     include_types=include_types, monitor_sort=job.monitor_sort)
+            while page is not None:
+                pages += 1
+                page_count = 0
+                next_offset = offset + page_size
+                for item in page:
+                    if self._event.is_set():
+                        return items, newest_created
+                    page_count += 1
+                    scanned += 1
+                    if newest_created is None:
+                        newest_created = item.get("DateCreated")
+                    # 筛选有效项目（有所需图片的项目）
+                    items.extend(self.__filter_valid_items([item], job.seen_keys, job.style))
+                    # 已经有足够的有效项目时停止读取本页剩余内容
+                    if len(items) >= required_items:
+                        break
+                    # 本页已读取足够样本且按当前有效率预计凑不够时，预取下一页
+                    if prefetch is None and next_offset < self.ITEM_SCAN_LIMIT \
+                            and page_count >= min(10, max(1, page_size // 4)):
+                        expected = len(items) + (page_size - page_count) * len(items) / scanned
+                        if expected < required_items:
+                            next_size = self.__next_page_size(scanned, len(items), required_items)
+                            prefetch = (next_offset, next_size, executor.submit(fetch, next_offset, next_size))
+
+                if hasattr(page, "close"):
+                    # 提前停止时关闭流式响应
+                    page.close()
+                if len(items) >= required_items or page_count < page_size or scanned >= self.ITEM_SCAN_LIMIT:
+                    break
+                if prefetch is None:
+                    next_size = self.__next_page_size(scanned, len(items), required_items)
+                    prefetch = (next_offset, next_size, executor.submit(fetch, next_offset, next_size))
+                offset, page_size, future = prefetch
+                prefetch = None
+                page = future.result()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        hit_rate = len(items) / scanned if scanned else 0
+        logger.info(f"媒体库 {job.server}：{job.library_name} 扫描 {scanned} 个项目（{pages} 页），"
+                    f"有效 {len(items)} 个，命中率 {hit_rate:.0%}")
+        return items, newest_created
+
+    def __select_items_incremental(self, job: LibraryJob, parent_id: str, include_types: str,
+                                   required_items: int, cache_key: str, cache_signature: str) -> List[dict]:
+        """
+        按入库时间排序时，只查询水位线之后新入库的媒体项，与上次的选中结果合并；
+        缓存缺失、失效或合并后数量不足时返回空列表，由调用方全量扫描
+        """
+        with self._selection_lock:
+            record = (self.get_data('selection_cache') or {}).get(cache_key)
+        if not record or record.get("signature") != cache_signature or not record.get("watermark"):
+            return []
+        if time.time() - float(record.get("timestamp", 0)) > self.SELECTION_CACHE_TTL:
+            logger.debug(f"媒体库 {job.server}：{job.library_name} 增量缓存已过期，全量扫描")
+            return []
+
+        watermark = record["watermark"]
+        new_items = []
+        offset = 0
+        batch_size = 50
+        while True:
+            if self._event.is_set():
+                return []
+            batch_items = self.__get_items_batch(job.service, parent_id, offset=offset, limit=batch_size,
+                                                 include_types=include_types, monitor_sort=job.monitor_sort,
+                                                 min_date_saved=watermark)
+            # 结果按入库时间倒序，遇到不晚于水位线的项即可停止
+            fresh = [item for item in batch_items if str(item.get("DateCreated") or "") > watermark]
+            new_items.extend(fresh)
+            if len(fresh) < len(batch_items) or len(batch_items) < batch_size or len(new_items) >= required_items:
+                break
+            offset += batch_size
+
+        job.seen_keys = set()
+        items = self.__filter_valid_items(new_items + list(record.get("items") or []), job.seen_keys, job.style)
+        if len(items) < required_items:
+            return []
+        items = items[:required_items]
+        newest_created = new_items[0].get("DateCreated") if new_items else watermark
+        if new_items:
+            self.__save_selection_cache(cache_key, cache_signature, newest_created, items)
+        logger.info(f"媒体库 {job.server}：{job.library_name} 增量查询到 {len(new_items)} 个新入库项目，"
+                    f"与缓存合并后选中 {len(items)} 个")
+        return items[:1] if self.__is_single_image_style(job.style) else items
+
+    def __save_selection_cache(self, cache_key: str, signature: str, watermark: str, items: List[dict],
+                               full_scan: bool = False):
+        slim_items = [
+            {k: item[k] for k in self.SELECTION_CACHE_FIELDS if k in item}
+            for item in items
+        ]
+        with self._selection_lock:
+            cache = self.get_data('selection_cache') or {}
+            previous = cache.get(cache_key) or {}
+            cache[cache_key] = {
+                "signature": signature,
+                "watermark": watermark,
+                "items": slim_items,
+                # 仅全量扫描刷新时间，保证缓存到期后会重新全量校验一次
+                "timestamp": time.time() if full_scan else previous.get("timestamp", time.time()),
+            }
+            self.save_data('selection_cache', cache)
+
+    def __handle_boxset_library(self, job: LibraryJob) -> List[dict]:
+        service, library = job.service, job.library
 
         include_types = 'BoxSet,Movie'
         if service.type == 'emby':
@@ -3402,48 +4900,74 @@ class MediaCoverGeneratorAshan(_PluginBase):
             library_id = library.get("ItemId")
         parent_id = library_id
         boxsets = self.__get_items_batch(service, parent_id,
-                                      include_types=include_types)
+                                      include_types=include_types,
+                                      monitor_sort=job.monitor_sort)
         
-        required_items = self.__get_required_items()
+        required_items = self.__get_required_items(job.style)
         valid_items = []
         
         # 首先检查BoxSet本身是否有合适的图片
-        self._seen_keys = set()
+        job.seen_keys = set()
 
-        valid_boxsets = self.__filter_valid_items(boxsets)
+        valid_boxsets = self.__filter_valid_items(boxsets, job.seen_keys, job.style)
         valid_items.extend(valid_boxsets)
         
         # 如果BoxSet本身没有足够的图片，则获取其中的电影
         if len(valid_items) < required_items:
-            for boxset in boxsets:
-                if len(valid_items) >= required_items:
-                    break
-                    
-                # 获取此BoxSet中的电影
-                movies = self.__get_items_batch(service,
-                                             parent_id=boxset['Id'], 
-                                             include_types=include_types)
-                
-                valid_movies = self.__filter_valid_items(movies)
-                valid_items.extend(valid_movies)
-                
-                if len(valid_items) >= required_items:
-                    break
+            self.__expand_children(job, boxsets, include_types, valid_items, required_items)
         
         # 使用获取到的有效项目更新封面
         if len(valid_items) > 0:
-            if self.__is_single_image_style():
-                return self.__update_single_image(service, library, title, valid_items[0])
-            else:
-                return self.__update_grid_image(service, library, title, valid_items[:required_items])
+            return valid_items[:1] if self.__is_single_image_style(job.style) else valid_items[:required_items]
         else:
             print(f"媒体库 {service.name}：{library['Name']} 无法找到有效的图片项目")
-            return False
+            return []
         
-    def __handle_playlist_library(self, service, library, title):
+    def __expand_children(self, job: LibraryJob, containers: List[dict], include_types: str,
+                          valid_items: List[dict], required_items: int):
+        """
+        并发获取合集/播放列表中的子项，结果按容器原顺序合并到 valid_items，保证封面选图稳定；
+        凑够数量或收到停止信号后取消尚未开始的请求
+        """
+        containers = [c for c in containers if c.get('Id')]
+        if not containers:
+            return
+        workers = max(1, min(len(containers), self._server_health.current_limit(job.server)))
+
+        def fetch(container: dict) -> List[dict]:
+            if self._event.is_set():
+                return []
+            return self.__get_items_batch(job.service,
+                                          parent_id=container['Id'],
+                                          include_types=include_types,
+                                          monitor_sort=job.monitor_sort)
+
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"expand-{job.library_name}")
+        futures = {}
+        next_submit = 0
+        try:
+            for index in range(len(containers)):
+                # 保持最多 workers 个请求在途
+                while next_submit < len(containers) and next_submit < index + workers:
+                    futures[next_submit] = executor.submit(fetch, containers[next_submit])
+                    next_submit += 1
+                children = futures.pop(index).result()
+                if self._event.is_set():
+                    logger.info("检测到停止信号，中断合集子项获取 ...")
+                    return
+                valid_items.extend(self.__filter_valid_items(children, job.seen_keys, job.style))
+                if len(valid_items) >= required_items:
+                    return
+        finally:
+            for future in futures.values():
+                future.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def __handle_playlist_library(self, job: LibraryJob) -> List[dict]:
         """ 
         播放列表图片获取 
         """
+        service, library = job.service, job.library
         include_types = 'Playlist,Movie,Series,Episode,Audio'
         if service.type == 'emby':
             library_id = library.get("Id")
@@ -3451,86 +4975,101 @@ class MediaCoverGeneratorAshan(_PluginBase):
             library_id = library.get("ItemId")
         parent_id = library_id
         playlists = self.__get_items_batch(service, parent_id,
-                                      include_types=include_types)
+                                      include_types=include_types,
+                                      monitor_sort=job.monitor_sort)
         
-        required_items = self.__get_required_items()
+        required_items = self.__get_required_items(job.style)
         valid_items = []
         
         # 首先检查 playlist 本身是否有合适的图片
-        self._seen_keys = set()
+        job.seen_keys = set()
 
-        valid_playlists = self.__filter_valid_items(playlists)
+        valid_playlists = self.__filter_valid_items(playlists, job.seen_keys, job.style)
         valid_items.extend(valid_playlists)
         
         # 如果 playlist 本身没有足够的图片，则获取其中的电影
         if len(valid_items) < required_items:
-            for playlist in playlists:
-                if len(valid_items) >= required_items:
-                    break
-                    
-                # 获取此 playlist 中的电影
-                movies = self.__get_items_batch(service,
-                                             parent_id=playlist['Id'], 
-                                             include_types=include_types)
-                
-                valid_movies = self.__filter_valid_items(movies)
-                valid_items.extend(valid_movies)
-                
-                if len(valid_items) >= required_items:
-                    break
+            self.__expand_children(job, playlists, include_types, valid_items, required_items)
         
         # 使用获取到的有效项目更新封面
         if len(valid_items) > 0:
-            if self.__is_single_image_style():
-                return self.__update_single_image(service, library, title, valid_items[0])
-            else:
-                return self.__update_grid_image(service, library, title, valid_items[:required_items])
+            return valid_items[:1] if self.__is_single_image_style(job.style) else valid_items[:required_items]
         else:
             print(f"警告: 无法为播放列表 {service.name}：{library['Name']} 找到有效的图片项目")
-            return False
+            return []
         
-    def __get_items_batch(self, service, parent_id, offset=0, limit=20, include_types=None):
-        # 调用API获取项目
+    def __build_items_query(self, parent_id, offset=0, limit=20, include_types=None, monitor_sort='',
+                            min_date_saved=None) -> str:
+        """
+        构建媒体项查询地址，只请求筛选与取图所需的字段和图片类型
+        """
+        sort_by = self._sort_by or 'Random'
+        if monitor_sort:
+            sort_by = 'DateCreated'
+            # 转移监控模式下强制包含 Episode 以获取最新入库的内容
+            include_types = 'Movie,Episode'
+        if not include_types:
+            include_types = 'Movie,Series'
+
+        # ImageTags/BackdropImageTags/ParentBackdrop*/Series*/Album* 属于基础字段，无需在 Fields 中声明
+        fields = ['DateCreated'] if sort_by == 'DateCreated' else []
+        if self._share_mirrored_renders:
+            # 跨服务器共享渲染按提供商 ID 比对所选媒体项
+            fields.append('ProviderIds')
+        url = f'[HOST]emby/Items/?api_key=[APIKEY]' \
+              f'&ParentId={parent_id}&SortBy={sort_by}&Limit={limit}' \
+              f'&StartIndex={offset}&IncludeItemTypes={include_types}' \
+              f'&Recursive=True&SortOrder=Descending' \
+              f'&Fields={",".join(fields)}' \
+              f'&EnableImageTypes=Primary,Backdrop&ImageTypeLimit=1' \
+              f'&EnableUserData=false&EnableTotalRecordCount=false'
+        if min_date_saved:
+            # 新入库的媒体 DateLastSaved 不早于 DateCreated，用作服务端预筛选
+            url += f'&MinDateLastSaved={quote(min_date_saved)}'
+        return url
+
+    def __iter_items(self, service, parent_id, offset=0, limit=20, include_types=None, monitor_sort='',
+                     min_date_saved=None):
+        """
+        逐个产出媒体项；使用连接池时流式解析响应，调用方停止迭代后不再读取剩余内容
+        """
+        if not service:
+            return
+        url = self.__build_items_query(parent_id, offset=offset, limit=limit, include_types=include_types,
+                                       monitor_sort=monitor_sort, min_date_saved=min_date_saved)
         try:
-            if not service:
-                return []
-            
+            res = self.__get_data(service, url, stream=True)
+            # 错误状态的 Response 布尔值为 False，必须在关闭响应的 try 中判断，否则流式连接不会归还连接池
+            if res is None:
+                return
             try:
-                if not self._sort_by:
-                    sort_by = 'Random'
+                if getattr(res, "status_code", 200) != 200:
+                    logger.error(f"获取媒体项失败：HTTP {res.status_code}")
+                    return
+                if hasattr(res, "iter_content"):
+                    yield from iter_json_array(res, "Items")
                 else:
-                    sort_by = self._sort_by
-                if self._monitor_sort:
-                    sort_by = 'DateCreated'
-                    # 转移监控模式下强制包含 Episode 以获取最新入库的内容
-                    include_types = 'Movie,Episode'
-                if not include_types:
-                    include_types = 'Movie,Series'
-
-                url = f'[HOST]emby/Items/?api_key=[APIKEY]' \
-                      f'&ParentId={parent_id}&SortBy={sort_by}&Limit={limit}' \
-                      f'&StartIndex={offset}&IncludeItemTypes={include_types}' \
-                      f'&Recursive=True&SortOrder=Descending'
-
-                res = service.instance.get_data(url=url)
-                if res:
-                    data = res.json()
-                    return data.get("Items", [])
-            except Exception as err:
-                logger.error(f"获取媒体项失败：{str(err)}")
-            return []
-                
+                    yield from (res.json() or {}).get("Items", [])
+            finally:
+                close = getattr(res, "close", None)
+                if close:
+                    close()
         except Exception as err:
-            logger.error(f"Failed to get latest items: {str(err)}")
-            return []
-        
-    def __filter_valid_items(self, items):
-        """筛选有效的项目（包含所需图片的项目），并按图片标签去重"""
+            logger.error(f"获取媒体项失败：{str(err)}")
+
+    def __get_items_batch(self, service, parent_id, offset=0, limit=20, include_types=None, monitor_sort='',
+                          min_date_saved=None):
+        return list(self.__iter_items(service, parent_id, offset=offset, limit=limit,
+                                      include_types=include_types, monitor_sort=monitor_sort,
+                                      min_date_saved=min_date_saved))
+
+    def __filter_valid_items(self, items, seen_keys: set, style: str):
+        """筛选有效的项目（包含所需图片的项目），并按图片标签去重，seen_keys 为当前任务的去重集合，style 为当前任务的风格"""
         valid_items = []
 
         for item in items:
             # 1) 根据当前样式计算真实会使用的图片URL
-            image_url = self.__get_image_url(item)
+            image_url = self.__get_image_url(item, style)
             if not image_url:
                 continue
 
@@ -3543,15 +5082,15 @@ class MediaCoverGeneratorAshan(_PluginBase):
             if not content_key and not image_key:
                 continue
 
-            if (content_key and content_key in self._seen_keys) or (image_key and image_key in self._seen_keys):
+            if (content_key and content_key in seen_keys) or (image_key and image_key in seen_keys):
                 continue
 
             # 3) 加入有效列表并记录已处理的 Key
             valid_items.append(item)
             if content_key:
-                self._seen_keys.add(content_key)
+                seen_keys.add(content_key)
             if image_key:
-                self._seen_keys.add(image_key)
+                seen_keys.add(image_key)
 
         return valid_items
 
@@ -3598,80 +5137,6 @@ class MediaCoverGeneratorAshan(_PluginBase):
 
 
     
-    def __update_single_image(self, service, library, title, item):
-        """更新单图封面"""
-        logger.info(f"媒体库 {service.name}：{library['Name']} 从媒体项获取图片")
-        updated_item_id = ''
-        image_url = self.__get_image_url(item)
-        if not image_url:
-            return False
-            
-        image_path = self.__download_image(service, image_url, library['Name'], count=1)
-        if not image_path:
-            return False
-        updated_item_id = self.__get_item_id(item)
-        # 从配置获取背景颜色
-        title_result = self.__get_title_from_config(library['Name'])
-        config_bg_color = title_result[2] if len(title_result) == 3 else None
-        image_data = self.__generate_image_from_path(service.name, library['Name'], title, image_path, config_bg_color)
-            
-        if not image_data:
-            return False
-        if service.type == 'emby':
-            library_id = library.get("Id")
-        else:
-            library_id = library.get("ItemId")
-        # 更新id
-        self.update_cover_history(
-            server=service.name, 
-            library_id=library_id, 
-            item_id=updated_item_id
-        )
-
-        return image_data
-    
-    def __update_grid_image(self, service, library, title, items):
-        """更新九宫格封面"""
-        logger.info(f"媒体库 {service.name}：{library['Name']} 从媒体项获取图片")
-
-        image_paths = []
-        
-        updated_item_ids = []
-        for i, item in enumerate(items):
-            if self._event.is_set():
-                logger.info("检测到停止信号，中断图片下载 ...")
-                return False
-            image_url = self.__get_image_url(item)
-            if image_url:
-                image_path = self.__download_image(service, image_url, library['Name'], count=i+1)
-                if image_path:
-                    image_paths.append(image_path)
-                    updated_item_ids.append(self.__get_item_id(item))
-        
-        if len(image_paths) < 1:
-            return False
-            
-        # 生成九宫格图片
-        # 从配置获取背景颜色
-        title_result = self.__get_title_from_config(library['Name'])
-        config_bg_color = title_result[2] if len(title_result) == 3 else None
-        image_data = self.__generate_image_from_path(service.name, library['Name'], title, None, config_bg_color)
-        if not image_data:
-            return False
-        if service.type == 'emby':
-            library_id = library.get("Id")
-        else:
-            library_id = library.get("ItemId")
-        # 更新ids
-        for item_id in reversed(updated_item_ids):
-            self.update_cover_history(
-                server=service.name, 
-                library_id=library_id, 
-                item_id=item_id
-            )
-            
-        return image_data
-    
     def __load_title_config(self, yaml_str: str) -> dict:
         try:
             # 替换全角冒号为半角
@@ -3937,7 +5402,80 @@ class MediaCoverGeneratorAshan(_PluginBase):
             current_zh_font=self._zh_font_path,
         )
     
-    def __get_server_libraries(self, service):
+    def __get_data(self, service, url: str, stream: bool = False, kind: str = "api"):
+        """
+        GET 请求媒体服务器，受单服务器并发上限约束；stream 仅在使用连接池时生效，
+        kind 为请求类型（api/image），各类请求分别统计耗时
+        """
+        def send():
+            if self._session_pool and self._session_pool.supports(service):
+                return self._session_pool.get(service, url, stream=stream)
+            return service.instance.get_data(url=url)
+        return self.__tracked_request(service, send, kind=kind, stream=stream)
+
+    def __post_data(self, service, url: str, data=None, headers: Optional[dict] = None, kind: str = "api"):
+        """
+        POST 请求媒体服务器，受单服务器并发上限约束
+        """
+        def send():
+            if self._session_pool and self._session_pool.supports(service):
+                return self._session_pool.post(service, url, data=data, headers=headers)
+            return service.instance.post_data(url=url, data=data, headers=headers)
+        return self.__tracked_request(service, send, kind=kind)
+
+    def __tracked_request(self, service, send, kind: str = "api", stream: bool = False):
+        """
+        在服务器请求槽位内发送请求并记录耗时与结果；服务器熔断中时不发送，直接返回 None。
+        流式响应在关闭时才记录耗时并释放槽位，使并发上限覆盖响应内容的传输
+        """
+        health = self._server_health
+        if not health:
+            return send()
+        try:
+            health.acquire(service.name)
+        except CircuitOpenError:
+            logger.debug(f"媒体服务器 {service.name} 熔断中，跳过请求")
+            return None
+        started = time.monotonic()
+        res = None
+
+        def finish():
+            # 无响应、5xx 与 429 视为服务器异常，4xx 属于请求本身的问题
+            healthy = res is not None and res.status_code < 500 and res.status_code != 429
+            health.record(service.name, healthy, time.monotonic() - started, kind)
+            health.release(service.name)
+
+        try:
+            res = send()
+        except BaseException:
+            finish()
+            raise
+        if not stream or res is None or not hasattr(res, "iter_content"):
+            finish()
+            return res
+
+        original_close = res.close
+        finished = threading.Lock()
+
+        def close():
+            try:
+                original_close()
+            finally:
+                if finished.acquire(blocking=False):
+                    finish()
+
+        res.close = close
+        return res
+
+    def __get_server_libraries(self, service, refresh: bool = False):
+        """
+        获取媒体库列表，优先使用缓存
+        """
+        if not service:
+            return []
+        return self._library_cache.get(service.name, lambda: self.__fetch_server_libraries(service), refresh=refresh)
+
+    def __fetch_server_libraries(self, service):
         try:
             if not service:
                 return []
@@ -3946,7 +5484,7 @@ class MediaCoverGeneratorAshan(_PluginBase):
                     url = f'[HOST]emby/Library/VirtualFolders/Query?api_key=[APIKEY]'
                 else:
                     url = f'[HOST]emby/Library/VirtualFolders/?api_key=[APIKEY]'
-                res = service.instance.get_data(url=url)
+                res = self.__get_data(service, url)
                 if res:
                     data = res.json()
                     if service.type == 'emby':
@@ -3980,9 +5518,32 @@ class MediaCoverGeneratorAshan(_PluginBase):
             logger.error(f"获取所有媒体库失败：{str(err)}")
             return []
         
-    def __get_image_url(self, item):
+    def __get_image_fetch_width(self, style: str) -> int:
         """
-        从媒体项信息中获取图片URL
+        按风格的画布宽度计算下载图片的最大宽度，保留余量供模糊与裁切使用
+        """
+        if style.startswith("animated"):
+            # 动态封面固定以 320x180 生成
+            canvas_width = 320
+        else:
+            resolution_config = self._resolution_config or ResolutionConfig(self._resolution)
+            canvas_width = resolution_config.width
+        width = int(canvas_width * self.IMAGE_FETCH_HEADROOM)
+        return max(self.IMAGE_FETCH_MIN_WIDTH, min(width, self.IMAGE_FETCH_MAX_WIDTH))
+
+    def __with_size_hint(self, image_url: str, style: str) -> str:
+        """
+        为媒体服务器图片地址追加缩放参数，由服务器端缩小后再下载
+        画布均为横向，限制宽度即可保证缩放后的图片仍能覆盖画布
+        """
+        if not image_url or '[HOST]' not in image_url or 'maxWidth=' in image_url:
+            return image_url
+        return f"{image_url}&maxWidth={self.__get_image_fetch_width(style)}" \
+               f"&quality={self.IMAGE_FETCH_QUALITY}&format=jpg"
+
+    def __get_image_url(self, item, style: str):
+        """
+        从媒体项信息中获取图片URL，所用图片类型取决于风格
         """
         # Emby/Jellyfin
         if item['Type'] in 'MusicAlbum,Audio':
@@ -3999,7 +5560,7 @@ class MediaCoverGeneratorAshan(_PluginBase):
                 tag = item.get("AlbumPrimaryImageTag")
                 return f'[HOST]emby/Items/{item_id}/Images/Primary?tag={tag}&api_key=[APIKEY]'
 
-        elif self._cover_style == 'static_3' or self._cover_style in ['animated_1', 'animated_2', 'animated_3', 'animated_4']:
+        elif style == 'static_3' or style in ['animated_1', 'animated_2', 'animated_3', 'animated_4']:
             if self._use_primary:
                 if item.get("Type") == 'Episode':
                     if item.get("SeriesPrimaryImageTag"):
@@ -4045,7 +5606,7 @@ class MediaCoverGeneratorAshan(_PluginBase):
                     tag = item.get("ImageTags").get("Primary")
                     return f'[HOST]emby/Items/{item_id}/Images/Primary?tag={tag}&api_key=[APIKEY]'
 
-        elif self._cover_style.startswith('static'):
+        elif style.startswith('static'):
             if self._use_primary:
                 if item.get("Type") == 'Episode':
                     if item.get("SeriesPrimaryImageTag"):
@@ -4091,7 +5652,7 @@ class MediaCoverGeneratorAshan(_PluginBase):
                     tag = item.get("ImageTags").get("Primary")
                     return f'[HOST]emby/Items/{item_id}/Images/Primary?tag={tag}&api_key=[APIKEY]'
             
-    def __get_item_id(self, item):
+    def __get_item_id(self, item, style: str):
         """
         从媒体项信息中获取项目ID
         """
@@ -4104,7 +5665,7 @@ class MediaCoverGeneratorAshan(_PluginBase):
             elif item.get("AlbumPrimaryImageTag"):
                 item_id = item.get("AlbumId")
 
-        elif self._cover_style == 'static_3' or self._cover_style in ['animated_1', 'animated_2', 'animated_3', 'animated_4']:
+        elif style == 'static_3' or style in ['animated_1', 'animated_2', 'animated_3', 'animated_4']:
             if self._use_primary:
                 if (item.get("ImageTags") and item.get("ImageTags").get("Primary")) \
                     or (item.get("BackdropImageTags") and len(item["BackdropImageTags"]) > 0):
@@ -4118,7 +5679,7 @@ class MediaCoverGeneratorAshan(_PluginBase):
                     or (item.get("BackdropImageTags") and len(item["BackdropImageTags"]) > 0):
                     item_id = item.get("Id")
 
-        elif self._cover_style.startswith('static'):
+        elif style.startswith('static'):
             if self._use_primary:
                 if (item.get("BackdropImageTags") and len(item["BackdropImageTags"]) > 0) \
                     or (item.get("ImageTags") and item.get("ImageTags").get("Primary")):
@@ -4138,7 +5699,7 @@ class MediaCoverGeneratorAshan(_PluginBase):
         """
         下载图片，保存到本地目录 self._covers_path/library_name/ 下，文件名为 1-9.jpg
         若已存在则跳过下载，直接返回图片路径。
-        下载失败时重试若干次。
+        下载失败时按指数退避重试若干次，退避只阻塞当前下载且可被停止信号打断。
         """
         try:
             # 确保媒体库名称是安全的文件名（处理数字或字母开头的名称）
@@ -4160,6 +5721,18 @@ class MediaCoverGeneratorAshan(_PluginBase):
             # if os.path.exists(filepath):
             #     return filepath
 
+            # 命中海报缓存时直接链接到工作目录
+            cache = self._poster_cache
+            cache_key = self.__build_poster_cache_key(service, imageurl) if cache else None
+            if cache_key:
+                cached_path = cache.get(cache_key)
+                if cached_path:
+                    try:
+                        cache.link(cached_path, filepath)
+                        return filepath
+                    except OSError as e:
+                        logger.debug(f"海报缓存文件不可用，重新下载: {e}")
+
             # 重试机制
             for attempt in range(1, retries + 1):
                 image_content = None
@@ -4168,7 +5741,7 @@ class MediaCoverGeneratorAshan(_PluginBase):
                     if not service:
                         return None
 
-                    r = service.instance.get_data(url=imageurl)
+                    r = self.__get_data(service, imageurl, kind="image")
                     if r and r.status_code == 200:
                         image_content = r.content
                 else:
@@ -4178,14 +5751,26 @@ class MediaCoverGeneratorAshan(_PluginBase):
 
                 # 如果成功，保存并返回
                 if image_content:
+                    cached_path = cache.put(cache_key, image_content) if cache_key else None
+                    if cached_path:
+                        try:
+                            cache.link(cached_path, filepath)
+                            return filepath
+                        except OSError:
+                            pass
+                    # 工作目录文件可能是缓存的硬链接，先删除再写入，避免改写缓存内容
+                    Path(filepath).unlink(missing_ok=True)
                     with open(filepath, 'wb') as f:
                         f.write(image_content)
                     return filepath
 
-                # 如果失败，记录并等待后重试
+                # 如果失败，记录并等待后重试；服务器已熔断时不再重试
                 logger.warning(f"第 {attempt} 次尝试下载失败：{imageurl}")
-                if attempt < retries:
-                    time.sleep(delay)
+                if service and self._server_health and self._server_health.is_open(service.name):
+                    logger.warning(f"媒体服务器 {service.name} 熔断中，放弃下载：{imageurl}")
+                    return None
+                if attempt < retries and self._event.wait(delay * 2 ** (attempt - 1)):
+                    return None
 
             logger.error(f"图片下载失败（重试 {retries} 次）：{imageurl}")
             return None
@@ -4195,6 +5780,26 @@ class MediaCoverGeneratorAshan(_PluginBase):
             return None
 
 
+    @staticmethod
+    def __build_poster_cache_key(service, imageurl: str) -> Optional[str]:
+        """
+        从媒体服务器图片地址解析 (服务器, 媒体项, 图片类型, tag, 尺寸) 作为缓存键，无 tag 时不缓存
+        """
+        if not service or '[HOST]' not in imageurl:
+            return None
+        path_match = re.search(r"/Items/([^/?]+)/Images/([^?]+)", imageurl)
+        tag_match = re.search(r"[?&]tag=([^&]+)", imageurl)
+        if not path_match or not tag_match:
+            return None
+        size_match = re.search(r"[?&]maxWidth=(\d+)", imageurl)
+        return PosterCache.make_key(
+            service.name,
+            path_match.group(1),
+            path_match.group(2),
+            tag_match.group(1),
+            size_match.group(1) if size_match else None,
+        )
+
     def __save_image_to_local(self, image_content, server_name: str, library_name: str, extension: str) -> Optional[Path]:
         """
         保存图片到本地路径
@@ -4222,20 +5827,19 @@ class MediaCoverGeneratorAshan(_PluginBase):
             logger.error(f"保存图片到本地失败: {str(err)}")
             return None
 
-    def __write_cover_temp_file(self, image_content: bytes, extension: str) -> Optional[Path]:
-        """将封面落地到插件临时目录，确保上传使用完整本地文件。"""
+    def __save_image_to_local_async(self, image: RenderResult, server_name: str, library_name: str):
+        """在后台线程保存历史封面"""
+        if not self._save_recent_covers:
+            return
+        with self._history_executor_lock:
+            if self._history_executor is None:
+                self._history_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cover-history")
+            executor = self._history_executor
         try:
-            temp_dir = self.get_data_path() / "temp_upload"
-            temp_dir.mkdir(parents=True, exist_ok=True)
-            ext = extension.strip(".").lower() if extension else "jpg"
-            tmp_name = f"cover_{int(time.time() * 1000)}.{ext}"
-            temp_file = temp_dir / tmp_name
-            with open(temp_file, "wb") as f:
-                f.write(image_content)
-            return temp_file
-        except Exception as err:
-            logger.error(f"写入临时封面文件失败: {err}")
-            return None
+            executor.submit(self.__save_image_to_local, image.data, server_name, library_name, image.extension)
+        except RuntimeError:
+            # 执行器已关闭（插件停止中），直接同步保存
+            self.__save_image_to_local(image.data, server_name, library_name, image.extension)
 
     def __trim_saved_cover_history(self, local_path: str, safe_server: str, safe_library: str):
         limit = self.__clamp_value(
@@ -4268,12 +5872,10 @@ class MediaCoverGeneratorAshan(_PluginBase):
             logger.warning(f"清理历史封面失败: {e}")
         
 
-    def __set_library_image(self, service, library, image_base64):
+    def __set_library_image(self, service, library, image: RenderResult):
         """
-        设置媒体库封面
+        设置媒体库封面，直接上传渲染结果的二进制内容，仅在兼容兜底时编码为 base64
         """
-
-        """设置Emby媒体库封面"""
         try:
             if service.type == 'emby':
                 library_id = library.get("Id")
@@ -4281,54 +5883,33 @@ class MediaCoverGeneratorAshan(_PluginBase):
                 library_id = library.get("ItemId")
             
             url = f'[HOST]emby/Items/{library_id}/Images/Primary?api_key=[APIKEY]'
-            # 根据 base64 前几个字节简单判断格式
-            content_type = "image/png"
-            extension = "png"
-            if image_base64.startswith("R0lG"):
-                content_type = "image/gif"
-                extension = "gif"
-            elif image_base64.startswith("UklG"):
-                content_type = "image/webp"
-                extension = "webp"
-            elif image_base64.startswith("iVBOR"):
-                content_type = "image/png"
-                extension = "png"
-            elif image_base64.startswith("/9j/"):
-                content_type = "image/jpeg"
-                extension = "jpg"
-
-            try:
-                image_bytes = base64.b64decode(image_base64)
-            except Exception as decode_err:
-                logger.error(f"封面Base64解码失败: {decode_err}")
+            image = RenderResult.from_output(image)
+            if not image:
+                logger.error("封面内容为空，无法上传")
                 return False
-
-            # 本地先生成完整文件，再从文件上传，避免直接 base64 发送导致 Emby 不生效。
-            saved_file = self.__save_image_to_local(image_bytes, service.name, library['Name'], extension)
-            temp_file = self.__write_cover_temp_file(image_bytes, extension)
-
-            upload_bytes = image_bytes
+            content_type = image.mime
+            upload_bytes = image.data
             upload_source = "memory"
-            try:
-                source_file = temp_file or saved_file
-                if source_file and source_file.exists():
-                    upload_bytes = source_file.read_bytes()
-                    upload_source = str(source_file)
-            except Exception as read_err:
-                logger.warning(f"读取本地封面文件失败，将回退内存上传: {read_err}")
 
-            logger.info(f"上传封面来源: {upload_source}")
+            # 历史封面在后台保存，不占用上传路径
+            self.__save_image_to_local_async(image, service.name, library['Name'])
 
-            res = service.instance.post_data(
-                url=url,
+            res = self.__post_data(
+                service,
+                url,
                 data=upload_bytes,
                 headers={
                     "Content-Type": content_type,
-                }
+                },
+                kind="upload"
             )
 
+            # 服务器已熔断时不再尝试其余上传方式
+            def circuit_open() -> bool:
+                return bool(self._server_health) and self._server_health.is_open(service.name)
+
             # 某些环境下 post_data 处理 bytes 时会失败，先记录一次失败详情再二进制重试。
-            if not (res and res.status_code in [200, 204]):
+            if not (res and res.status_code in [200, 204]) and not circuit_open():
                 first_status = res.status_code if res else "No response"
                 first_preview = None
                 if res is not None:
@@ -4349,34 +5930,31 @@ class MediaCoverGeneratorAshan(_PluginBase):
                 )
 
                 # 第二次重试使用更宽松的二进制内容类型。
-                res = service.instance.post_data(
-                    url=url,
+                res = self.__post_data(
+                    service,
+                    url,
                     data=upload_bytes,
                     headers={
                         "Content-Type": "application/octet-stream"
-                    }
+                    },
+                    kind="upload"
                 )
 
             # 双重二进制上传仍失败时，保留旧版 base64 最后兜底（并显式标记来源）
             used_base64_fallback = False
-            if not (res and res.status_code in [200, 204]):
+            if not (res and res.status_code in [200, 204]) and not circuit_open():
                 logger.warning("二进制上传仍未成功，尝试旧版 base64 上传兼容模式")
-                res = service.instance.post_data(
-                    url=url,
-                    data=image_base64,
+                res = self.__post_data(
+                    service,
+                    url,
+                    data=image.to_base64(),
                     headers={
                         "Content-Type": content_type
-                    }
+                    },
+                    kind="upload"
                 )
                 used_base64_fallback = True
 
-            # 清理临时文件
-            if temp_file and temp_file.exists():
-                try:
-                    temp_file.unlink(missing_ok=True)
-                except Exception:
-                    pass
-            
             if res and res.status_code in [200, 204]:
                 if used_base64_fallback:
                     self.__log_stage(
@@ -4465,43 +6043,44 @@ class MediaCoverGeneratorAshan(_PluginBase):
             "timestamp": now
         }
 
-        # 原始数据
-        history = self.get_data('cover_history') or []
+        with self._history_lock:
+            # 原始数据
+            history = self.get_data('cover_history') or []
 
-        # 用于分组管理：(server, library_id) => list of items
-        grouped = defaultdict(list)
-        for item in history:
-            key = (item["server"], str(item["library_id"]))
-            grouped[key].append(item)
+            # 用于分组管理：(server, library_id) => list of items
+            grouped = defaultdict(list)
+            for item in history:
+                key = (item["server"], str(item["library_id"]))
+                grouped[key].append(item)
 
-        key = (server, library_id)
-        items = grouped[key]
+            key = (server, library_id)
+            items = grouped[key]
 
-        # 查找是否已有该 item_id
-        existing = next((i for i in items if str(i["item_id"]) == item_id), None)
+            # 查找是否已有该 item_id
+            existing = next((i for i in items if str(i["item_id"]) == item_id), None)
 
-        if existing:
-            # 若已存在且是最新的，跳过
-            if existing["timestamp"] >= max(i["timestamp"] for i in items):
-                return
+            if existing:
+                # 若已存在且是最新的，跳过
+                if existing["timestamp"] >= max(i["timestamp"] for i in items):
+                    return
+                else:
+                    existing["timestamp"] = now
             else:
-                existing["timestamp"] = now
-        else:
-            items.append(history_item)
+                items.append(history_item)
 
-        # 排序 + 截取前9
-        grouped[key] = sorted(items, key=lambda x: x["timestamp"], reverse=True)[:9]
+            # 排序 + 截取前9
+            grouped[key] = sorted(items, key=lambda x: x["timestamp"], reverse=True)[:9]
 
-        # 重新整合所有分组的数据
-        new_history = []
-        for item_list in grouped.values():
-            new_history.extend(item_list)
+            # 重新整合所有分组的数据
+            new_history = []
+            for item_list in grouped.values():
+                new_history.extend(item_list)
 
-        self.save_data('cover_history', new_history)
-        return [ 
-            item for item in new_history
-            if str(item.get("library_id")) == str(library_id)
-        ]
+            self.save_data('cover_history', new_history)
+            return [ 
+                item for item in new_history
+                if str(item.get("library_id")) == str(library_id)
+            ]
 
     def prepare_library_images(self, library_dir: str, required_items: int = 9):
         """
@@ -5017,6 +6596,25 @@ class MediaCoverGeneratorAshan(_PluginBase):
         停止服务
         """
         try:
+            self._job_manager.cancel_all()
+            if self._transfer_queue:
+                self._transfer_queue.stop()
+                self._transfer_queue = None
+            if self._session_pool:
+                self._session_pool.close()
+                self._session_pool = None
+            if self._poster_cache:
+                self._poster_cache.flush()
+                self._poster_cache = None
+            with self._history_executor_lock:
+                history_executor, self._history_executor = self._history_executor, None
+            if history_executor:
+                # 等待已提交的历史封面写完
+                history_executor.shutdown(wait=True)
+            if self._render_backend:
+                self._render_backend.shutdown()
+                self._render_backend = None
+            shutdown_frame_executor()
             if self._scheduler:
                 self._scheduler.remove_all_jobs()
                 if self._scheduler.running:
@@ -0,0 +1,359 @@
+"""
+本地模拟媒体服务器
+实现插件用到的 Emby/Jellyfin 接口子集，用于在没有真实服务器时测量吞吐：
+- GET  /emby/Library/VirtualFolders/Query（Emby）与 /emby/Library/VirtualFolders（Jellyfin）
+- GET  /emby/Items：ParentId/Ids/StartIndex/Limit/IncludeItemTypes/SortBy/SortOrder/MinDateLastSaved
+- GET  /emby/Items/{id}/Images/{type}[/{index}]：按需生成合成海报，支持 maxWidth/quality
+- POST /emby/Items/{id}/Images/Primary：接收封面并更新媒体库的 Primary tag
+可配置固定延迟、随机抖动与错误注入，并统计请求数与收发字节数
+"""
+import colorsys
+import datetime
+import hashlib
+import io
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from PIL import Image, ImageDraw
+
+
+class FakeMediaServerStats:
+    """请求计数与收发字节数"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors_injected = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.images_served = 0
+        self.uploads = 0
+        self._lock = threading.Lock()
+
+    def add(self, **kwargs):
+        with self._lock:
+            for key, value in kwargs.items():
+                setattr(self, key, getattr(self, key) + value)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "errors_injected": self.errors_injected,
+                "bytes_sent": self.bytes_sent,
+                "bytes_received": self.bytes_received,
+                "images_served": self.images_served,
+                "uploads": self.uploads,
+            }
+
+    def reset(self):
+        with self._lock:
+            self.requests = self.errors_injected = 0
+            self.bytes_sent = self.bytes_received = 0
+            self.images_served = self.uploads = 0
+
+
+class FakeMediaServer:
+    """
+    在后台线程中运行的模拟媒体服务器，每个媒体库包含 items_per_library 个电影，
+    入库时间按序号递减，海报内容由媒体项 ID 确定，重复请求得到相同图片
+    """
+
+    API_KEY = "benchmark"
+
+    def __init__(self, libraries: int = 4, items_per_library: int = 50, server_type: str = "emby",
+                 latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 poster_size: Tuple[int, int] = (600, 900), host: str = "127.0.0.1", port: int = 0,
+                 seed: int = 0):
+        self.server_type = server_type
+        self.latency = max(0.0, float(latency))
+        self.jitter = max(0.0, float(jitter))
+        self.error_rate = min(1.0, max(0.0, float(error_rate)))
+        self.poster_size = poster_size
+        self.stats = FakeMediaServerStats()
+        # 置为 True 时所有请求返回 503，用于模拟服务器宕机
+        self.down = False
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._image_cache: Dict[Tuple[str, str, int, int], bytes] = {}
+        self._image_lock = threading.Lock()
+        self._library_tags: Dict[str, Optional[str]] = {}
+        self._libraries, self._items = self._build_catalog(libraries, items_per_library)
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self) -> "FakeMediaServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-media-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def uploaded_tag(self, library_id: str) -> Optional[str]:
+        return self._library_tags.get(library_id)
+
+    def _build_catalog(self, library_count: int, item_count: int) -> Tuple[List[dict], Dict[str, List[dict]]]:
+        libraries = []
+        items: Dict[str, List[dict]] = {}
+        base_time = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+        for i in range(library_count):
+            library_id = f"{1000 + i}"
+            library = {
+                "Name": f"Library {i + 1}",
+                "CollectionType": "movies",
+                "Locations": [f"/media/library{i + 1}"],
+            }
+            # Emby 与 Jellyfin 的媒体库 ID 字段不同
+            library["Id" if self.server_type == "emby" else "ItemId"] = library_id
+            libraries.append(library)
+            self._library_tags[library_id] = None
+            children = []
+            for j in range(item_count):
+                item_id = f"{library_id}{j:05d}"
+                tag = hashlib.md5(item_id.encode("utf-8")).hexdigest()[:16]
+                created = (base_time - datetime.timedelta(hours=j)).strftime("%Y-%m-%dT%H:%M:%S.0000000Z")
+                children.append({
+                    "Id": item_id,
+                    "Name": f"Movie {i + 1}-{j + 1}",
+                    "Type": "Movie",
+                    "ParentId": library_id,
+                    "DateCreated": created,
+                    "DateLastSaved": created,
+                    "PremiereDate": created,
+                    "SortName": f"movie {j:05d}",
+                    "ImageTags": {"Primary": tag},
+                    "BackdropImageTags": [tag],
+                    # 按媒体库与序号生成，同样参数的多个实例互为镜像
+                    "ProviderIds": {"Tmdb": f"{i + 1}{j:05d}"},
+                })
+            items[library_id] = children
+        return libraries, items
+
+    def _render_poster(self, item_id: str, image_type: str, max_width: int, quality: int) -> bytes:
+        key = (item_id, image_type, max_width, quality)
+        with self._image_lock:
+            cached = self._image_cache.get(key)
+        if cached:
+            return cached
+        width, height = self.poster_size
+        if image_type.lower() == "backdrop":
+            width, height = height * 16 // 9, height
+        if max_width and width > max_width:
+            height = max(1, height * max_width // width)
+            width = max_width
+        digest = hashlib.md5(item_id.encode("utf-8")).digest()
+        hue = digest[0] / 255
+        top = tuple(int(c * 255) for c in colorsys.hsv_to_rgb(hue, 0.6, 0.9))
+        bottom = tuple(int(c * 255) for c in colorsys.hsv_to_rgb((hue + 0.3) % 1, 0.7, 0.4))
+        # 纵向渐变加几何块，保证图片有足够细节，编码体积接近真实海报
+        gradient = Image.linear_gradient("L").resize((width, height))
+        image = Image.composite(Image.new("RGB", (width, height), bottom),
+                                Image.new("RGB", (width, height), top), gradient)
+        draw = ImageDraw.Draw(image)
+        for n in range(8):
+            x0 = digest[n + 1] * width // 256
+            y0 = digest[n + 8] * height // 256
+            size = max(8, width // (3 + n))
+            color = tuple(int(c * 255) for c in colorsys.hsv_to_rgb((hue + n * 0.07) % 1, 0.5, 0.8))
+            draw.rectangle([x0, y0, x0 + size, y0 + size // 2], fill=color)
+        draw.text((width // 12, height // 12), item_id, fill=(255, 255, 255))
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=quality or 90)
+        content = buffer.getvalue()
+        with self._image_lock:
+            self._image_cache[key] = content
+        return content
+
+    def _query_items(self, params: Dict[str, str]) -> dict:
+        ids = params.get("Ids")
+        if ids:
+            wanted = set(ids.split(","))
+            found = [self._library_item(library) for library in self._libraries
+                     if self._library_id(library) in wanted]
+            for children in self._items.values():
+                found.extend(item for item in children if item["Id"] in wanted)
+            return {"Items": found, "TotalRecordCount": len(found)}
+        parent_id = params.get("ParentId")
+        if parent_id:
+            candidates = list(self._items.get(parent_id, []))
+        else:
+            candidates = [item for children in self._items.values() for item in children]
+        include_types = params.get("IncludeItemTypes")
+        if include_types:
+            types = set(include_types.split(","))
+            candidates = [item for item in candidates if item["Type"] in types]
+        min_saved = params.get("MinDateLastSaved")
+        if min_saved:
+            candidates = [item for item in candidates if item["DateLastSaved"] >= min_saved]
+        sort_by = (params.get("SortBy") or "SortName").split(",")[0]
+        if sort_by == "Random":
+            with self._random_lock:
+                self._random.shuffle(candidates)
+        else:
+            key = sort_by if sort_by in ("DateCreated", "PremiereDate", "SortName") else "SortName"
+            candidates.sort(key=lambda item: item[key], reverse=params.get("SortOrder") == "Descending")
+        total = len(candidates)
+        start = int(params.get("StartIndex") or 0)
+        limit = params.get("Limit")
+        page = candidates[start:start + int(limit)] if limit else candidates[start:]
+        result = {"Items": page}
+        if params.get("EnableTotalRecordCount", "true").lower() != "false":
+            result["TotalRecordCount"] = total
+        return result
+
+    def _library_id(self, library: dict) -> str:
+        return library.get("Id") or library.get("ItemId")
+
+    def _library_item(self, library: dict) -> dict:
+        library_id = self._library_id(library)
+        tag = self._library_tags.get(library_id)
+        return {
+            "Id": library_id,
+            "Name": library["Name"],
+            "Type": "CollectionFolder",
+            "ImageTags": {"Primary": tag} if tag else {},
+        }
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, body: bytes = b"", content_type: str = "application/json"):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if body:
+                    self.wfile.write(body)
+                server.stats.add(bytes_sent=len(body))
+
+            def _send_json(self, data):
+                self._send(200, json.dumps(data).encode("utf-8"))
+
+            def _before(self) -> bool:
+                """模拟延迟与错误，返回 False 表示已按注入的错误应答"""
+                server.stats.add(requests=1)
+                delay = server.latency
+                if server.jitter:
+                    with server._random_lock:
+                        delay += server._random.uniform(0, server.jitter)
+                if delay:
+                    time.sleep(delay)
+                if server.down:
+                    self._send(503, b"service unavailable", "text/plain")
+                    server.stats.add(errors_injected=1)
+                    return False
+                if server.error_rate:
+                    with server._random_lock:
+                        failed = server._random.random() < server.error_rate
+                    if failed:
+                        self._send(500, b"injected error", "text/plain")
+                        server.stats.add(errors_injected=1)
+                        return False
+                return True
+
+            def _route(self) -> Tuple[List[str], Dict[str, str]]:
+                parsed = urlparse(self.path)
+                params = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+                parts = [p for p in parsed.path.split("/") if p]
+                if parts and parts[0].lower() == "emby":
+                    parts = parts[1:]
+                return parts, params
+
+            def do_GET(self):
+                parts, params = self._route()
+                if params.get("api_key") != server.API_KEY:
+                    self._send(401, b"unauthorized", "text/plain")
+                    return
+                if not self._before():
+                    return
+                if parts[:2] == ["Library", "VirtualFolders"]:
+                    if parts[2:] == ["Query"]:
+                        self._send_json({"Items": server._libraries, "TotalRecordCount": len(server._libraries)})
+                    else:
+                        self._send_json(server._libraries)
+                elif parts == ["Items"]:
+                    self._send_json(server._query_items(params))
+                elif len(parts) >= 4 and parts[0] == "Items" and parts[2] == "Images":
+                    content = server._render_poster(parts[1], parts[3], int(params.get("maxWidth") or 0),
+                                                    int(params.get("quality") or 0))
+                    server.stats.add(images_served=1)
+                    self._send(200, content, "image/jpeg")
+                else:
+                    self._send(404, b"not found", "text/plain")
+
+            def do_POST(self):
+                parts, params = self._route()
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                server.stats.add(bytes_received=len(body))
+                if params.get("api_key") != server.API_KEY:
+                    self._send(401, b"unauthorized", "text/plain")
+                    return
+                if not self._before():
+                    return
+                if len(parts) == 4 and parts[0] == "Items" and parts[2] == "Images" and parts[3] == "Primary":
+                    if not body:
+                        self._send(400, b"empty body", "text/plain")
+                        return
+                    if parts[1] in server._library_tags:
+                        server._library_tags[parts[1]] = hashlib.md5(body).hexdigest()[:16]
+                    server.stats.add(uploads=1)
+                    self._send(204)
+                else:
+                    self._send(404, b"not found", "text/plain")
+
+        return Handler
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="本地模拟 Emby/Jellyfin 媒体服务器")
+    parser.add_argument("--port", type=int, default=8096)
+    parser.add_argument("--libraries", type=int, default=4)
+    parser.add_argument("--items", type=int, default=50)
+    parser.add_argument("--type", choices=["emby", "jellyfin"], default="emby")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的固定延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="在固定延迟上追加的随机延迟上限（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="随机返回 500 的比例")
+    args = parser.parse_args()
+    server = FakeMediaServer(libraries=args.libraries, items_per_library=args.items, server_type=args.type,
+                             latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                             port=args.port)
+    print(f"模拟媒体服务器已启动：{server.url} api_key={server.API_KEY}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+端到端吞吐基准
+启动本地模拟媒体服务器，按 N 个媒体库 × M 个媒体项驱动插件的批量更新流程，
+输出每分钟处理媒体库数、收发字节数与各阶段耗时；--servers 大于 1 时启动内容相同的镜像服务器。
+需在 MoviePilot 环境中运行：
+
+    python -m app.plugins.mediacovergeneratorashan.benchmark.run --libraries 8 --items 200 --latency 0.02
+"""
+import argparse
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+from app.plugins.mediacovergeneratorashan import MediaCoverGeneratorAshan
+from app.plugins.mediacovergeneratorashan.benchmark.fake_media_server import FakeMediaServer
+from app.utils.http import RequestUtils
+
+
+class FakeServerInstance:
+    """模拟 MoviePilot 媒体服务器模块实例，连接池读取 _host/_apikey，兜底路径走 get_data/post_data"""
+
+    def __init__(self, host: str, apikey: str):
+        self._host = host
+        self._apikey = apikey
+
+    def is_inactive(self) -> bool:
+        return False
+
+    def _url(self, url: str) -> str:
+        return url.replace("[HOST]", self._host).replace("[APIKEY]", self._apikey)
+
+    def get_data(self, url: str):
+        return RequestUtils().get_res(url=self._url(url))
+
+    def post_data(self, url: str, data=None, headers: Optional[dict] = None):
+        return RequestUtils(headers=headers).post_res(url=self._url(url), data=data)
+
+
+class FakeService:
+    """与 MoviePilot ServiceInfo 相同的 name/type/instance 字段"""
+
+    def __init__(self, name: str, server_type: str, instance: FakeServerInstance):
+        self.name = name
+        self.type = server_type
+        self.instance = instance
+
+
+def build_plugin(servers: Dict[str, FakeMediaServer], args: argparse.Namespace) -> MediaCoverGeneratorAshan:
+    """
+    按命令行参数初始化插件并接入模拟服务器；插件数据保存在内存中，不影响正式配置的指纹与上传记录
+    """
+    plugin = MediaCoverGeneratorAshan()
+    store: Dict[str, Any] = {}
+    plugin.get_data = lambda key=None, *a, **kw: store.get(key)
+    plugin.save_data = lambda key, value, *a, **kw: store.__setitem__(key, value)
+    plugin.init_plugin({
+        "enabled": True,
+        "cover_style": args.style,
+        "sort_by": args.sort_by,
+        "selected_servers": [],
+        "save_recent_covers": False,
+        "skip_unchanged": args.skip_unchanged,
+        "poster_cache_size": args.poster_cache,
+        "library_workers": args.library_workers,
+        "fetch_workers": args.fetch_workers,
+        "download_workers": args.download_workers,
+        "upload_workers": args.upload_workers,
+        "server_concurrency": args.server_concurrency,
+        "render_backend": args.render_backend,
+        "share_mirrored_renders": not args.no_share,
+        "style_naming_v2": True,
+    })
+    plugin._servers = {
+        name: FakeService(name, server.server_type, FakeServerInstance(server.url, server.API_KEY))
+        for name, server in servers.items()
+    }
+    return plugin
+
+
+def run_round(plugin: MediaCoverGeneratorAshan, servers: Dict[str, FakeMediaServer]) -> Dict[str, Any]:
+    for server in servers.values():
+        server.stats.reset()
+    started = time.monotonic()
+    plugin._MediaCoverGeneratorAshan__update_all_libraries()
+    elapsed = time.monotonic() - started
+    run_stats = plugin._last_run_stats or {}
+    done = run_stats.get("success", 0) + run_stats.get("skip", 0)
+    totals: Dict[str, int] = {}
+    for server in servers.values():
+        for key, value in server.stats.snapshot().items():
+            totals[key] = totals.get(key, 0) + value
+    return {
+        "elapsed": elapsed,
+        "libraries_per_minute": done / elapsed * 60 if elapsed > 0 else 0.0,
+        "server": totals,
+        "run": run_stats,
+    }
+
+
+def format_round(index: int, result: Dict[str, Any]) -> str:
+    run, stats = result["run"], result["server"]
+    lines = [
+        f"第 {index} 轮：耗时 {result['elapsed']:.2f}s，{result['libraries_per_minute']:.1f} 个媒体库/分钟",
+        f"  媒体库 {run.get('libraries', 0)} 个：成功 {run.get('success', 0)}（相同未上传 {run.get('same', 0)}），"
+        f"失败 {run.get('fail', 0)}，未变化跳过 {run.get('skip', 0)}，熔断跳过 {run.get('circuit', 0)}，"
+        f"共享渲染 {run.get('shared', 0)}",
+        f"  请求 {stats['requests']} 次（注入错误 {stats['errors_injected']}），下发海报 {stats['images_served']} 张，"
+        f"上传 {stats['uploads']} 次；发送 {stats['bytes_sent'] / 1024:.1f}KB，接收 {stats['bytes_received'] / 1024:.1f}KB",
+    ]
+    for name, info in (run.get("stages") or {}).items():
+        processed = info["processed"]
+        average = info["busy_seconds"] / processed if processed else 0.0
+        lines.append(f"  {name}：处理 {processed} 次，累计 {info['busy_seconds']:.2f}s，平均 {average:.3f}s，"
+                     f"峰值排队 {info['max_queued']}/{info['capacity']}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="媒体库封面批量更新吞吐基准")
+    parser.add_argument("--libraries", type=int, default=4, help="媒体库数量")
+    parser.add_argument("--items", type=int, default=50, help="每个媒体库的媒体项数量")
+    parser.add_argument("--rounds", type=int, default=1, help="连续运行轮数，后续轮次可观察缓存效果")
+    parser.add_argument("--servers", type=int, default=1, help="内容相同的模拟服务器数量")
+    parser.add_argument("--no-share", action="store_true", help="关闭镜像媒体库共享渲染")
+    parser.add_argument("--type", choices=["emby", "jellyfin"], default="emby")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的固定延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="随机追加延迟上限（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="随机返回 500 的比例")
+    parser.add_argument("--style", default="static_1")
+    parser.add_argument("--sort-by", default="DateCreated", choices=["DateCreated", "PremiereDate", "Random"])
+    parser.add_argument("--skip-unchanged", action="store_true", help="启用输入未变化跳过")
+    parser.add_argument("--poster-cache", type=int, default=0, help="海报缓存上限（MB），默认不缓存")
+    parser.add_argument("--library-workers", type=int, default=2)
+    parser.add_argument("--fetch-workers", type=int, default=2)
+    parser.add_argument("--download-workers", type=int, default=3)
+    parser.add_argument("--upload-workers", type=int, default=2)
+    parser.add_argument("--server-concurrency", type=int, default=3)
+    parser.add_argument("--render-backend", default="thread", choices=["thread", "process"])
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    args = parser.parse_args(argv)
+
+    results = []
+    servers = {
+        f"benchmark-{n + 1}": FakeMediaServer(libraries=args.libraries, items_per_library=args.items,
+                                              server_type=args.type, latency=args.latency, jitter=args.jitter,
+                                              error_rate=args.error_rate, seed=n).start()
+        for n in range(max(1, args.servers))
+    }
+    plugin = build_plugin(servers, args)
+    try:
+        for index in range(1, args.rounds + 1):
+            result = run_round(plugin, servers)
+            results.append(result)
+            if not args.json:
+                print(format_round(index, result))
+    finally:
+        plugin.stop_service()
+        for server in servers.values():
+            server.stop()
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    return results
+
+
+if __name__ == "__main__":
+    main()
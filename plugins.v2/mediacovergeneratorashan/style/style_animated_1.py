@@ -1,18 +1,17 @@
-import base64
 import hashlib
 import math
 import os
-import subprocess
-import tempfile
-import time
 from collections import Counter
 from pathlib import Path
 
 import numpy as np
-from PIL import Image, ImageChops, ImageDraw, ImageFilter, ImageFont, ImageOps
+from PIL import Image, ImageChops, ImageDraw, ImageFilter, ImageOps
 
 from app.log import logger
+from app.plugins.mediacovergeneratorashan.utils.animation_encoder import create_animation_encoder
 from app.plugins.mediacovergeneratorashan.utils.color_helper import ColorHelper
+from app.plugins.mediacovergeneratorashan.utils.frame_parallel import render_frames
+from app.plugins.mediacovergeneratorashan.utils.font_helper import load_font
 
 
 def darken_color(color, factor=0.7):
@@ -213,8 +212,8 @@ def _build_text_layer(target_w, target_h, title, font_path, font_size, font_offs
     title_zh, title_en = title
 
     # 参考 style_animated_1：按分辨率比例缩放字体
-    zh_font = ImageFont.truetype(zh_font_path, max(1, int(zh_font_size * scale)))
-    en_font = ImageFont.truetype(en_font_path, max(1, int(en_font_size * scale)))
+    zh_font = load_font(zh_font_path, max(1, int(zh_font_size * scale)))
+    en_font = load_font(en_font_path, max(1, int(en_font_size * scale)))
 
     left_area_center_x = int(target_w * 0.25)
     left_area_center_y = int(target_h * 0.5)
@@ -293,6 +292,193 @@ def _build_text_layer(target_w, target_h, title, font_path, font_size, font_offs
     return Image.alpha_composite(blurred_shadow, text_layer)
 
 
+def _animate_background(bg_base_rgba, phase, duration_seconds, target_w, target_h, bg_zoom_amp):
+    phase = _clamp(phase, 0.0, 1.0)
+    duration_seconds = max(1.0, float(duration_seconds))
+
+    # 缓慢背景动效：使用周期函数保证首尾无缝衔接
+    base_amp = _clamp(bg_zoom_amp * 0.14 + 0.002, 0.003, 0.022)
+    duration_scale = _clamp(duration_seconds / 6.0, 0.55, 1.0)
+    effective_zoom_amp = base_amp * duration_scale
+
+    theta = 2.0 * math.pi * phase
+    breath = 0.5 - 0.5 * math.cos(theta)  # 0 -> 1 -> 0
+    zoom = 1.0 + effective_zoom_amp * breath
+
+    # 细微平移，增加“活性”，同样用周期函数保证循环自然
+    pan_amp = _clamp(min(target_w, target_h) * 0.008 * duration_scale, 1.0, 6.0)
+    pan_x = pan_amp * math.sin(theta)
+    pan_y = pan_amp * 0.6 * math.sin(theta + math.pi / 3.0)
+
+    safe_margin = max(0.025, effective_zoom_amp + 0.02 + (pan_amp / max(1.0, min(target_w, target_h))))
+    overscan_w = int(round(target_w * (1.0 + safe_margin * 2.0)))
+    overscan_h = int(round(target_h * (1.0 + safe_margin * 2.0)))
+
+    overscan = ImageOps.fit(
+        bg_base_rgba,
+        (overscan_w, overscan_h),
+        method=Image.Resampling.BICUBIC,
+    )
+
+    scaled_w = max(target_w + 2, int(round(overscan_w * zoom)))
+    scaled_h = max(target_h + 2, int(round(overscan_h * zoom)))
+    scaled = overscan.resize((scaled_w, scaled_h), Image.Resampling.BICUBIC)
+
+    left = int(round((scaled_w - target_w) / 2 + pan_x))
+    top = int(round((scaled_h - target_h) / 2 + pan_y))
+    left = _clamp(left, 0, max(0, scaled_w - target_w))
+    top = _clamp(top, 0, max(0, scaled_h - target_h))
+    right = left + target_w
+    bottom = top + target_h
+    return scaled.crop((left, top, right, bottom))
+
+
+def _render_frame(f, layers, params):
+    """渲染第 f 帧：背景渐变与缓动、三层卡片轮换、顶层卡片离场"""
+    processed_cards_main = layers["cards_main"]
+    processed_cards_mid = layers["cards_mid"]
+    processed_cards_heavy = layers["cards_heavy"]
+    bg_bases_rgba = layers["bg_bases"]
+    text_layer = layers["text"]
+    total_frames = params["total_frames"]
+    n_cards = len(processed_cards_main)
+    target_w, target_h = params["size"]
+    scale = params["scale"]
+    departure_type = params["departure_type"]
+    safe_duration = params["duration"]
+    bg_zoom_amp = params["bg_zoom_amp"]
+    center_pos = params["center_pos"]
+    center_offset = params["center_offset"]
+    stable_canvas_size = params["stable_canvas_size"]
+
+    phase = f / float(total_frames)
+    cycle_pos = phase * n_cards
+    cycle_index = int(cycle_pos)
+    local = cycle_pos - cycle_index  # 0.0 -> 1.0
+
+    # 选定参与槽位的卡片
+    idx_a = cycle_index % n_cards       # 顶层 -> 移到底层 (Shuffle Card)
+    idx_b = (cycle_index + 1) % n_cards # 中层 -> 变顶层
+    idx_c = (cycle_index + 2) % n_cards # 底层 -> 变中层
+    idx_d = (cycle_index + 3) % n_cards # 未来底层 -> 出现
+
+    # 角度 Slot (CSS 角度 -> PIL 负值)
+    s1_ang = -5.0
+    s2_ang = 10.0
+    s3_ang = 25.0
+
+    # 3D 堆叠位移基数
+    stack_dx = int(12 * scale)
+    stack_dy = int(12 * scale)
+    p1 = (0.0, 0.0)
+    p2 = (float(stack_dx), float(stack_dy))
+    p3 = (float(stack_dx * 2), float(stack_dy * 2))
+
+    # 全局 ease-in-out 因子
+    it_stack = _ease_in_out_sine(local)
+
+    # 1. 堆叠层同步移动 (B 和 C 同时转动)
+    ang_b = s2_ang + (s1_ang - s2_ang) * it_stack
+    pos_b = (p2[0] + (p1[0] - p2[0]) * it_stack, p2[1] + (p1[1] - p2[1]) * it_stack)
+
+    ang_c = s3_ang + (s2_ang - s3_ang) * it_stack
+    pos_c = (p3[0] + (p2[0] - p3[0]) * it_stack, p3[1] + (p2[1] - p3[1]) * it_stack)
+
+    # D: 新底层卡片渐变出现
+    alpha_d = _ease_in_out_sine(local)
+    ang_d = s3_ang
+    pos_d = p3
+
+    # 2. 顶层卡片 A 的离开方式
+    ang_a = s1_ang
+    cross_t = 0.0
+    if departure_type == "crossfade":
+        # 渐变：卡片不移动，仅顶层图像渐变到下一张
+        dx_a = 0.0
+        dy_a = 0.0
+        alpha_a = 1.0
+        cross_t = _ease_in_out_sine(local)
+    elif departure_type == "fade":
+        # 淡出：原地不动，透明度缓慢降低
+        dx_a = 0.0
+        dy_a = 0.0
+        alpha_a = _clamp(1.0 - _ease_in_out_sine(local), 0.0, 1.0)
+    else:
+        # 飞出：向右上角滑出并逐渐消失
+        fly_x = target_w * 0.75
+        fly_y = -target_h * 0.20
+        it_a = _ease_in_out_sine(local)
+        dx_a = fly_x * it_a
+        dy_a = fly_y * it_a
+        # 后半段开始淡出
+        if local > 0.4:
+            fade_t = (local - 0.4) / 0.6
+            alpha_a = _clamp(1.0 - fade_t * fade_t, 0.0, 1.0)
+        else:
+            alpha_a = 1.0
+
+    # 绘制顺序与图层
+    if departure_type == "crossfade":
+        # 顶层不透明渐变：仅顶层内容变化，不漏出下一层
+        top_blend = Image.blend(processed_cards_main[idx_a], processed_cards_main[idx_b], cross_t)
+        mid_blend = Image.blend(processed_cards_mid[idx_b], processed_cards_mid[idx_c], cross_t)
+        bottom_blend = Image.blend(processed_cards_heavy[idx_c], processed_cards_heavy[idx_d], cross_t)
+
+        z_order = [
+            (None, s3_ang, 1.0, p3, True, bottom_blend),
+            (None, s2_ang, 1.0, p2, True, mid_blend),
+            (None, s1_ang, 1.0, p1, False, top_blend),
+        ]
+    else:
+        # 飞出/淡出：二三层在旋转补位中逐渐清晰
+        clarity_t = _ease_in_out_sine(local)
+        b_blend = Image.blend(processed_cards_mid[idx_b], processed_cards_main[idx_b], _clamp(clarity_t * 0.95, 0.0, 1.0))
+        c_blend = Image.blend(processed_cards_heavy[idx_c], processed_cards_mid[idx_c], _clamp(clarity_t * 0.90, 0.0, 1.0))
+
+        z_order = [
+            (idx_d, ang_d, alpha_d, pos_d, True, processed_cards_heavy[idx_d]),
+            (idx_c, ang_c, 1.0, pos_c, True, c_blend),
+            (idx_b, ang_b, 1.0, pos_b, True, b_blend),
+            (idx_a, ang_a, alpha_a, (dx_a, dy_a), False, None),
+        ]
+
+    # 背景动效：随顶层切换做渐变，保证新顶层出现时背景同步变化
+    bg_mix_t = _ease_in_out_sine(local)
+    bg_base = Image.blend(bg_bases_rgba[idx_a], bg_bases_rgba[idx_b], bg_mix_t)
+    frame = _animate_background(bg_base, phase, safe_duration, target_w, target_h, bg_zoom_amp)
+
+    # 按照 Z-order 绘制 (center_offset 已在循环外预计算为整数)
+    for idx, ang, alpha, offsets, use_soft, card_override in z_order:
+        if alpha <= 0:
+            continue
+
+        if card_override is not None:
+            card_src = card_override
+        else:
+            if idx is None:
+                continue
+            card_src = processed_cards_mid[idx] if use_soft else processed_cards_main[idx]
+
+        card_img = _alpha_scaled(card_src, alpha)
+
+        # 顶层渐变时给顶层加一层模糊底，避免过渡期露出下层
+        if departure_type == "crossfade" and card_override is not None and not use_soft:
+            top_blur_base = _alpha_scaled(card_override.filter(ImageFilter.GaussianBlur(radius=max(1, int(2.0 * scale)))), 0.92)
+            blur_rot = rotate_on_stable_canvas(top_blur_base, ang, stable_canvas_size)
+            blur_x = int(round(center_pos[0] + offsets[0])) - center_offset
+            blur_y = int(round(center_pos[1] + offsets[1])) - center_offset
+            frame.paste(blur_rot, (blur_x, blur_y), blur_rot)
+
+        rotated = rotate_on_stable_canvas(card_img, ang, stable_canvas_size)
+
+        draw_x = int(round(center_pos[0] + offsets[0])) - center_offset
+        draw_y = int(round(center_pos[1] + offsets[1])) - center_offset
+
+        frame.paste(rotated, (draw_x, draw_y), rotated)
+
+    return Image.alpha_composite(frame, text_layer)
+
+
 def create_style_animated_1(
     library_dir,
     title,
@@ -311,48 +497,11 @@ def create_style_animated_1(
     animation_reduce_colors="strong",
     image_count=5,
     departure_type="fly",
+    animation_export_mode="pipe",
+    animation_encoder="auto",
+    frame_workers=1,
     stop_event=None,
 ):
-    def _animate_background(bg_base_rgba, phase, duration_seconds):
-        phase = _clamp(phase, 0.0, 1.0)
-        duration_seconds = max(1.0, float(duration_seconds))
-
-        # 缓慢背景动效：使用周期函数保证首尾无缝衔接
-        base_amp = _clamp(bg_zoom_amp * 0.14 + 0.002, 0.003, 0.022)
-        duration_scale = _clamp(duration_seconds / 6.0, 0.55, 1.0)
-        effective_zoom_amp = base_amp * duration_scale
-
-        theta = 2.0 * math.pi * phase
-        breath = 0.5 - 0.5 * math.cos(theta)  # 0 -> 1 -> 0
-        zoom = 1.0 + effective_zoom_amp * breath
-
-        # 细微平移，增加“活性”，同样用周期函数保证循环自然
-        pan_amp = _clamp(min(target_w, target_h) * 0.008 * duration_scale, 1.0, 6.0)
-        pan_x = pan_amp * math.sin(theta)
-        pan_y = pan_amp * 0.6 * math.sin(theta + math.pi / 3.0)
-
-        safe_margin = max(0.025, effective_zoom_amp + 0.02 + (pan_amp / max(1.0, min(target_w, target_h))))
-        overscan_w = int(round(target_w * (1.0 + safe_margin * 2.0)))
-        overscan_h = int(round(target_h * (1.0 + safe_margin * 2.0)))
-
-        overscan = ImageOps.fit(
-            bg_base_rgba,
-            (overscan_w, overscan_h),
-            method=Image.Resampling.BICUBIC,
-        )
-
-        scaled_w = max(target_w + 2, int(round(overscan_w * zoom)))
-        scaled_h = max(target_h + 2, int(round(overscan_h * zoom)))
-        scaled = overscan.resize((scaled_w, scaled_h), Image.Resampling.BICUBIC)
-
-        left = int(round((scaled_w - target_w) / 2 + pan_x))
-        top = int(round((scaled_h - target_h) / 2 + pan_y))
-        left = _clamp(left, 0, max(0, scaled_w - target_w))
-        top = _clamp(top, 0, max(0, scaled_h - target_h))
-        right = left + target_w
-        bottom = top + target_h
-        return scaled.crop((left, top, right, bottom))
-
     def _safe_clamped(value, minimum, maximum, default_value, name, cast_type):
         try:
             parsed = cast_type(value)
@@ -594,9 +743,9 @@ def create_style_animated_1(
         total_frames = max(1, int(round(safe_duration * safe_fps)))
 
 
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            tmp_path = Path(tmp_dir)
-
+        with create_animation_encoder(animation_format, safe_fps, animation_reduce_colors,
+                                      export_mode=animation_export_mode, threads="2",
+                                      stop_event=stop_event, encoder=animation_encoder) as encoder:
             departure_type = (departure_type or "fly").lower()
             if departure_type not in ["fly", "fade", "crossfade"]:
                 departure_type = "fly"
@@ -608,7 +757,27 @@ def create_style_animated_1(
             logger.info(f"开始生成帧，共 {total_frames} 帧，卡片数 {n_cards}")
 
 
-            for f in range(total_frames):
+            layers = {
+                "cards_main": processed_cards_main,
+                "cards_mid": processed_cards_mid,
+                "cards_heavy": processed_cards_heavy,
+                "bg_bases": bg_bases_rgba,
+                "text": text_layer,
+            }
+            params = {
+                "total_frames": total_frames,
+                "size": (target_w, target_h),
+                "scale": scale,
+                "departure_type": departure_type,
+                "duration": safe_duration,
+                "bg_zoom_amp": bg_zoom_amp,
+                "center_pos": center_pos,
+                "center_offset": center_offset,
+                "stable_canvas_size": stable_canvas_size,
+            }
+            frames = render_frames(_render_frame, total_frames, layers, params, (target_w, target_h),
+                                   workers=frame_workers, stop_event=stop_event)
+            for f, frame in enumerate(frames):
                 if stop_event and stop_event.is_set():
                     logger.info("检测到停止信号，中断动图生成")
                     return False
@@ -616,258 +785,11 @@ def create_style_animated_1(
                 if f % 10 == 0:
                     logger.info(f"正在处理第 {f}/{total_frames} 帧...")
 
-                phase = f / float(total_frames)
-                cycle_pos = phase * n_cards
-                cycle_index = int(cycle_pos)
-                local = cycle_pos - cycle_index  # 0.0 -> 1.0
-
-                # 选定参与槽位的卡片
-                idx_a = cycle_index % n_cards       # 顶层 -> 移到底层 (Shuffle Card)
-                idx_b = (cycle_index + 1) % n_cards # 中层 -> 变顶层
-                idx_c = (cycle_index + 2) % n_cards # 底层 -> 变中层
-                idx_d = (cycle_index + 3) % n_cards # 未来底层 -> 出现
-
-                # 角度 Slot (CSS 角度 -> PIL 负值)
-                s1_ang = -5.0
-                s2_ang = 10.0
-                s3_ang = 25.0
-
-                # 3D 堆叠位移基数
-                stack_dx = int(12 * scale)
-                stack_dy = int(12 * scale)
-                p1 = (0.0, 0.0)
-                p2 = (float(stack_dx), float(stack_dy))
-                p3 = (float(stack_dx * 2), float(stack_dy * 2))
-
-                # 全局 ease-in-out 因子
-                it_stack = _ease_in_out_sine(local)
-
-                # 1. 堆叠层同步移动 (B 和 C 同时转动)
-                ang_b = s2_ang + (s1_ang - s2_ang) * it_stack
-                pos_b = (p2[0] + (p1[0] - p2[0]) * it_stack, p2[1] + (p1[1] - p2[1]) * it_stack)
-                
-                ang_c = s3_ang + (s2_ang - s3_ang) * it_stack
-                pos_c = (p3[0] + (p2[0] - p3[0]) * it_stack, p3[1] + (p2[1] - p3[1]) * it_stack)
-                
-                # D: 新底层卡片渐变出现
-                alpha_d = _ease_in_out_sine(local)
-                ang_d = s3_ang
-                pos_d = p3
-
-                # 2. 顶层卡片 A 的离开方式
-                ang_a = s1_ang
-                cross_t = 0.0
-                if departure_type == "crossfade":
-                    # 渐变：卡片不移动，仅顶层图像渐变到下一张
-                    dx_a = 0.0
-                    dy_a = 0.0
-                    alpha_a = 1.0
-                    cross_t = _ease_in_out_sine(local)
-                elif departure_type == "fade":
-                    # 淡出：原地不动，透明度缓慢降低
-                    dx_a = 0.0
-                    dy_a = 0.0
-                    alpha_a = _clamp(1.0 - _ease_in_out_sine(local), 0.0, 1.0)
-                else:
-                    # 飞出：向右上角滑出并逐渐消失
-                    fly_x = target_w * 0.75
-                    fly_y = -target_h * 0.20
-                    it_a = _ease_in_out_sine(local)
-                    dx_a = fly_x * it_a
-                    dy_a = fly_y * it_a
-                    # 后半段开始淡出
-                    if local > 0.4:
-                        fade_t = (local - 0.4) / 0.6
-                        alpha_a = _clamp(1.0 - fade_t * fade_t, 0.0, 1.0)
-                    else:
-                        alpha_a = 1.0
-
-                # 绘制顺序与图层
-                if departure_type == "crossfade":
-                    # 顶层不透明渐变：仅顶层内容变化，不漏出下一层
-                    top_blend = Image.blend(processed_cards_main[idx_a], processed_cards_main[idx_b], cross_t)
-                    mid_blend = Image.blend(processed_cards_mid[idx_b], processed_cards_mid[idx_c], cross_t)
-                    bottom_blend = Image.blend(processed_cards_heavy[idx_c], processed_cards_heavy[idx_d], cross_t)
-
-                    z_order = [
-                        (None, s3_ang, 1.0, p3, True, bottom_blend),
-                        (None, s2_ang, 1.0, p2, True, mid_blend),
-                        (None, s1_ang, 1.0, p1, False, top_blend),
-                    ]
-                else:
-                    # 飞出/淡出：二三层在旋转补位中逐渐清晰
-                    clarity_t = _ease_in_out_sine(local)
-                    b_blend = Image.blend(processed_cards_mid[idx_b], processed_cards_main[idx_b], _clamp(clarity_t * 0.95, 0.0, 1.0))
-                    c_blend = Image.blend(processed_cards_heavy[idx_c], processed_cards_mid[idx_c], _clamp(clarity_t * 0.90, 0.0, 1.0))
-
-                    z_order = [
-                        (idx_d, ang_d, alpha_d, pos_d, True, processed_cards_heavy[idx_d]),
-                        (idx_c, ang_c, 1.0, pos_c, True, c_blend),
-                        (idx_b, ang_b, 1.0, pos_b, True, b_blend),
-                        (idx_a, ang_a, alpha_a, (dx_a, dy_a), False, None),
-                    ]
-
-                # 背景动效：随顶层切换做渐变，保证新顶层出现时背景同步变化
-                bg_mix_t = _ease_in_out_sine(local)
-                bg_base = Image.blend(bg_bases_rgba[idx_a], bg_bases_rgba[idx_b], bg_mix_t)
-                frame = _animate_background(bg_base, phase, safe_duration)
-
-                # 按照 Z-order 绘制 (center_offset 已在循环外预计算为整数)
-                for idx, ang, alpha, offsets, use_soft, card_override in z_order:
-                    if alpha <= 0:
-                        continue
-
-                    if card_override is not None:
-                        card_src = card_override
-                    else:
-                        if idx is None:
-                            continue
-                        card_src = processed_cards_mid[idx] if use_soft else processed_cards_main[idx]
-
-                    card_img = _alpha_scaled(card_src, alpha)
-
-                    # 顶层渐变时给顶层加一层模糊底，避免过渡期露出下层
-                    if departure_type == "crossfade" and card_override is not None and not use_soft:
-                        top_blur_base = _alpha_scaled(card_override.filter(ImageFilter.GaussianBlur(radius=max(1, int(2.0 * scale)))), 0.92)
-                        blur_rot = rotate_on_stable_canvas(top_blur_base, ang, stable_canvas_size)
-                        blur_x = int(round(center_pos[0] + offsets[0])) - center_offset
-                        blur_y = int(round(center_pos[1] + offsets[1])) - center_offset
-                        frame.paste(blur_rot, (blur_x, blur_y), blur_rot)
-
-                    rotated = rotate_on_stable_canvas(card_img, ang, stable_canvas_size)
-                    
-                    draw_x = int(round(center_pos[0] + offsets[0])) - center_offset
-                    draw_y = int(round(center_pos[1] + offsets[1])) - center_offset
-                    
-                    frame.paste(rotated, (draw_x, draw_y), rotated)
-
-                frame = Image.alpha_composite(frame, text_layer)
-
-                frame_file = tmp_path / f"frame_{f:04d}.bmp"
-                frame.convert("RGB").save(frame_file, format="BMP")
-
-            if stop_event and stop_event.is_set():
-                logger.info("检测到停止信号，跳过 ffmpeg 导出")
-                return False
-
-            output_ext = ".gif" if animation_format == "gif" else ".png"
-            output_file = tmp_path / f"output{output_ext}"
-
-            generated_frames = list(tmp_path.glob("frame_*.bmp"))
-            if not generated_frames:
-                logger.error("未生成任何动画帧文件，无法导出")
-                return False
-            logger.info(f"已生成 {len(generated_frames)} 帧素材，准备启动 ffmpeg...")
-
-            ffmpeg_common = [
-                "ffmpeg",
-                "-hide_banner",
-                "-y",
-                "-framerate",
-                str(safe_fps),
-                "-i",
-                str(tmp_path / "frame_%04d.bmp"),
-                "-threads",
-                "2",
-            ]
-
-            reduce_mode = animation_reduce_colors
-            if isinstance(reduce_mode, bool):
-                reduce_mode = "strong" if reduce_mode else "off"
-
-            if animation_format == "gif":
-                p_colors = "64" if reduce_mode == "strong" else ("128" if reduce_mode == "medium" else "256")
-                p_dither = "none" if reduce_mode == "strong" else ("bayer:bayer_scale=3" if reduce_mode == "medium" else "floyd_steinberg")
-                ffmpeg_cmd = ffmpeg_common + [
-                    "-filter_complex",
-                    f"[0:v] split [a][b]; [a] palettegen=max_colors={p_colors} [p]; [b][p] paletteuse=dither={p_dither}",
-                    "-loop",
-                    "0",
-                    "-f",
-                    "gif",
-                    str(output_file),
-                ]
-            else:
-                if reduce_mode == "off":
-                    ffmpeg_cmd = ffmpeg_common + [
-                        "-vcodec",
-                        "apng",
-                        "-pix_fmt",
-                        "rgba",
-                        "-plays",
-                        "0",
-                        "-f",
-                        "apng",
-                        str(output_file),
-                    ]
-                else:
-                    p_colors = "64" if reduce_mode == "strong" else "128"
-                    p_dither = "none" if reduce_mode == "strong" else "bayer:bayer_scale=3"
-                    ffmpeg_cmd = ffmpeg_common + [
-                        "-filter_complex",
-                        f"[0:v] split [a][b]; [a] palettegen=max_colors={p_colors}:reserve_transparent=on [p]; [b][p] paletteuse=dither={p_dither}",
-                        "-vcodec",
-                        "apng",
-                        "-pix_fmt",
-                        "rgba",
-                        "-plays",
-                        "0",
-                        "-f",
-                        "apng",
-                        str(output_file),
-                    ]
-
-            logger.debug("正在启动 ffmpeg...")
-
-            if stop_event and stop_event.is_set():
-                logger.info("检测到停止信号，取消 ffmpeg 启动")
-                return False
-
-            ffmpeg_proc = None
-            try:
-                ffmpeg_proc = subprocess.Popen(
-                    ffmpeg_cmd,
-                    stdout=subprocess.DEVNULL,
-                    stderr=subprocess.PIPE,
-                    text=False,
-                )
+                if not encoder.add_frame(frame):
+                    logger.info("检测到停止信号，中断动图生成")
+                    return False
 
-                while True:
-                    ret = ffmpeg_proc.poll()
-                    if ret is not None:
-                        if ret != 0:
-                            err_data = ffmpeg_proc.stderr.read() if ffmpeg_proc.stderr else b""
-                            error_msg = err_data.decode("utf-8", "ignore") if err_data else "无详细错误信息"
-                            logger.error(f"ffmpeg 执行失败 (状态码 {ret})")
-                            
-                            raise subprocess.CalledProcessError(ret, ffmpeg_cmd, stderr=err_data)
-                        break
-
-                    if stop_event and stop_event.is_set():
-                        logger.info("检测到停止信号，正在终止 ffmpeg...")
-                        ffmpeg_proc.terminate()
-                        try:
-                            ffmpeg_proc.wait(timeout=2)
-                        except subprocess.TimeoutExpired:
-                            logger.warning("ffmpeg terminate 超时，执行 kill")
-                            ffmpeg_proc.kill()
-                            ffmpeg_proc.wait(timeout=2)
-                        return False
-
-                    time.sleep(0.1)
-
-                if ffmpeg_proc.stderr:
-                    ffmpeg_proc.stderr.read()
-
-            finally:
-                if ffmpeg_proc and ffmpeg_proc.poll() is None:
-                    ffmpeg_proc.kill()
-
-            with open(output_file, "rb") as f:
-                final_data = f.read()
-
-            logger.info(f"ffmpeg 导出成功! 最终大小: {len(final_data) / 1024 / 1024:.2f} MB")
-            return base64.b64encode(final_data).decode("utf-8")
+            return encoder.finish()
 
     except Exception as e:
         logger.error(f"创建 style_animated_1 失败: {e}")
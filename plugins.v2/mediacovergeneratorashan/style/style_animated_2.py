@@ -1,13 +1,9 @@
-import base64
 import hashlib
 import math
 import os
-import subprocess
-import tempfile
-import time
 from pathlib import Path
 
-from PIL import Image, ImageDraw, ImageFilter, ImageFont, ImageOps
+from PIL import Image, ImageDraw, ImageFilter, ImageOps
 
 from app.log import logger
 from app.plugins.mediacovergeneratorashan.style.style_static_2 import (
@@ -16,7 +12,10 @@ from app.plugins.mediacovergeneratorashan.style.style_static_2 import (
     darken_color,
     find_dominant_vibrant_colors,
 )
+from app.plugins.mediacovergeneratorashan.utils.animation_encoder import create_animation_encoder
 from app.plugins.mediacovergeneratorashan.utils.color_helper import ColorHelper
+from app.plugins.mediacovergeneratorashan.utils.frame_parallel import render_frames
+from app.plugins.mediacovergeneratorashan.utils.font_helper import load_font
 
 
 def _clamp(v, lo, hi):
@@ -116,8 +115,8 @@ def _build_text_layer(canvas_size, title, font_path, font_size, font_offset, bg_
 
     # 小分辨率动图按比例放大字体，避免文字过小
     scale = height / 1080.0
-    zh_font = ImageFont.truetype(zh_font_path, max(1, int(zh_font_size * scale)))
-    en_font = ImageFont.truetype(en_font_path, max(1, int(en_font_size * scale)))
+    zh_font = load_font(zh_font_path, max(1, int(zh_font_size * scale)))
+    en_font = load_font(en_font_path, max(1, int(en_font_size * scale)))
 
     text_layer = Image.new("RGBA", canvas_size, (0, 0, 0, 0))
     shadow_layer = Image.new("RGBA", canvas_size, (0, 0, 0, 0))
@@ -189,6 +188,51 @@ def _build_text_layer(canvas_size, title, font_path, font_size, font_offset, bg_
     return Image.alpha_composite(shadow_layer.filter(ImageFilter.GaussianBlur(radius=8)), text_layer)
 
 
+def _render_frame(f, layers, params):
+    """渲染第 f 帧：固定斜切布局下，左右画面与标题在相邻两张素材间渐变"""
+    prepared_right = layers["right"]
+    prepared_left_bg = layers["left_bg"]
+    prepared_text = layers["text"]
+    target_w, target_h = params["size"]
+    n_imgs = len(prepared_right)
+
+    phase = f / float(params["total_frames"])
+    cycle_pos = phase * n_imgs
+    idx = int(cycle_pos) % n_imgs
+    nxt = (idx + 1) % n_imgs
+    local = cycle_pos - int(cycle_pos)
+    # 取消帷幕动画（不再根据 bg_motion_mode 切换）
+    # 保留固定斜切布局，仅做新旧画面渐变切换
+    panel_mix_t = _ease_in_out_sine(local)
+    right_mix_t = panel_mix_t
+    dynamic_mask = layers["mask"]
+    dynamic_shadow_mask = layers["shadow_mask"]
+
+    right_old = prepared_right[idx]
+    right_new = prepared_right[nxt]
+    right_anim = _blend_rgba(right_old, right_new, right_mix_t)
+
+    # 背景固定，不做左右位移/缩放动画
+    left_old = prepared_left_bg[idx]
+    left_new = prepared_left_bg[nxt]
+    left_bg_anim = _blend_rgba(left_old, left_new, panel_mix_t)
+
+    # 背景始终用斜切边界在左右层之间做过渡，不会在左侧留下空白
+    frame = Image.composite(left_bg_anim, right_anim, dynamic_mask)
+
+    # 动态边缘阴影
+    edge_shadow = Image.new("RGBA", (target_w, target_h), (0, 0, 0, 0))
+    edge_shadow_layer = Image.new("RGBA", (target_w, target_h), (0, 0, 0, 120))
+    edge_shadow.paste(edge_shadow_layer, (0, 0), dynamic_shadow_mask)
+    frame = Image.alpha_composite(frame, edge_shadow)
+
+    # 标题固定，不做左右位移动画
+    text_mix = _blend_rgba(prepared_text[idx], prepared_text[nxt], panel_mix_t)
+    moving_text = Image.new("RGBA", (target_w, target_h), (0, 0, 0, 0))
+    moving_text.paste(text_mix, (0, 0), text_mix)
+    return Image.alpha_composite(frame, moving_text)
+
+
 def create_style_animated_2(
     library_dir,
     title,
@@ -206,6 +250,9 @@ def create_style_animated_2(
     animation_resolution="320x180",
     animation_reduce_colors="strong",
     image_count=9,
+    animation_export_mode="pipe",
+    animation_encoder="auto",
+    frame_workers=1,
     stop_event=None,
 ):
     try:
@@ -286,112 +333,31 @@ def create_style_animated_2(
         safe_duration = max(1, int(animation_duration))
         total_frames = max(1, int(round(safe_fps * safe_duration)))
 
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            tmp_path = Path(tmp_dir)
-
+        with create_animation_encoder(animation_format, safe_fps, animation_reduce_colors,
+                                      export_mode=animation_export_mode, threads="0",
+                                      stop_event=stop_event, encoder=animation_encoder) as encoder:
             n_imgs = len(prepared_right)
             logger.info(f"开始生成帧，共 {total_frames} 帧，素材数 {n_imgs}")
-            for f in range(total_frames):
+            layers = {
+                "right": prepared_right,
+                "left_bg": prepared_left_bg,
+                "text": prepared_text,
+                "mask": static_mask,
+                "shadow_mask": static_shadow_mask,
+            }
+            params = {"total_frames": total_frames, "size": (target_w, target_h)}
+            frames = render_frames(_render_frame, total_frames, layers, params, (target_w, target_h),
+                                   workers=frame_workers, stop_event=stop_event)
+            for f, frame in enumerate(frames):
                 if stop_event and stop_event.is_set():
                     return False
                 if f % 10 == 0:
                     logger.info(f"正在生成第 {f}/{total_frames} 帧...")
 
-                phase = f / float(total_frames)
-                cycle_pos = phase * n_imgs
-                idx = int(cycle_pos) % n_imgs
-                nxt = (idx + 1) % n_imgs
-                local = cycle_pos - int(cycle_pos)
-                # 取消帷幕动画（不再根据 bg_motion_mode 切换）
-                # 保留固定斜切布局，仅做新旧画面渐变切换
-                panel_mix_t = _ease_in_out_sine(local)
-                right_mix_t = panel_mix_t
-                dynamic_mask = static_mask
-                dynamic_shadow_mask = static_shadow_mask
-
-                right_old = prepared_right[idx]
-                right_new = prepared_right[nxt]
-                right_anim = _blend_rgba(right_old, right_new, right_mix_t)
-
-                # 背景固定，不做左右位移/缩放动画
-                left_old = prepared_left_bg[idx]
-                left_new = prepared_left_bg[nxt]
-                left_bg_anim = _blend_rgba(left_old, left_new, panel_mix_t)
-
-                # 背景始终用斜切边界在左右层之间做过渡，不会在左侧留下空白
-                frame = Image.composite(left_bg_anim, right_anim, dynamic_mask)
-
-                # 动态边缘阴影
-                edge_shadow = Image.new("RGBA", (target_w, target_h), (0, 0, 0, 0))
-                edge_shadow_layer = Image.new("RGBA", (target_w, target_h), (0, 0, 0, 120))
-                edge_shadow.paste(edge_shadow_layer, (0, 0), dynamic_shadow_mask)
-                frame = Image.alpha_composite(frame, edge_shadow)
-
-                # 标题固定，不做左右位移动画
-                text_mix = _blend_rgba(prepared_text[idx], prepared_text[nxt], panel_mix_t)
-                moving_text = Image.new("RGBA", (target_w, target_h), (0, 0, 0, 0))
-                moving_text.paste(text_mix, (0, 0), text_mix)
-                frame = Image.alpha_composite(frame, moving_text)
-
-                frame_file = tmp_path / f"frame_{f:04d}.bmp"
-                frame.convert("RGB").save(frame_file, format="BMP")
-
-            output_ext = ".gif" if animation_format == "gif" else ".png"
-            output_file = tmp_path / f"output{output_ext}"
-
-            ffmpeg_common = [
-                "ffmpeg", "-hide_banner", "-y",
-                "-framerate", str(safe_fps),
-                "-i", str(tmp_path / "frame_%04d.bmp"),
-                "-threads", "0",
-            ]
-
-            reduce_mode = animation_reduce_colors
-            if isinstance(reduce_mode, bool):
-                reduce_mode = "strong" if reduce_mode else "off"
-            if reduce_mode not in ["off", "medium", "strong"]:
-                reduce_mode = "strong"
-
-            if animation_format == "gif":
-                p_colors = "64" if reduce_mode == "strong" else ("128" if reduce_mode == "medium" else "256")
-                p_dither = "none" if reduce_mode == "strong" else ("bayer:bayer_scale=3" if reduce_mode == "medium" else "floyd_steinberg")
-                ffmpeg_cmd = ffmpeg_common + [
-                    "-filter_complex", f"[0:v] split [a][b]; [a] palettegen=max_colors={p_colors} [p]; [b][p] paletteuse=dither={p_dither}",
-                    "-loop", "0", "-f", "gif", str(output_file),
-                ]
-            else:
-                if reduce_mode == "off":
-                    ffmpeg_cmd = ffmpeg_common + [
-                        "-vcodec", "apng", "-pix_fmt", "rgba", "-plays", "0", "-f", "apng", str(output_file),
-                    ]
-                else:
-                    p_colors = "64" if reduce_mode == "strong" else "128"
-                    p_dither = "none" if reduce_mode == "strong" else "bayer:bayer_scale=3"
-                    ffmpeg_cmd = ffmpeg_common + [
-                        "-filter_complex", f"[0:v] split [a][b]; [a] palettegen=max_colors={p_colors}:reserve_transparent=on [p]; [b][p] paletteuse=dither={p_dither}",
-                        "-vcodec", "apng", "-pix_fmt", "rgba", "-plays", "0", "-f", "apng", str(output_file),
-                    ]
-
-            proc = subprocess.Popen(ffmpeg_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=False)
-            while True:
-                ret = proc.poll()
-                if ret is not None:
-                    if ret != 0:
-                        err_data = proc.stderr.read() if proc.stderr else b""
-                        raise subprocess.CalledProcessError(ret, ffmpeg_cmd, stderr=err_data)
-                    break
-                if stop_event and stop_event.is_set():
-                    proc.terminate()
-                    try:
-                        proc.wait(timeout=2)
-                    except subprocess.TimeoutExpired:
-                        proc.kill()
-                        proc.wait(timeout=2)
+                if not encoder.add_frame(frame):
                     return False
-                time.sleep(0.05)
 
-            with open(output_file, "rb") as f:
-                return base64.b64encode(f.read()).decode("utf-8")
+            return encoder.finish()
 
     except Exception as e:
         logger.error(f"创建 style_animated_2 失败: {e}")
@@ -1,18 +1,18 @@
-import base64
 from collections import Counter
 import io
 from pathlib import Path
-from PIL import Image, ImageFilter, ImageDraw, ImageFont, ImageOps
+from PIL import Image, ImageChops, ImageFilter, ImageDraw, ImageOps
 import numpy as np
 import os
 import math
 import random  # 添加随机模块
 import colorsys
 from app.log import logger
-import subprocess
-import tempfile
 import shutil
+from app.plugins.mediacovergeneratorashan.utils.animation_encoder import create_animation_encoder
 from app.plugins.mediacovergeneratorashan.utils.color_helper import ColorHelper
+from app.plugins.mediacovergeneratorashan.utils.frame_parallel import render_frames
+from app.plugins.mediacovergeneratorashan.utils.font_helper import load_font
 
 """ 
 代码修改自 https://github.com/HappyQuQu/jellyfin-library-poster/blob/main/gen_poster.py
@@ -35,6 +35,9 @@ POSTER_GEN_CONFIG = {
     "CANVAS_HEIGHT": 1080,  # 画布高度
 }
 
+# 动图滚动的亚像素精度：切片位移按 1/SUBPIXEL_STEPS 像素取整
+SUBPIXEL_STEPS = 4
+
 def add_shadow(img, offset=(5, 5), shadow_color=(0, 0, 0, 100), blur_radius=3):
     """
     给图片添加右侧和底部阴影
@@ -105,7 +108,7 @@ def draw_text_on_image(
     shadow_layer = Image.new('RGBA', img_copy.size, (0, 0, 0, 0))
     draw = ImageDraw.Draw(text_layer)
     shadow_draw = ImageDraw.Draw(shadow_layer)
-    font = ImageFont.truetype(font_path, font_size)
+    font = load_font(font_path, font_size)
     
     # 如果需要添加阴影
     if shadow:
@@ -182,7 +185,7 @@ def draw_multiline_text_on_image(
     img_copy = image.copy()
     text_layer = Image.new('RGBA', img_copy.size, (255, 255, 255, 0))
     draw = ImageDraw.Draw(text_layer)
-    font = ImageFont.truetype(font_path, font_size)
+    font = load_font(font_path, font_size)
 
     # 按空格分割文本
     lines = text.split(" ")
@@ -759,11 +762,122 @@ def add_film_grain(image, intensity=0.05):
     
     return Image.fromarray(img_array)
 
+def _column_scroll(col_index, progress, params):
+    """第 col_index 列在进度 progress 时的滚动距离（浮点像素）"""
+    scroll_dist = params["scroll_dist"]
+    animation_scroll = params["animation_scroll"]
+    col_phases = params["col_phases"]
+    total_scroll = progress * scroll_dist
+    phase_offset = col_phases[col_index % len(col_phases)]
+
+    if animation_scroll == 'up':
+        # 同向上滚：严格同步，不加列相位差
+        return total_scroll % scroll_dist
+    elif animation_scroll == 'down':
+        # 同向下滚：严格同步，不加列相位差
+        return (scroll_dist - total_scroll) % scroll_dist
+    elif animation_scroll == 'alternate':
+        # 现有模式：两边向下，中间向上
+        if col_index == 1:
+            return (total_scroll + phase_offset) % scroll_dist
+        return (scroll_dist - total_scroll + phase_offset) % scroll_dist
+    elif animation_scroll == 'alternate_reverse':
+        # 新增模式：两边向上，中间向下（与 alternate 相反）
+        if col_index == 1:
+            return (scroll_dist - total_scroll + phase_offset) % scroll_dist
+        return (total_scroll + phase_offset) % scroll_dist
+    return (scroll_dist - total_scroll) % scroll_dist
+
+
+def _rotation(angle):
+    """与 PIL rotate 相同的旋转系数：输出坐标 -> 输入坐标为 (a*x + b*y, -b*x + a*y)"""
+    rad = -math.radians(angle)
+    return round(math.cos(rad), 15), round(math.sin(rad), 15)
+
+
+def _rotated_size(size, angle):
+    """与 PIL rotate(expand=True) 相同的输出尺寸"""
+    w, h = size
+    a, b = _rotation(angle)
+    cx, cy = w / 2.0, h / 2.0
+    corners = ((0, 0), (w, 0), (w, h), (0, h))
+    xs = [a * (x - cx) + b * (y - cy) + cx for x, y in corners]
+    ys = [-b * (x - cx) + a * (y - cy) + cy for x, y in corners]
+    return math.ceil(max(xs)) - math.floor(min(xs)), math.ceil(max(ys)) - math.floor(min(ys))
+
+
+def _prerotate_strip(strip, angle, offset=(0.0, 0.0)):
+    """
+    整列旋转一次（expand），并将内容额外平移 -offset 像素，用于生成亚像素相位；
+    等价于 strip.rotate(angle, BILINEAR, expand=True) 后在 (x + ox, y + oy) 处取样
+    """
+    w, h = strip.size
+    rw, rh = _rotated_size(strip.size, angle)
+    a, b = _rotation(angle)
+    ox = offset[0] - rw / 2.0
+    oy = offset[1] - rh / 2.0
+    matrix = (a, b, a * ox + b * oy + w / 2.0, -b, a, -b * ox + a * oy + h / 2.0)
+    return strip.transform((rw, rh), Image.Transform.AFFINE, matrix, resample=Image.Resampling.BILINEAR)
+
+
+def _strip_geometry(strip_size, view_size, angle):
+    """
+    旋转后的切片与整列旋转图的对应关系：
+    piece(x, y) = rotated_strip(x + d0x + ux * dy, y + d0y + uy * dy)，dy 为切片在原始列中的纵向偏移。
+    返回 (d0x, d0y, ux, uy)
+    """
+    a, b = _rotation(angle)
+    rw, rh = _rotated_size(strip_size, angle)
+    pw, ph = _rotated_size(view_size, angle)
+    vx = view_size[0] / 2.0 - strip_size[0] / 2.0
+    vy = view_size[1] / 2.0 - strip_size[1] / 2.0
+    d0x = rw / 2.0 - pw / 2.0 + a * vx - b * vy
+    d0y = rh / 2.0 - ph / 2.0 + b * vx + a * vy
+    return d0x, d0y, -b, a
+
+
+def _subpixel_offset(dx, dy):
+    """将位移拆成整数像素与亚像素相位 ((nx, ny), (i, j))"""
+    mx = int(round(dx * SUBPIXEL_STEPS))
+    my = int(round(dy * SUBPIXEL_STEPS))
+    return (mx // SUBPIXEL_STEPS, my // SUBPIXEL_STEPS), (mx % SUBPIXEL_STEPS, my % SUBPIXEL_STEPS)
+
+
+def _column_offsets(i, params):
+    """第 i 帧各列的 (整数位移, 亚像素相位)"""
+    progress = i / params["n_frames"]
+    offsets = []
+    for col_index, (d0x, d0y, ux, uy, _) in enumerate(params["columns"]):
+        dy_float = _column_scroll(col_index, progress, params)
+        offsets.append(_subpixel_offset(d0x + ux * dy_float, d0y + uy * dy_float))
+    return offsets
+
+
+def _render_frame(i, layers, params):
+    """
+    渲染第 i 帧：各列从预旋转的整列图中按滚动位移裁剪切片，乘上旋转后的视窗遮罩贴到底图上，
+    每帧只有裁剪与粘贴，不再逐帧旋转
+    """
+    frame = layers["base_frame"].copy()
+    window_mask = layers["window_mask"]
+    piece_w, piece_h = window_mask.size
+    variants = layers["variants"]
+    variant_index = params["variant_index"]
+
+    for col_index, ((nx, ny), phase) in enumerate(_column_offsets(i, params)):
+        variant = variants[variant_index[(col_index,) + phase]]
+        piece = variant.crop((nx, ny, nx + piece_w, ny + piece_h))
+        mask = ImageChops.multiply(piece.getchannel("A"), window_mask)
+        frame.paste(piece, params["columns"][col_index][4], mask)
+    return frame
+
+
 def create_style_animated_3(library_dir, title, font_path, font_size=(170,75), font_offset=(0,40,40), 
                            is_blur=False, blur_size=50, color_ratio=0.8, resolution_config=None, 
                            bg_color_config=None, animation_duration=12, animation_scroll='down', 
                            animation_fps=15, animation_format='apng', animation_resolution='300x200', 
-                           animation_reduce_colors='strong', stop_event=None):
+                           animation_reduce_colors='strong', animation_export_mode='pipe',
+                           animation_encoder='auto', frame_workers=1, stop_event=None):
     """
     生成多图滚动的动图 (GIF/WebP)，通过 ffmpeg 合成
     已优化版：在目标分辨率下直接合成，预处理旋转和文字，效率提升约 5-8 倍。
@@ -940,8 +1054,10 @@ def create_style_animated_3(library_dir, title, font_path, font_size=(170,75), f
                 base_cx += col_x_step * 2 + third_col_extra_x
             base_centers.append((base_cx, base_cy))
 
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            tmp_path = Path(tmp_dir)
+        # 限制 ffmpeg 线程数为 2，防卡死
+        with create_animation_encoder(animation_format, fps, animation_reduce_colors,
+                                      export_mode=animation_export_mode, threads='2',
+                                      stop_event=stop_event, encoder=animation_encoder) as encoder:
             logger.info(f"正在进行帧合成 (共 {n_frames} 帧, 目标 {target_w}x{target_h})...")
             
             # 强制转换为数值类型，防止字符串乘法导致的无限循环
@@ -960,95 +1076,54 @@ def create_style_animated_3(library_dir, title, font_path, font_size=(170,75), f
             
             logger.info(f"开始生成动画帧: {n_frames} 帧, 格式: {animation_format}, 分辨率: {animation_resolution}")
             
+            # 旋转后的视窗遮罩：与逐帧旋转切片时切片的外形一致
+            window_mask = Image.new("L", (view_w, view_h), 255).rotate(
+                rotation_angle, resample=Image.Resampling.BILINEAR, expand=True)
+            columns = []
+            for col_index, strip in enumerate(rendered_strips):
+                bcx, bcy = base_centers[col_index]
+                pos_x = int(bcx - window_mask.width // 2 + cell_width // 2)
+                pos_y = int(bcy - window_mask.height // 2)
+                columns.append(_strip_geometry(strip.size, (view_w, view_h), rotation_angle) + ((pos_x, pos_y),))
+            params = {
+                "n_frames": n_frames,
+                "scroll_dist": scroll_dist,
+                "animation_scroll": animation_scroll,
+                "col_phases": col_phases,
+                "columns": columns,
+            }
+
+            # 每列只为实际用到的亚像素相位旋转一次
+            variants = []
+            variant_index = {}
             for i in range(n_frames):
+                for col_index, (_, phase) in enumerate(_column_offsets(i, params)):
+                    key = (col_index,) + phase
+                    if key in variant_index:
+                        continue
+                    variant_index[key] = len(variants)
+                    offset = (phase[0] / SUBPIXEL_STEPS, phase[1] / SUBPIXEL_STEPS)
+                    variants.append(_prerotate_strip(rendered_strips[col_index], rotation_angle, offset))
+            params["variant_index"] = variant_index
+            logger.info(f"预旋转切片完成，共 {len(variants)} 个亚像素相位")
+
+            layers = {"base_frame": base_frame, "window_mask": window_mask, "variants": variants}
+            frames = render_frames(_render_frame, n_frames, layers, params, base_frame.size,
+                                   workers=frame_workers, stop_event=stop_event)
+            for i, frame in enumerate(frames):
                 if stop_event and stop_event.is_set():
                     logger.info("检测到停止信号，中断动图生成 ...")
                     return False
                 
                 if i % 10 == 0:
                     logger.info(f"正在生成第 {i}/{n_frames} 帧...")
-                
-                frame = base_frame.copy()
-                progress = i / n_frames
-
-                for col_index, strip in enumerate(rendered_strips):
-                    total_scroll = progress * scroll_dist
-                    phase_offset = col_phases[col_index % len(col_phases)]
-
-                    if animation_scroll == 'up':
-                        # 同向上滚：严格同步，不加列相位差
-                        dy_float = total_scroll % scroll_dist
-                    elif animation_scroll == 'down':
-                        # 同向下滚：严格同步，不加列相位差
-                        dy_float = (scroll_dist - total_scroll) % scroll_dist
-                    elif animation_scroll == 'alternate':
-                        # 现有模式：两边向下，中间向上
-                        if col_index == 1:
-                            dy_float = (total_scroll + phase_offset) % scroll_dist
-                        else:
-                            dy_float = (scroll_dist - total_scroll + phase_offset) % scroll_dist
-                    elif animation_scroll == 'alternate_reverse':
-                        # 新增模式：两边向上，中间向下（与 alternate 相反）
-                        if col_index == 1:
-                            dy_float = (scroll_dist - total_scroll + phase_offset) % scroll_dist
-                        else:
-                            dy_float = (total_scroll + phase_offset) % scroll_dist
-                    else:
-                        dy_float = (scroll_dist - total_scroll) % scroll_dist
-
-                    # 裁剪垂直切片 (与老版一致)
-                    dy_int = int(dy_float)
-                    sub_strip = strip.crop((0, dy_int, view_w, dy_int + view_h))
-                    
-                    # 旋转切片 (关键：在目标分辨率下旋转，开销极小)
-                    rotated_piece = sub_strip.rotate(rotation_angle, resample=Image.Resampling.BILINEAR, expand=True)
-                    
-                    bcx, bcy = base_centers[col_index]
-                    pos_x = int(bcx - rotated_piece.width // 2 + cell_width // 2)
-                    pos_y = int(bcy - rotated_piece.height // 2)
-                    frame.paste(rotated_piece, (pos_x, pos_y), rotated_piece)
-
-                # 最终一帧写入 (使用 BMP 消除 PNG 压缩耗时)
-                frame_file = tmp_path / f"frame_{i:04d}.bmp"
-                frame.convert("RGB").save(frame_file, format="BMP")
-
-            # 7. ffmpeg 导出
-            output_ext = ".gif" if animation_format == 'gif' else ".png"
-            output_file = tmp_path / f"output{output_ext}"
-            
-            # 构建 ffmpeg 参数，限制线程数为 2，防卡死
-            ffmpeg_common = ['ffmpeg', '-hide_banner', '-y', '-framerate', str(fps), '-i', str(tmp_path / 'frame_%04d.bmp'), '-threads', '2']
-            
-            reduce_mode = animation_reduce_colors
-            if isinstance(reduce_mode, bool): reduce_mode = 'strong' if reduce_mode else 'off'
-            
-            if animation_format == 'gif':
-                p_colors = '64' if reduce_mode == 'strong' else ('128' if reduce_mode == 'medium' else '256')
-                p_dither = 'none' if reduce_mode == 'strong' else ('bayer:bayer_scale=3' if reduce_mode == 'medium' else 'floyd_steinberg')
-                ffmpeg_cmd = ffmpeg_common + ['-filter_complex', f'[0:v] split [a][b]; [a] palettegen=max_colors={p_colors} [p]; [b][p] paletteuse=dither={p_dither}', '-loop', '0', '-f', 'gif', str(output_file)]
-            else: # APNG
-                if reduce_mode == 'off':
-                    ffmpeg_cmd = ffmpeg_common + ['-vcodec', 'apng', '-pix_fmt', 'rgba', '-plays', '0', '-f', 'apng', str(output_file)]
-                else:
-                    p_colors = '64' if reduce_mode == 'strong' else '128'
-                    p_dither = 'none' if reduce_mode == 'strong' else 'bayer:bayer_scale=3'
-                    ffmpeg_cmd = ffmpeg_common + ['-filter_complex', f'[0:v] split [a][b]; [a] palettegen=max_colors={p_colors}:reserve_transparent=on [p]; [b][p] paletteuse=dither={p_dither}', '-vcodec', 'apng', '-pix_fmt', 'rgba', '-plays', '0', '-f', 'apng', str(output_file)]
 
-            logger.debug("正在启动 ffmpeg...")
-            try:
-                # 显式重定向 stdout/stderr 到 PIPE 以便捕捉错误
-                result = subprocess.run(ffmpeg_cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
-                if result.stderr:
-                    result.stderr = b""
-            except subprocess.CalledProcessError as e:
-                error_msg = e.stderr.decode('utf-8', 'ignore') if e.stderr else "无详细错误信息"
-                logger.error(f"[VER_FIX_PARAMS] ffmpeg 执行失败 (状态码 {e.returncode})")
-                raise
-            
-            with open(output_file, 'rb') as f:
-                final_data = f.read()
-            logger.info(f"ffmpeg 导出成功! 最终大小: {len(final_data)/1024/1024:.2f} MB")
-            return base64.b64encode(final_data).decode('utf-8')
+                # 逐帧交给编码器，pipe 模式下直接写入 ffmpeg
+                if not encoder.add_frame(frame):
+                    logger.info("检测到停止信号，中断动图生成 ...")
+                    return False
+
+            return encoder.finish()
 
     except Exception as e:
         logger.error(f"创建 style_animated_3 失败: {e}")
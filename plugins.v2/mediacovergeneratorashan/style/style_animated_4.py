@@ -1,21 +1,20 @@
-import base64
 import hashlib
 import math
 import os
-import subprocess
-import tempfile
-import time
 from pathlib import Path
 
 import numpy as np
-from PIL import Image, ImageDraw, ImageFilter, ImageFont, ImageOps
+from PIL import Image, ImageDraw, ImageFilter, ImageOps
 
 from app.log import logger
 from app.plugins.mediacovergeneratorashan.style.style_static_2 import (
     darken_color,
     find_dominant_vibrant_colors,
 )
+from app.plugins.mediacovergeneratorashan.utils.animation_encoder import create_animation_encoder
 from app.plugins.mediacovergeneratorashan.utils.color_helper import ColorHelper
+from app.plugins.mediacovergeneratorashan.utils.frame_parallel import render_frames
+from app.plugins.mediacovergeneratorashan.utils.font_helper import load_font
 
 
 def _clamp(v, lo, hi):
@@ -109,8 +108,8 @@ def _build_text_layer(canvas_size, title, font_path, font_size, font_offset, tin
     draw = ImageDraw.Draw(text_layer)
     sdraw = ImageDraw.Draw(shadow_layer)
 
-    zh_font = ImageFont.truetype(zh_font_path, int(max(1, float(zh_font_size))))
-    en_font = ImageFont.truetype(en_font_path, int(max(1, float(en_font_size))))
+    zh_font = load_font(zh_font_path, int(max(1, float(zh_font_size))))
+    en_font = load_font(en_font_path, int(max(1, float(en_font_size))))
 
     cx = canvas_size[0] // 2
     cy = canvas_size[1] // 2
@@ -158,6 +157,24 @@ def _build_text_layer(canvas_size, title, font_path, font_size, font_offset, tin
     )
 
 
+def _render_frame(f, layers, params):
+    """渲染第 f 帧：相邻两张背景与文字层交叉渐变"""
+    prepared_bg = layers["bg"]
+    prepared_text = layers["text"]
+    n_imgs = len(prepared_bg)
+
+    phase = f / float(params["total_frames"])
+    cycle_pos = phase * n_imgs
+    idx = int(cycle_pos) % n_imgs
+    nxt = (idx + 1) % n_imgs
+    local = cycle_pos - int(cycle_pos)
+    mix_t = _ease_in_out_sine(local)
+
+    frame = _blend_rgba(prepared_bg[idx], prepared_bg[nxt], mix_t)
+    text_mix = _blend_rgba(prepared_text[idx], prepared_text[nxt], mix_t)
+    return Image.alpha_composite(frame, text_mix)
+
+
 def create_style_animated_4(
     library_dir,
     title,
@@ -175,6 +192,9 @@ def create_style_animated_4(
     animation_resolution="320x180",
     animation_reduce_colors="strong",
     image_count=5,
+    animation_export_mode="pipe",
+    animation_encoder="auto",
+    frame_workers=1,
     stop_event=None,
 ):
     try:
@@ -232,87 +252,26 @@ def create_style_animated_4(
         safe_duration = max(1, int(animation_duration))
         total_frames = max(1, int(round(safe_fps * safe_duration)))
 
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            tmp_path = Path(tmp_dir)
+        with create_animation_encoder(animation_format, safe_fps, animation_reduce_colors,
+                                      export_mode=animation_export_mode, threads="0",
+                                      stop_event=stop_event, encoder=animation_encoder) as encoder:
             n_imgs = len(prepared_bg)
 
             logger.info(f"开始生成帧，共 {total_frames} 帧，素材数 {n_imgs}")
-            for f in range(total_frames):
+            frames = render_frames(_render_frame, total_frames,
+                                   {"bg": prepared_bg, "text": prepared_text},
+                                   {"total_frames": total_frames},
+                                   canvas_size, workers=frame_workers, stop_event=stop_event)
+            for f, frame in enumerate(frames):
                 if stop_event and stop_event.is_set():
                     return False
                 if f % 10 == 0:
                     logger.info(f"正在生成第 {f}/{total_frames} 帧...")
 
-                phase = f / float(total_frames)
-                cycle_pos = phase * n_imgs
-                idx = int(cycle_pos) % n_imgs
-                nxt = (idx + 1) % n_imgs
-                local = cycle_pos - int(cycle_pos)
-                mix_t = _ease_in_out_sine(local)
-
-                frame = _blend_rgba(prepared_bg[idx], prepared_bg[nxt], mix_t)
-                text_mix = _blend_rgba(prepared_text[idx], prepared_text[nxt], mix_t)
-                frame = Image.alpha_composite(frame, text_mix)
-
-                frame_file = tmp_path / f"frame_{f:04d}.bmp"
-                frame.convert("RGB").save(frame_file, format="BMP")
-
-            output_ext = ".gif" if animation_format == "gif" else ".png"
-            output_file = tmp_path / f"output{output_ext}"
-
-            ffmpeg_common = [
-                "ffmpeg", "-hide_banner", "-y",
-                "-framerate", str(safe_fps),
-                "-i", str(tmp_path / "frame_%04d.bmp"),
-                "-threads", "0",
-            ]
-
-            reduce_mode = animation_reduce_colors
-            if isinstance(reduce_mode, bool):
-                reduce_mode = "strong" if reduce_mode else "off"
-            if reduce_mode not in ["off", "medium", "strong"]:
-                reduce_mode = "strong"
-
-            if animation_format == "gif":
-                p_colors = "64" if reduce_mode == "strong" else ("128" if reduce_mode == "medium" else "256")
-                p_dither = "none" if reduce_mode == "strong" else ("bayer:bayer_scale=3" if reduce_mode == "medium" else "floyd_steinberg")
-                ffmpeg_cmd = ffmpeg_common + [
-                    "-filter_complex", f"[0:v] split [a][b]; [a] palettegen=max_colors={p_colors} [p]; [b][p] paletteuse=dither={p_dither}",
-                    "-loop", "0", "-f", "gif", str(output_file),
-                ]
-            else:
-                if reduce_mode == "off":
-                    ffmpeg_cmd = ffmpeg_common + [
-                        "-vcodec", "apng", "-pix_fmt", "rgba", "-plays", "0", "-f", "apng", str(output_file),
-                    ]
-                else:
-                    p_colors = "64" if reduce_mode == "strong" else "128"
-                    p_dither = "none" if reduce_mode == "strong" else "bayer:bayer_scale=3"
-                    ffmpeg_cmd = ffmpeg_common + [
-                        "-filter_complex", f"[0:v] split [a][b]; [a] palettegen=max_colors={p_colors}:reserve_transparent=on [p]; [b][p] paletteuse=dither={p_dither}",
-                        "-vcodec", "apng", "-pix_fmt", "rgba", "-plays", "0", "-f", "apng", str(output_file),
-                    ]
-
-            proc = subprocess.Popen(ffmpeg_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=False)
-            while True:
-                ret = proc.poll()
-                if ret is not None:
-                    if ret != 0:
-                        err_data = proc.stderr.read() if proc.stderr else b""
-                        raise subprocess.CalledProcessError(ret, ffmpeg_cmd, stderr=err_data)
-                    break
-                if stop_event and stop_event.is_set():
-                    proc.terminate()
-                    try:
-                        proc.wait(timeout=2)
-                    except subprocess.TimeoutExpired:
-                        proc.kill()
-                        proc.wait(timeout=2)
+                if not encoder.add_frame(frame):
                     return False
-                time.sleep(0.05)
 
-            with open(output_file, "rb") as f:
-                return base64.b64encode(f.read()).decode("utf-8")
+            return encoder.finish()
     except Exception as e:
         logger.error(f"创建 style_animated_4 失败: {e}")
         return False
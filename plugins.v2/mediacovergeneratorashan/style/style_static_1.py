@@ -1,4 +1,3 @@
-import base64
 import random
 import colorsys
 from collections import Counter
@@ -7,7 +6,7 @@ from pathlib import Path
 import math
 
 import numpy as np
-from PIL import Image, ImageDraw, ImageFilter, ImageFont, ImageOps
+from PIL import Image, ImageDraw, ImageFilter, ImageOps
 
 from app.log import logger
 from app.plugins.mediacovergeneratorashan.utils.image_manager import (
@@ -17,6 +16,7 @@ from app.plugins.mediacovergeneratorashan.utils.performance_helper import (
     OptimizedImageProcessor, PerformanceMonitor, memory_efficient_operation
 )
 from app.plugins.mediacovergeneratorashan.utils.color_helper import ColorHelper
+from app.plugins.mediacovergeneratorashan.utils.font_helper import load_font
 
 
 # ========== 配置 ==========
@@ -508,8 +508,8 @@ def create_style_static_1(image_path, title, font_path, font_size=(170,75), font
             left_area_center_y = canvas_size[1] // 2
 
             # 使用动态字体大小
-            zh_font = ImageFont.truetype(zh_font_path, int(zh_font_size))
-            en_font = ImageFont.truetype(en_font_path, int(en_font_size))
+            zh_font = load_font(zh_font_path, int(zh_font_size))
+            en_font = load_font(en_font_path, int(en_font_size))
 
             # 文字颜色和阴影颜色
             text_color = (255, 255, 255, 229)  # 85% 不透明度
@@ -628,7 +628,7 @@ def create_style_static_1(image_path, title, font_path, font_size=(170,75), font
         # 转为 RGB
         # rgb_image = combined.convert("RGB")
 
-        def image_to_base64(image, format="auto", quality=85):
+        def image_to_bytes(image, format="auto", quality=85):
             buffer = BytesIO()
             if format.lower() == "auto":
                 if image.mode == "RGBA" or (image.info.get('transparency') is not None):
@@ -636,23 +636,20 @@ def create_style_static_1(image_path, title, font_path, font_size=(170,75), font
                 else:
                     try:
                         image.save(buffer, format="WEBP", quality=quality, optimize=True)
-                        base64_str = base64.b64encode(buffer.getvalue()).decode('utf-8')
-                        return base64_str
+                        return buffer.getvalue()
                     except Exception:
                         format = "JPEG" # Fallback to JPEG if WebP fails
             if format.lower() == "png":
                 image.save(buffer, format="PNG", optimize=True)
-                base64_str = base64.b64encode(buffer.getvalue()).decode('utf-8')
-                return base64_str
+                return buffer.getvalue()
             elif format.lower() == "jpeg":
                 image = image.convert("RGB") # Ensure RGB for JPEG
                 image.save(buffer, format="JPEG", quality=quality, optimize=True, progressive=True)
-                base64_str = base64.b64encode(buffer.getvalue()).decode('utf-8')
-                return base64_str
+                return buffer.getvalue()
             else:
                 raise ValueError(f"Unsupported format: {format}")
 
-        return image_to_base64(combined)
+        return image_to_bytes(combined)
         
     except Exception as e:
         logger.error(f"创建单图封面时出错: {e}")
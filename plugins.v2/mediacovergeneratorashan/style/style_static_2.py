@@ -1,4 +1,3 @@
-import base64
 import os
 import random
 import colorsys
@@ -7,10 +6,11 @@ from io import BytesIO
 from pathlib import Path
 
 import numpy as np
-from PIL import Image, ImageDraw, ImageFilter, ImageFont, ImageOps
+from PIL import Image, ImageDraw, ImageFilter, ImageOps
 
 from app.log import logger
 from app.plugins.mediacovergeneratorashan.utils.color_helper import ColorHelper
+from app.plugins.mediacovergeneratorashan.utils.font_helper import load_font
 
 # ========== 配置 ==========
 canvas_size = (1920, 1080)
@@ -360,8 +360,8 @@ def create_style_static_2(image_path, title, font_path, font_size=(170,75), font
         # zh_font_size = int(canvas_size[1] * 0.17 * float(zh_font_size_ratio))
         # en_font_size = int(canvas_size[1] * 0.07 * float(en_font_size_ratio))
         
-        zh_font = ImageFont.truetype(zh_font_path, zh_font_size)
-        en_font = ImageFont.truetype(en_font_path, en_font_size)
+        zh_font = load_font(zh_font_path, zh_font_size)
+        en_font = load_font(en_font_path, en_font_size)
             
         # 文字颜色和阴影颜色
         text_color = (255, 255, 255, 229)  # 85% 不透明度
@@ -477,7 +477,7 @@ def create_style_static_2(image_path, title, font_path, font_size=(170,75), font
         # 合并所有图层
         combined = Image.alpha_composite(combined, text_layer)
 
-        def image_to_base64(image, format="auto", quality=85):
+        def image_to_bytes(image, format="auto", quality=85):
             buffer = BytesIO()
             if format.lower() == "auto":
                 if image.mode == "RGBA" or (image.info.get('transparency') is not None):
@@ -485,23 +485,20 @@ def create_style_static_2(image_path, title, font_path, font_size=(170,75), font
                 else:
                     try:
                         image.save(buffer, format="WEBP", quality=quality, optimize=True)
-                        base64_str = base64.b64encode(buffer.getvalue()).decode('utf-8')
-                        return base64_str
+                        return buffer.getvalue()
                     except Exception:
                         format = "JPEG" # Fallback to JPEG if WebP fails
             if format.lower() == "png":
                 image.save(buffer, format="PNG", optimize=True)
-                base64_str = base64.b64encode(buffer.getvalue()).decode('utf-8')
-                return base64_str
+                return buffer.getvalue()
             elif format.lower() == "jpeg":
                 image = image.convert("RGB") # Ensure RGB for JPEG
                 image.save(buffer, format="JPEG", quality=quality, optimize=True, progressive=True)
-                base64_str = base64.b64encode(buffer.getvalue()).decode('utf-8')
-                return base64_str
+                return buffer.getvalue()
             else:
                 raise ValueError(f"Unsupported format: {format}")
             
-        return image_to_base64(combined)
+        return image_to_bytes(combined)
     except Exception as e:
         logger.error(f"创建单图封面时出错: {e}")
         return False
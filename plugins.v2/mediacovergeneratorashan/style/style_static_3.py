@@ -1,8 +1,7 @@
-import base64
 from collections import Counter
 import io
 from pathlib import Path
-from PIL import Image, ImageFilter, ImageDraw, ImageFont, ImageOps
+from PIL import Image, ImageFilter, ImageDraw, ImageOps
 import numpy as np
 import os
 import math
@@ -11,6 +10,7 @@ import colorsys
 import traceback
 from app.log import logger
 from app.plugins.mediacovergeneratorashan.utils.color_helper import ColorHelper
+from app.plugins.mediacovergeneratorashan.utils.font_helper import load_font
 
 """ 
 代码修改自 https://github.com/HappyQuQu/jellyfin-library-poster/blob/main/gen_poster.py
@@ -107,7 +107,7 @@ def draw_text_on_image(
     shadow_draw = ImageDraw.Draw(shadow_layer)
     font_size = int(max(1, round(float(font_size))))
     shadow_offset = int(max(1, round(float(shadow_offset))))
-    font = ImageFont.truetype(font_path, font_size)
+    font = load_font(font_path, font_size)
     
     # 如果需要添加阴影
     if shadow:
@@ -189,7 +189,7 @@ def draw_multiline_text_on_image(
     font_size = int(max(1, round(float(font_size))))
     shadow_offset = int(max(1, round(float(shadow_offset))))
     line_spacing = int(round(float(line_spacing)))
-    font = ImageFont.truetype(font_path, font_size)
+    font = load_font(font_path, font_size)
 
     # 按空格分割文本
     lines = text.split(" ")
@@ -784,7 +784,7 @@ def create_style_static_3(library_dir, title, font_path, font_size=(170,75), fon
       zh_font_path: 首选的中文字体文件路径 (可以是None)。
       en_font_path: 首选的英文字体文件路径 (可以是None)。
     返回:
-      生成的PNG海报图片的base64编码字符串，失败则返回None。
+      生成的海报图片字节，失败则返回None。
     """
     """
     将多张电影海报排列成三列，每列三张，然后将每列作为整体旋转并放在渐变背景上
@@ -1141,8 +1141,8 @@ def create_style_static_3(library_dir, title, font_path, font_size=(170,75), fon
             else:
                 font_size = base_font_size
 
-            zh_font = ImageFont.truetype(zh_font_path, int(max(1, round(zh_font_size))))
-            en_font = ImageFont.truetype(en_font_path, int(font_size))
+            zh_font = load_font(zh_font_path, int(max(1, round(zh_font_size))))
+            en_font = load_font(en_font_path, int(font_size))
 
             zh_bbox = draw.textbbox((0, 0), title_zh, font=zh_font)
             zh_text_w = zh_bbox[2] - zh_bbox[0]
@@ -1181,7 +1181,7 @@ def create_style_static_3(library_dir, title, font_path, font_size=(170,75), fon
                 result, color_block_position, color_block_size, random_color
             )
         # 保存结果
-        def image_to_base64(image, format="auto", quality=85):
+        def image_to_bytes(image, format="auto", quality=85):
             buffer = io.BytesIO()
             if format.lower() == "auto":
                 if image.mode == "RGBA" or (image.info.get('transparency') is not None):
@@ -1189,23 +1189,20 @@ def create_style_static_3(library_dir, title, font_path, font_size=(170,75), fon
                 else:
                     try:
                         image.save(buffer, format="WEBP", quality=quality, optimize=True)
-                        base64_str = base64.b64encode(buffer.getvalue()).decode('utf-8')
-                        return base64_str
+                        return buffer.getvalue()
                     except Exception:
                         format = "JPEG" # Fallback to JPEG if WebP fails
             if format.lower() == "png":
                 image.save(buffer, format="PNG", optimize=True)
-                base64_str = base64.b64encode(buffer.getvalue()).decode('utf-8')
-                return base64_str
+                return buffer.getvalue()
             elif format.lower() == "jpeg":
                 image = image.convert("RGB") # Ensure RGB for JPEG
                 image.save(buffer, format="JPEG", quality=quality, optimize=True, progressive=True)
-                base64_str = base64.b64encode(buffer.getvalue()).decode('utf-8')
-                return base64_str
+                return buffer.getvalue()
             else:
                 raise ValueError(f"Unsupported format: {format}")
             
-        return image_to_base64(result)
+        return image_to_bytes(result)
 
     except Exception as e:
         logger.error(f"创建多图封面时出错: {e}")
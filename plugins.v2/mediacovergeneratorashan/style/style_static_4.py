@@ -1,8 +1,7 @@
-import base64
 from io import BytesIO
 
 import numpy as np
-from PIL import Image, ImageDraw, ImageFilter, ImageFont, ImageOps
+from PIL import Image, ImageDraw, ImageFilter, ImageOps
 
 from app.log import logger
 from app.plugins.mediacovergeneratorashan.style.style_static_2 import (
@@ -10,6 +9,7 @@ from app.plugins.mediacovergeneratorashan.style.style_static_2 import (
     find_dominant_vibrant_colors,
 )
 from app.plugins.mediacovergeneratorashan.utils.color_helper import ColorHelper
+from app.plugins.mediacovergeneratorashan.utils.font_helper import load_font
 
 
 def _wrap_english(draw, text, font, max_width):
@@ -91,8 +91,8 @@ def create_style_static_4(
         draw = ImageDraw.Draw(text_layer)
         sdraw = ImageDraw.Draw(shadow_layer)
 
-        zh_font = ImageFont.truetype(zh_font_path, int(max(1, float(zh_font_size))))
-        en_font = ImageFont.truetype(en_font_path, int(max(1, float(en_font_size))))
+        zh_font = load_font(zh_font_path, int(max(1, float(zh_font_size))))
+        en_font = load_font(en_font_path, int(max(1, float(en_font_size))))
 
         cx = canvas_size[0] // 2
         cy = canvas_size[1] // 2
@@ -139,7 +139,7 @@ def create_style_static_4(
 
         buf = BytesIO()
         merged.save(buf, format="PNG", optimize=True)
-        return base64.b64encode(buf.getvalue()).decode("utf-8")
+        return buf.getvalue()
     except Exception as e:
         logger.error(f"创建静态4封面时出错: {e}")
         return False
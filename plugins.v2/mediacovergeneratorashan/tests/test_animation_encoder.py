@@ -0,0 +1,47 @@
+"""
+内置动图编码器：合并重复帧后总时长保持准确（GIF 帧延时以 10 毫秒为单位）
+"""
+import io
+
+import pytest
+from PIL import Image
+
+from app.plugins.mediacovergeneratorashan.utils.animation_encoder import NativeAnimationEncoder
+
+
+def _encode(animation_format, fps, runs, reduce_colors="off"):
+    with NativeAnimationEncoder(animation_format, fps, reduce_colors) as encoder:
+        for k, repeat in enumerate(runs):
+            frame = Image.new("RGB", (16, 8), ((k * 37) % 256, (k * 91) % 256, 255 - (k * 53) % 256))
+            assert encoder.add_frame(frame, repeat)
+        assert encoder.frame_count == sum(runs)
+        return encoder.finish()
+
+
+def _durations(data):
+    with Image.open(io.BytesIO(data)) as image:
+        durations = []
+        for index in range(image.n_frames):
+            image.seek(index)
+            durations.append(image.info["duration"])
+    return durations
+
+
+@pytest.mark.parametrize("animation_format", ["gif", "apng"])
+@pytest.mark.parametrize("reduce_colors", ["off", "strong"])
+@pytest.mark.parametrize("fps, runs", [
+    (12, [1] * 36),
+    (15, [1] * 45),
+    (12, [3, 1, 5, 1, 1, 2, 4, 1, 6, 1, 7, 2, 1, 1]),
+    (30, [7, 1, 1, 13, 1, 1, 1, 5, 30, 1, 1, 9, 19]),
+])
+def test_total_duration_is_exact(animation_format, reduce_colors, fps, runs):
+    durations = _durations(_encode(animation_format, fps, runs, reduce_colors))
+
+    assert sum(durations) == pytest.approx(sum(runs) * 1000 / fps, abs=5)
+    if animation_format == "gif":
+        assert all(duration % 10 == 0 for duration in durations)
+
+
+def test_repeated_frames_are_written_once():
+    assert _durations(_encode("apng", 10, [4, 1, 3])) == [400, 100, 300]
@@ -0,0 +1,67 @@
+"""
+上传去重：只比较渲染结果的内容哈希与服务器上的封面 tag，输入指纹不参与判断
+（输入未变化时跳过渲染由 skip_unchanged 负责）。需在 MoviePilot 环境中运行
+"""
+import hashlib
+import threading
+
+import pytest
+
+from app.plugins.mediacovergeneratorashan import MediaCoverGeneratorAshan
+from app.plugins.mediacovergeneratorashan.utils.concurrency_helper import LibraryJob
+
+
+COVER = hashlib.sha256(b"cover").hexdigest()
+OTHER_COVER = hashlib.sha256(b"other cover").hexdigest()
+
+
+class _Service:
+    name = "emby"
+    type = "emby"
+
+
+def _job(fingerprint):
+    job = LibraryJob("emby", _Service(), {"Id": "lib-1", "Name": "电影"})
+    job.fingerprint = fingerprint
+    return job
+
+
+def _plugin(server_tag, verify_tag=True):
+    """不经 init_plugin 构造插件，只准备上传记录与服务器 tag 查询"""
+    plugin = MediaCoverGeneratorAshan.__new__(MediaCoverGeneratorAshan)
+    records = {"emby-lib-1": {"hash": COVER, "tag": "tag-1", "timestamp": 0}}
+    plugin._fingerprint_lock = threading.Lock()
+    plugin._verify_server_image_tag = verify_tag
+    plugin.get_data = lambda key=None, *args, **kwargs: {"upload_records": records}.get(key)
+    plugin._MediaCoverGeneratorAshan__get_library_image_tag = lambda job: server_tag
+    return plugin
+
+
+def _is_same(plugin, job, content_hash):
+    return plugin._MediaCoverGeneratorAshan__is_same_as_last_upload(job, content_hash)
+
+
+def test_same_hash_with_different_fingerprint_is_skipped():
+    assert _is_same(_plugin("tag-1"), _job("fingerprint-2"), COVER)
+
+
+def test_different_hash_with_same_fingerprint_is_uploaded():
+    job = _job("fingerprint-1")
+    plugin = _plugin("tag-1")
+    plugin.get_data("upload_records")["emby-lib-1"]["fingerprint"] = "fingerprint-1"
+    assert not _is_same(plugin, job, OTHER_COVER)
+
+
+@pytest.mark.parametrize("server_tag", ["tag-2", None])
+def test_changed_or_missing_server_tag_is_uploaded(server_tag):
+    assert not _is_same(_plugin(server_tag), _job("fingerprint-1"), COVER)
+
+
+def test_server_tag_ignored_when_verification_is_off():
+    assert _is_same(_plugin("tag-2", verify_tag=False), _job("fingerprint-1"), COVER)
+
+
+def test_no_previous_upload_is_uploaded():
+    plugin = _plugin("tag-1")
+    plugin.get_data("upload_records").clear()
+    assert not _is_same(plugin, _job("fingerprint-1"), COVER)
@@ -0,0 +1,431 @@
+"""
+动图编码
+各动态风格逐帧渲染后统一交给这里导出 APNG/GIF，编码器：
+- ffmpeg：调用外部 ffmpeg，导出模式分为
+  - pipe：先启动 ffmpeg，逐帧通过 stdin 写入原始 RGB 数据（-f rawvideo），渲染与编码同时进行，帧不落盘
+  - bmp：逐帧写入临时目录的 BMP 文件，全部渲染完成后再调用 ffmpeg，便于排查帧内容
+- native：不依赖 ffmpeg，用 numpy 从关键帧计算全局调色板，由 Pillow 的 save_all 写出 APNG/GIF
+连续重复的帧可以一次写入（add_frame 的 repeat），native 编码器将其写成一帧并延长显示时长
+"""
+import io
+import shutil
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional, Union
+
+import numpy as np
+from PIL import Image
+
+from app.log import logger
+
+
+EXPORT_MODES = ("pipe", "bmp")
+REDUCE_MODES = ("off", "medium", "strong")
+ENCODERS = ("auto", "ffmpeg", "native")
+
+# 最近一次探测结果，None 表示尚未探测
+_ffmpeg_available: Optional[bool] = None
+
+
+def normalize_reduce_mode(value) -> str:
+    """兼容旧版布尔配置，非法值按 strong 处理"""
+    if isinstance(value, bool):
+        return "strong" if value else "off"
+    return value if value in REDUCE_MODES else "strong"
+
+
+def build_output_args(animation_format: str, reduce_mode: str, output: str) -> List[str]:
+    """ffmpeg 输出部分的参数：调色板、抖动与封装格式"""
+    if animation_format == "gif":
+        p_colors = "64" if reduce_mode == "strong" else ("128" if reduce_mode == "medium" else "256")
+        p_dither = "none" if reduce_mode == "strong" else ("bayer:bayer_scale=3" if reduce_mode == "medium" else "floyd_steinberg")
+        return [
+            "-filter_complex", f"[0:v] split [a][b]; [a] palettegen=max_colors={p_colors} [p]; [b][p] paletteuse=dither={p_dither}",
+            "-loop", "0", "-f", "gif", output,
+        ]
+    if reduce_mode == "off":
+        return ["-vcodec", "apng", "-pix_fmt", "rgba", "-plays", "0", "-f", "apng", output]
+    p_colors = "64" if reduce_mode == "strong" else "128"
+    p_dither = "none" if reduce_mode == "strong" else "bayer:bayer_scale=3"
+    return [
+        "-filter_complex", f"[0:v] split [a][b]; [a] palettegen=max_colors={p_colors}:reserve_transparent=on [p]; [b][p] paletteuse=dither={p_dither}",
+        "-vcodec", "apng", "-pix_fmt", "rgba", "-plays", "0", "-f", "apng", output,
+    ]
+
+
+def probe_ffmpeg() -> bool:
+    """
+    检测 ffmpeg 是否可用且带有 palettegen/paletteuse 滤镜，结果供 auto 编码器使用
+    """
+    global _ffmpeg_available
+    available = False
+    if shutil.which("ffmpeg"):
+        try:
+            result = subprocess.run(["ffmpeg", "-hide_banner", "-filters"], stdout=subprocess.PIPE,
+                                    stderr=subprocess.DEVNULL, timeout=10)
+            output = result.stdout.decode("utf-8", "ignore")
+            available = result.returncode == 0 and "palettegen" in output and "paletteuse" in output
+        except Exception as e:
+            logger.warning(f"检测 ffmpeg 失败: {e}")
+    _ffmpeg_available = available
+    return available
+
+
+def resolve_encoder(encoder: str = "auto") -> str:
+    """将 auto 解析为 ffmpeg 或 native；指定 ffmpeg 但不可用时回退到内置编码器"""
+    if encoder == "native":
+        return "native"
+    available = _ffmpeg_available if _ffmpeg_available is not None else probe_ffmpeg()
+    if encoder == "ffmpeg" and not available:
+        logger.warning("未检测到可用的 ffmpeg，改用内置动图编码器")
+    return "ffmpeg" if available else "native"
+
+
+class AnimationEncoder:
+    """
+    动图编码器基类，需在 with 语句中使用以保证进程与临时文件被清理：
+
+        with create_animation_encoder("apng", 15, "medium", stop_event=stop_event) as encoder:
+            for frame in frames:
+                if not encoder.add_frame(frame):
+                    return False
+            return encoder.finish()
+
+    add_frame/finish 在收到停止信号时中止编码并返回 False；frame_count 为动画的总帧数（含重复帧）
+    """
+
+    def __init__(self, animation_format: str = "apng", fps: int = 15, reduce_colors="strong", stop_event=None):
+        self.animation_format = "gif" if animation_format == "gif" else "apng"
+        self.fps = max(1, int(fps))
+        self.reduce_mode = normalize_reduce_mode(reduce_colors)
+        self.stop_event = stop_event
+        self.frame_count = 0
+        self._size = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def _stopped(self) -> bool:
+        if self.stop_event and self.stop_event.is_set():
+            logger.info("检测到停止信号，中断动图导出")
+            self._terminate()
+            return True
+        return False
+
+    def _to_rgb(self, frame: Image.Image) -> Image.Image:
+        rgb = frame if frame.mode == "RGB" else frame.convert("RGB")
+        if self._size is None:
+            self._size = rgb.size
+        elif rgb.size != self._size:
+            raise ValueError(f"动画帧尺寸不一致: {rgb.size} != {self._size}")
+        return rgb
+
+    def add_frame(self, frame: Image.Image, repeat: int = 1) -> bool:
+        """写入一帧，repeat 为该帧连续重复的次数"""
+        raise NotImplementedError
+
+    def finish(self) -> Union[bytes, bool]:
+        raise NotImplementedError
+
+    def _terminate(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FfmpegAnimationEncoder(AnimationEncoder):
+    """通过 ffmpeg 导出动图"""
+
+    def __init__(self, animation_format: str = "apng", fps: int = 15, reduce_colors="strong",
+                 export_mode: str = "pipe", threads: str = "2", stop_event=None):
+        super().__init__(animation_format, fps, reduce_colors, stop_event)
+        self.export_mode = export_mode if export_mode in EXPORT_MODES else "pipe"
+        self.threads = str(threads)
+        self._proc: Optional[subprocess.Popen] = None
+        self._cmd: List[str] = []
+        self._stderr = None
+        # 输出文件与 BMP 帧都放在临时目录；pipe 模式下目录内只有最终输出
+        self._tmp = tempfile.TemporaryDirectory()
+        self._tmp_path = Path(self._tmp.name)
+        self._output = self._tmp_path / ("output.gif" if self.animation_format == "gif" else "output.png")
+
+    def _input_args(self) -> List[str]:
+        if self.export_mode == "bmp":
+            return ["-framerate", str(self.fps), "-i", str(self._tmp_path / "frame_%04d.bmp")]
+        width, height = self._size
+        return [
+            "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}",
+            "-framerate", str(self.fps), "-i", "-",
+        ]
+
+    def _start(self):
+        self._cmd = ["ffmpeg", "-hide_banner", "-y", "-loglevel", "error"] + self._input_args() \
+            + ["-threads", self.threads] + build_output_args(self.animation_format, self.reduce_mode, str(self._output))
+        # stderr 写入临时文件，避免 ffmpeg 输出过多填满管道后阻塞
+        self._stderr = tempfile.TemporaryFile()
+        logger.debug(f"正在启动 ffmpeg（{self.export_mode} 模式）...")
+        self._proc = subprocess.Popen(
+            self._cmd,
+            stdin=subprocess.PIPE if self.export_mode == "pipe" else subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=self._stderr,
+        )
+
+    def _read_stderr(self) -> bytes:
+        if not self._stderr:
+            return b""
+        try:
+            self._stderr.seek(0)
+            return self._stderr.read()
+        except Exception:
+            return b""
+
+    def _raise_failed(self, ret: int):
+        err_data = self._read_stderr()
+        error_msg = err_data.decode("utf-8", "ignore").strip() if err_data else "无详细错误信息"
+        logger.error(f"ffmpeg 执行失败 (状态码 {ret}): {error_msg[-500:]}")
+        raise subprocess.CalledProcessError(ret, self._cmd, stderr=err_data)
+
+    def add_frame(self, frame: Image.Image, repeat: int = 1) -> bool:
+        """写入一帧，重复帧按固定帧率逐帧写入；收到停止信号时返回 False"""
+        if self._stopped():
+            return False
+        rgb = self._to_rgb(frame)
+        repeat = max(1, int(repeat))
+
+        if self.export_mode == "bmp":
+            first = self._tmp_path / f"frame_{self.frame_count:04d}.bmp"
+            rgb.save(first, format="BMP")
+            for n in range(1, repeat):
+                shutil.copyfile(first, self._tmp_path / f"frame_{self.frame_count + n:04d}.bmp")
+        else:
+            if self._proc is None:
+                self._start()
+            data = rgb.tobytes()
+            try:
+                for _ in range(repeat):
+                    self._proc.stdin.write(data)
+            except (BrokenPipeError, OSError):
+                # ffmpeg 已提前退出，以其退出码与错误输出为准
+                self._raise_failed(self._proc.wait())
+        self.frame_count += repeat
+        return True
+
+    def finish(self) -> Union[bytes, bool]:
+        """结束输入并等待编码完成，返回动图字节；收到停止信号返回 False"""
+        if self.frame_count == 0:
+            logger.error("未生成任何动画帧，无法导出")
+            return False
+        if self._stopped():
+            return False
+        if self.export_mode == "bmp":
+            logger.info(f"已生成 {self.frame_count} 帧素材，准备启动 ffmpeg...")
+            self._start()
+        else:
+            try:
+                self._proc.stdin.close()
+            except (BrokenPipeError, OSError):
+                pass
+
+        while True:
+            ret = self._proc.poll()
+            if ret is not None:
+                if ret != 0:
+                    self._raise_failed(ret)
+                break
+            if self._stopped():
+                return False
+            time.sleep(0.05)
+
+        with open(self._output, "rb") as f:
+            data = f.read()
+        logger.info(f"ffmpeg 导出成功! 共 {self.frame_count} 帧，最终大小: {len(data) / 1024 / 1024:.2f} MB")
+        return data
+
+    def _terminate(self):
+        proc = self._proc
+        if proc is None or proc.poll() is not None:
+            return
+        try:
+            if proc.stdin:
+                proc.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+        proc.terminate()
+        try:
+            proc.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            logger.warning("ffmpeg terminate 超时，执行 kill")
+            proc.kill()
+            proc.wait(timeout=2)
+
+    def close(self):
+        self._terminate()
+        if self._proc is not None and self._proc.stdin and not self._proc.stdin.closed:
+            try:
+                self._proc.stdin.close()
+            except (BrokenPipeError, OSError):
+                pass
+        if self._stderr:
+            try:
+                self._stderr.close()
+            except Exception:
+                pass
+            self._stderr = None
+        self._tmp.cleanup()
+
+
+def median_cut_palette(pixels: np.ndarray, colors: int) -> np.ndarray:
+    """
+    中位切分：反复将 像素数 × 最大通道跨度 最大的颜色盒沿该通道的中位数一分为二，
+    返回各颜色盒的平均色 (k, 3)，k 不超过 colors
+    """
+    def _box(arr):
+        spread = arr.max(axis=0).astype(np.int32) - arr.min(axis=0)
+        channel = int(spread.argmax())
+        return int(spread[channel]) * len(arr), channel, arr
+
+    boxes = [_box(pixels)]
+    while len(boxes) < colors:
+        index = max(range(len(boxes)), key=lambda i: boxes[i][0])
+        score, channel, arr = boxes[index]
+        if score <= 0 or len(arr) < 2:
+            break
+        boxes.pop(index)
+        mid = len(arr) // 2
+        order = np.argpartition(arr[:, channel], mid)
+        boxes.append(_box(arr[order[:mid]]))
+        boxes.append(_box(arr[order[mid:]]))
+    return np.array([arr.mean(axis=0) for _, _, arr in boxes]).round().clip(0, 255).astype(np.uint8)
+
+
+def _bayer_matrix(order: int = 8) -> np.ndarray:
+    matrix = np.zeros((1, 1), dtype=np.float32)
+    while matrix.shape[0] < order:
+        matrix = np.block([[4 * matrix, 4 * matrix + 2], [4 * matrix + 3, 4 * matrix + 1]])
+    return matrix / (order * order)
+
+
+class NativeAnimationEncoder(AnimationEncoder):
+    """
+    不依赖 ffmpeg 的编码器：帧缓存在内存中，结束时从均匀抽取的关键帧计算一次全局调色板，
+    各帧映射到同一调色板后由 Pillow 写出。颜色数与抖动方式与 ffmpeg 的 palettegen/paletteuse 参数一致：
+    strong 64 色无抖动，medium 128 色 Bayer 抖动，off 时 GIF 为 256 色 Floyd-Steinberg 抖动、APNG 不量化
+    """
+
+    # 参与调色板计算的关键帧数与采样像素上限
+    PALETTE_KEYFRAMES = 12
+    PALETTE_SAMPLES = 65536
+    # 与 ffmpeg paletteuse 的 bayer_scale=3 相当的抖动幅度
+    BAYER_SCALE = 3
+
+    def __init__(self, animation_format: str = "apng", fps: int = 15, reduce_colors="strong", stop_event=None):
+        super().__init__(animation_format, fps, reduce_colors, stop_event)
+        self._frames: List[Image.Image] = []
+        # 各帧的显示时长（毫秒），重复帧合并为一帧时相应延长
+        self._durations: List[int] = []
+
+    def add_frame(self, frame: Image.Image, repeat: int = 1) -> bool:
+        if self._stopped():
+            return False
+        repeat = max(1, int(repeat))
+        self._frames.append(self._to_rgb(frame).copy())
+        start = self._frame_time(self.frame_count)
+        self.frame_count += repeat
+        self._durations.append(self._frame_time(self.frame_count) - start)
+        return True
+
+    def _frame_time(self, frame_index: int) -> int:
+        """
+        第 frame_index 帧的起始时间（毫秒）。按累计时间取整，避免每帧各自取整后总时长偏离；
+        GIF 的帧延时以 10 毫秒为单位（Pillow 写入时直接截断），因此取整到 10 毫秒
+        """
+        unit = 10 if self.animation_format == "gif" else 1
+        return int(round(frame_index * 1000 / (self.fps * unit))) * unit
+
+    def _palette_settings(self):
+        """(颜色数, 抖动方式)，颜色数为 None 表示不量化"""
+        if self.reduce_mode == "strong":
+            return 64, "none"
+        if self.reduce_mode == "medium":
+            return 128, "bayer"
+        if self.animation_format == "gif":
+            return 256, "floyd_steinberg"
+        return None, "none"
+
+    def _build_palette(self, colors: int) -> Image.Image:
+        step = max(1, len(self._frames) // self.PALETTE_KEYFRAMES)
+        keyframes = self._frames[::step][:self.PALETTE_KEYFRAMES]
+        per_frame = max(1, self.PALETTE_SAMPLES // len(keyframes))
+        samples = []
+        for frame in keyframes:
+            pixels = np.asarray(frame, dtype=np.uint8).reshape(-1, 3)
+            samples.append(pixels[::max(1, len(pixels) // per_frame)])
+        palette = median_cut_palette(np.concatenate(samples), colors)
+        # 不足 256 色时重复最后一个颜色补齐，避免多出的黑色被映射到
+        padded = np.concatenate([palette, np.repeat(palette[-1:], 256 - len(palette), axis=0)])
+        palette_image = Image.new("P", (1, 1))
+        palette_image.putpalette(padded.flatten().tolist())
+        return palette_image
+
+    def _quantize(self, frame: Image.Image, palette_image: Image.Image, dither: str,
+                  bayer: Optional[np.ndarray]) -> Image.Image:
+        if dither == "bayer":
+            arr = np.asarray(frame, dtype=np.float32)
+            height, width = arr.shape[:2]
+            reps = (height // bayer.shape[0] + 1, width // bayer.shape[1] + 1)
+            offset = (np.tile(bayer, reps)[:height, :width] - 0.5) * (64 >> self.BAYER_SCALE)
+            frame = Image.fromarray((arr + offset[:, :, None]).round().clip(0, 255).astype(np.uint8))
+        mode = Image.Dither.FLOYDSTEINBERG if dither == "floyd_steinberg" else Image.Dither.NONE
+        return frame.quantize(palette=palette_image, dither=mode)
+
+    def finish(self) -> Union[bytes, bool]:
+        if self.frame_count == 0:
+            logger.error("未生成任何动画帧，无法导出")
+            return False
+        if self._stopped():
+            return False
+
+        colors, dither = self._palette_settings()
+        frames = self._frames
+        if colors:
+            palette_image = self._build_palette(colors)
+            bayer = _bayer_matrix() if dither == "bayer" else None
+            frames = []
+            for frame in self._frames:
+                if self._stopped():
+                    return False
+                frames.append(self._quantize(frame, palette_image, dither, bayer))
+
+        buffer = io.BytesIO()
+        if self.animation_format == "gif":
+            frames[0].save(buffer, format="GIF", save_all=True, append_images=frames[1:],
+                           duration=self._durations, loop=0, optimize=False)
+        else:
+            frames[0].save(buffer, format="PNG", save_all=True, append_images=frames[1:],
+                           duration=self._durations, loop=0)
+        data = buffer.getvalue()
+        logger.info(f"内置编码器导出成功! 共 {self.frame_count} 帧（写入 {len(self._frames)} 帧），"
+                    f"最终大小: {len(data) / 1024 / 1024:.2f} MB")
+        return data
+
+    def close(self):
+        self._frames = []
+        self._durations = []
+
+
+def create_animation_encoder(animation_format: str = "apng", fps: int = 15, reduce_colors="strong",
+                             export_mode: str = "pipe", threads: str = "2", stop_event=None,
+                             encoder: str = "auto") -> AnimationEncoder:
+    """按编码器与导出模式创建动图编码器"""
+    if resolve_encoder(encoder) == "native":
+        return NativeAnimationEncoder(animation_format, fps, reduce_colors, stop_event=stop_event)
+    return FfmpegAnimationEncoder(animation_format, fps, reduce_colors, export_mode=export_mode,
+                                  threads=threads, stop_event=stop_event)
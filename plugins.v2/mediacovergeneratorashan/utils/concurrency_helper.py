@@ -0,0 +1,219 @@
+"""
+并发控制工具类
+用于多媒体库并发生成封面时的任务上下文、工作目录锁、跨服务器共享渲染与入库事件合并
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from app.log import logger
+
+
+class LibraryJob:
+    """单个媒体库的封面生成任务上下文，承载原先挂在插件类上的可变状态"""
+
+    def __init__(self, server: str, service: Any, library: dict, monitor_sort: str = "",
+                 style: str = "static_1"):
+        self.server = server
+        self.service = service
+        self.library = library
+        # 本任务使用的封面风格，创建任务时确定，不随插件配置或其他任务变化
+        self.style = style
+        # 入库监控模式下强制按入库时间排序
+        self.monitor_sort = monitor_sort
+        # 当前任务内的图片/内容去重集合
+        self.seen_keys = set()
+        # 流水线各阶段产物
+        self.title = None
+        self.config_bg_color = None
+        self.custom_images = None
+        self.items = []
+        self.image_paths = []
+        self.updated_item_ids = []
+        self.image_data = None
+        # 输入指纹，未变化时 skipped 为 True
+        self.fingerprint = None
+        self.skipped = False
+        # 封面与服务器上一致，未实际上传
+        self.upload_skipped = False
+        # 所属服务器熔断，未执行完全部阶段
+        self.circuit_skipped = False
+        # 跨服务器共享渲染：作为主任务时所在的分组、复用的主任务、随主任务一起上传的镜像任务
+        self.share_group = None
+        self.shared_from = None
+        self.mirrors = []
+        # 镜像任务挂到主任务后退出流水线，结果由主任务回填
+        self.deferred = False
+        self.result = None
+        # 占用中的媒体库工作目录锁
+        self.dir_lock = None
+
+    @property
+    def library_name(self) -> str:
+        return self.library.get("Name", "") if isinstance(self.library, dict) else ""
+
+    @property
+    def library_id(self) -> Optional[str]:
+        if not isinstance(self.library, dict):
+            return None
+        if getattr(self.service, "type", None) == "emby":
+            return self.library.get("Id")
+        return self.library.get("ItemId")
+
+    def __repr__(self):
+        return f"LibraryJob({self.server}: {self.library_name})"
+
+
+class SharedRenderGroup:
+    """同一渲染键下的一组任务：主任务负责下载与渲染，开始上传前挂入的镜像任务随其一起上传"""
+
+    def __init__(self, key: str, leader: "LibraryJob"):
+        self.key = key
+        self.leader = leader
+        self.mirrors: List[LibraryJob] = []
+        self.closed = False
+        self.image_data = None
+        self._lock = threading.Lock()
+
+    def add_mirror(self, job: "LibraryJob") -> bool:
+        """未关闭时挂入镜像任务；已关闭但有渲染结果时直接复用，返回是否已挂入"""
+        with self._lock:
+            if not self.closed:
+                self.mirrors.append(job)
+                job.shared_from = self.leader
+                job.deferred = True
+                return True
+            if self.image_data:
+                job.image_data = self.image_data
+                job.shared_from = self.leader
+            return False
+
+    def close(self, image_data=None) -> List["LibraryJob"]:
+        """主任务开始上传或失败时调用，发布渲染结果并取走已挂入的镜像任务"""
+        with self._lock:
+            if self.closed:
+                return []
+            self.closed = True
+            self.image_data = image_data
+            mirrors, self.mirrors = self.mirrors, []
+            return mirrors
+
+
+class SharedRenderRegistry:
+    """按渲染键登记共享渲染分组，仅在一次批量更新内有效"""
+
+    def __init__(self):
+        self._groups: Dict[str, SharedRenderGroup] = {}
+        self._lock = threading.Lock()
+
+    def join(self, key: str, job: LibraryJob) -> bool:
+        """
+        首个任务成为主任务；其后的任务挂到主任务名下或复用其渲染结果。
+        返回 True 表示任务已挂入分组、应退出流水线
+        """
+        with self._lock:
+            group = self._groups.get(key)
+            if group is None:
+                group = SharedRenderGroup(key, job)
+                self._groups[key] = group
+                job.share_group = group
+                return False
+        return group.add_mirror(job)
+
+
+class AnyEvent:
+    """组合多个停止信号，任一被置位即视为已置位，供只读取 is_set 的调用方使用"""
+
+    def __init__(self, *events: Optional[threading.Event]):
+        self._events = [event for event in events if event is not None]
+
+    def is_set(self) -> bool:
+        return any(event.is_set() for event in self._events)
+
+
+class KeyedLocks:
+    """按键分配互斥锁，用于串行化写同一工作目录的任务"""
+
+    def __init__(self):
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> threading.Lock:
+        with self._lock:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = threading.Lock()
+                self._locks[key] = lock
+            return lock
+
+
+class CoalescingQueue:
+    """
+    防抖合并队列：窗口期内同一键的多次提交只保留最新一次，
+    窗口内无新提交（或累计等待超过上限）后在后台线程中批量交给处理函数
+    """
+
+    def __init__(self, handler: Callable[[List[Tuple[Hashable, Any]]], None],
+                 window: float = 60.0, max_wait: Optional[float] = None, name: str = "合并队列"):
+        self._handler = handler
+        self._window = max(0.0, float(window))
+        # 持续有新提交时最多等待的时长，避免批次被无限推迟
+        self._max_wait = max(self._window, float(max_wait)) if max_wait is not None else self._window * 5
+        self._name = name
+        self._pending: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._first_at: Optional[float] = None
+        self._last_at: Optional[float] = None
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, key: Hashable, value: Any):
+        """提交一项，立即返回"""
+        with self._cond:
+            if self._stopped:
+                return
+            now = time.monotonic()
+            # 同键覆盖时移到末尾，保证批次内顺序为最新提交在后
+            self._pending.pop(key, None)
+            self._pending[key] = value
+            if self._first_at is None:
+                self._first_at = now
+            self._last_at = now
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def _due_in(self) -> float:
+        now = time.monotonic()
+        return min(self._last_at + self._window, self._first_at + self._max_wait) - now
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped and (not self._pending or self._due_in() > 0):
+                    self._cond.wait(timeout=self._due_in() if self._pending else None)
+                if self._stopped:
+                    return
+                batch = list(self._pending.items())
+                self._pending.clear()
+                self._first_at = self._last_at = None
+            try:
+                self._handler(batch)
+            except Exception as e:
+                logger.error(f"{self._name} 处理批次失败: {e}")
+
+    def stop(self):
+        """停止后台线程并丢弃未处理的提交"""
+        with self._cond:
+            self._stopped = True
+            dropped = len(self._pending)
+            self._pending.clear()
+            self._cond.notify_all()
+        if dropped:
+            logger.info(f"{self._name} 已停止，丢弃 {dropped} 个待处理项")
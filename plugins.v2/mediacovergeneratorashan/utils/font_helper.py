@@ -0,0 +1,40 @@
+"""
+字体加载
+按 (路径, 字号) 缓存 FreeType 字体对象，同一进程内的多次渲染复用已解析的字体文件。
+FreeType 字体对象不能在线程间共享，缓存按线程隔离
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Any
+
+from PIL import ImageFont
+
+
+# 每个线程最多缓存的字体对象数
+FONT_CACHE_SIZE = 32
+
+_local = threading.local()
+
+
+def load_font(font: Any, size: int, index: int = 0) -> ImageFont.FreeTypeFont:
+    """
+    加载 TrueType 字体，等同于 ImageFont.truetype；路径形式的字体走缓存，文件对象等无法作为缓存键，直接加载
+    """
+    if not isinstance(font, (str, os.PathLike)):
+        return ImageFont.truetype(font, size, index)
+
+    cache = getattr(_local, "fonts", None)
+    if cache is None:
+        cache = _local.fonts = OrderedDict()
+    key = (os.fspath(font), size, index)
+    loaded = cache.get(key)
+    if loaded is not None:
+        cache.move_to_end(key)
+        return loaded
+
+    loaded = ImageFont.truetype(key[0], size, index)
+    cache[key] = loaded
+    while len(cache) > FONT_CACHE_SIZE:
+        cache.popitem(last=False)
+    return loaded
@@ -0,0 +1,246 @@
+"""
+动图逐帧并行渲染
+动态风格的每一帧只取决于帧序号与预先准备好的图层，因此可以按帧区间分给多个进程渲染：
+- 图层一次性写入共享内存，各进程在首次处理该动画时读取一次，之后复用
+- 渲染结果写入输出共享内存，主进程按帧序依次取回交给编码器，渲染与编码同时进行
+并行进程不可用或出错时，剩余帧回退到当前进程内渲染。
+进程池只在插件进程内创建，多个动画共用；调整进程数时旧进程池在其上的渲染全部结束后才关闭，
+独立渲染进程中不再创建进程池，逐帧渲染
+"""
+import math
+import multiprocessing
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from PIL import Image
+
+from app.log import logger
+from app.plugins.mediacovergeneratorashan.utils.worker_bootstrap import worker_initializer
+
+
+Layers = Dict[str, Union[Image.Image, List[Image.Image]]]
+# renderer(帧序号, 图层, 参数) -> 帧；必须是模块级函数，才能传给子进程
+FrameRenderer = Callable[[int, Layers, Dict[str, Any]], Image.Image]
+
+# 每个进程平均分到的帧区间数，区间越多负载越均衡，但调度开销越大
+CHUNKS_PER_WORKER = 4
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+# 进程池 -> 正在使用它的渲染数；进程池只在没有渲染使用时关闭，避免中断其他动画的帧区间
+_executor_users: Dict[ProcessPoolExecutor, int] = {}
+# 独立渲染进程中禁用帧进程池
+_process_pool_enabled = True
+
+# 子进程侧：共享内存名称 -> 已读取的图层，只保留最近几个动画
+_worker_layers: "OrderedDict[str, Layers]" = OrderedDict()
+_WORKER_LAYER_CACHE = 2
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """
+    打开主进程创建的共享内存。spawn 出的子进程与主进程共用同一个 resource_tracker，
+    共享内存已由主进程登记并负责释放，子进程不能再注销，否则主进程 unlink 时会报错
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+def _pack_layers(layers: Layers) -> Tuple[shared_memory.SharedMemory, Dict[str, Any]]:
+    """将图层写入一块共享内存，返回共享内存与描述各图层位置的 spec"""
+    entries: Dict[str, Tuple[bool, List[Tuple[int, int, str, Tuple[int, int]]]]] = {}
+    blobs = []
+    offset = 0
+    for key, value in layers.items():
+        is_list = isinstance(value, (list, tuple))
+        items = []
+        for image in (value if is_list else [value]):
+            data = image.tobytes()
+            items.append((offset, len(data), image.mode, image.size))
+            blobs.append((offset, data))
+            offset += len(data)
+        entries[key] = (is_list, items)
+
+    shm = shared_memory.SharedMemory(create=True, size=max(1, offset))
+    for start, data in blobs:
+        shm.buf[start:start + len(data)] = data
+    return shm, {"name": shm.name, "entries": entries}
+
+
+def _load_layers(spec: Dict[str, Any]) -> Layers:
+    name = spec["name"]
+    layers = _worker_layers.get(name)
+    if layers is not None:
+        _worker_layers.move_to_end(name)
+        return layers
+
+    shm = _attach(name)
+    try:
+        layers = {}
+        for key, (is_list, items) in spec["entries"].items():
+            images = [Image.frombytes(mode, size, bytes(shm.buf[start:start + length]))
+                      for start, length, mode, size in items]
+            layers[key] = images if is_list else images[0]
+    finally:
+        shm.close()
+
+    _worker_layers[name] = layers
+    while len(_worker_layers) > _WORKER_LAYER_CACHE:
+        _worker_layers.popitem(last=False)
+    return layers
+
+
+def _to_rgb_bytes(frame: Image.Image, frame_size: Tuple[int, int]) -> bytes:
+    if frame.size != tuple(frame_size):
+        raise ValueError(f"动画帧尺寸不一致: {frame.size} != {tuple(frame_size)}")
+    return (frame if frame.mode == "RGB" else frame.convert("RGB")).tobytes()
+
+
+def _render_chunk(renderer: FrameRenderer, spec: Dict[str, Any], params: Dict[str, Any],
+                  start: int, end: int, out_name: str, frame_size: Tuple[int, int]) -> int:
+    """子进程中渲染 [start, end) 区间的帧，按帧序写入输出共享内存"""
+    layers = _load_layers(spec)
+    frame_bytes = frame_size[0] * frame_size[1] * 3
+    out = _attach(out_name)
+    try:
+        for f in range(start, end):
+            data = _to_rgb_bytes(renderer(f, layers, params), frame_size)
+            out.buf[f * frame_bytes:(f + 1) * frame_bytes] = data
+    finally:
+        out.close()
+    return end - start
+
+
+def disable_process_pool():
+    """禁用帧进程池（在独立渲染进程中调用），之后的动画在当前进程内逐帧渲染"""
+    global _process_pool_enabled
+    _process_pool_enabled = False
+
+
+def _acquire_executor(workers: int) -> ProcessPoolExecutor:
+    """取得指定进程数的进程池并登记使用，用完后须调用 _release_executor"""
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is not None and _executor_workers != workers:
+            # 进程数变化时不调整正在使用的进程池，旧进程池由最后一个使用者关闭
+            _detach_executor(_executor)
+        if _executor is None:
+            # spawn 避免在多线程的主进程中 fork 导致死锁
+            initializer, initargs = worker_initializer()
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                            initializer=initializer, initargs=initargs)
+            _executor_workers = workers
+            logger.info(f"动图帧渲染进程池已启动，进程数 {workers}")
+        _executor_users[_executor] = _executor_users.get(_executor, 0) + 1
+        return _executor
+
+
+def _release_executor(executor: ProcessPoolExecutor, broken: bool = False):
+    """结束对进程池的使用；进程池已损坏时不再分配给新的渲染"""
+    with _executor_lock:
+        users = _executor_users.get(executor, 1) - 1
+        if broken and _executor is executor:
+            _detach_executor(executor)
+        if users > 0:
+            _executor_users[executor] = users
+            return
+        _executor_users.pop(executor, None)
+        if _executor is executor:
+            return
+    _shutdown(executor)
+
+
+def _detach_executor(executor: ProcessPoolExecutor):
+    """不再分配该进程池，无人使用时立即关闭，否则由最后一个使用者关闭；需持有 _executor_lock"""
+    global _executor
+    if _executor is executor:
+        _executor = None
+    if not _executor_users.get(executor):
+        _shutdown(executor)
+
+
+def _shutdown(executor: ProcessPoolExecutor):
+    try:
+        executor.shutdown(wait=False)
+    except Exception as e:
+        logger.warning(f"关闭动图帧渲染进程池失败: {e}")
+
+
+def shutdown_frame_executor():
+    """关闭帧渲染进程池，正在使用的进程池等其上的渲染结束后关闭；下次并行渲染时重建"""
+    with _executor_lock:
+        if _executor is not None:
+            _detach_executor(_executor)
+
+
+def render_frames(renderer: FrameRenderer, total_frames: int, layers: Layers, params: Dict[str, Any],
+                  frame_size: Tuple[int, int], workers: int = 1, stop_event=None) -> Iterator[Image.Image]:
+    """
+    按帧序逐帧产出渲染结果；workers 大于 1 时多进程并行渲染。
+    收到停止信号时提前结束，由调用方（编码器）判断是否中止导出
+    """
+    workers = max(1, int(workers or 1)) if _process_pool_enabled else 1
+    frame_size = (int(frame_size[0]), int(frame_size[1]))
+    next_frame = 0
+
+    if workers > 1 and total_frames >= workers * 2:
+        frame_bytes = frame_size[0] * frame_size[1] * 3
+        layer_shm = out_shm = executor = None
+        broken = False
+        futures = []
+        try:
+            layer_shm, spec = _pack_layers(layers)
+            out_shm = shared_memory.SharedMemory(create=True, size=total_frames * frame_bytes)
+            executor = _acquire_executor(workers)
+            chunk = max(1, math.ceil(total_frames / (workers * CHUNKS_PER_WORKER)))
+            for start in range(0, total_frames, chunk):
+                end = min(start + chunk, total_frames)
+                futures.append((start, end, executor.submit(
+                    _render_chunk, renderer, spec, params, start, end, out_shm.name, frame_size)))
+
+            for start, end, future in futures:
+                while True:
+                    if stop_event and stop_event.is_set():
+                        return
+                    try:
+                        future.result(timeout=0.2)
+                        break
+                    except FutureTimeoutError:
+                        continue
+                for f in range(start, end):
+                    offset = f * frame_bytes
+                    yield Image.frombytes("RGB", frame_size, bytes(out_shm.buf[offset:offset + frame_bytes]))
+                next_frame = end
+        except Exception as e:
+            logger.warning(f"动图帧并行渲染失败，剩余 {total_frames - next_frame} 帧改为单进程渲染: {e}")
+            broken = isinstance(e, BrokenProcessPool)
+        finally:
+            for _, _, future in futures:
+                future.cancel()
+            # 已开始的帧区间仍在写入输出共享内存，等它们结束后再释放
+            wait([future for _, _, future in futures])
+            if executor is not None:
+                _release_executor(executor, broken)
+            for shm in (layer_shm, out_shm):
+                if shm is None:
+                    continue
+                shm.close()
+                try:
+                    shm.unlink()
+                except FileNotFoundError:
+                    pass
+        if next_frame >= total_frames:
+            return
+
+    for f in range(next_frame, total_frames):
+        if stop_event and stop_event.is_set():
+            return
+        yield renderer(f, layers, params)
+
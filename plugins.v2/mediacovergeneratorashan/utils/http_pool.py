@@ -0,0 +1,272 @@
+"""
+媒体服务器连接池
+为每台媒体服务器维护一个长连接会话，批量更新时复用 TCP/TLS 连接，
+并缓存 DNS 解析结果、区分连接超时与读取超时
+"""
+import codecs
+import json
+import re
+import socket
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from app.log import logger
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+
+class DnsCache:
+    """简单的 DNS 解析缓存，过期后重新解析，解析失败时沿用旧结果"""
+
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self._cache: Dict[Tuple[str, int], Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, host: str, port: int) -> str:
+        key = (host, port)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached and cached[1] > now:
+            return cached[0]
+        try:
+            infos = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+            address = infos[0][4][0]
+        except (socket.gaierror, IndexError, OSError) as e:
+            if cached:
+                logger.warning(f"DNS 解析 {host} 失败，沿用缓存地址 {cached[0]}: {e}")
+                return cached[0]
+            # 交给 urllib3 自行解析并抛出原始错误
+            return host
+        with self._lock:
+            self._cache[key] = (address, now + self.ttl)
+        return address
+
+
+class ConnectionStats:
+    """单台服务器的请求数与新建连接数"""
+
+    def __init__(self):
+        self.requests = 0
+        self.new_connections = 0
+        self._lock = threading.Lock()
+
+    def add_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def add_connection(self):
+        with self._lock:
+            self.new_connections += 1
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.new_connections = 0
+
+    @property
+    def reused(self) -> int:
+        return max(0, self.requests - self.new_connections)
+
+
+def _build_pool_classes(dns_cache: DnsCache, stats: ConnectionStats, pool_timeout: float) -> Dict[str, type]:
+    """
+    生成带 DNS 缓存与建连计数的连接池类；
+    requests 不传递 pool_timeout，连接池满时默认无限等待，这里改为最多等待 pool_timeout 秒
+    """
+
+    def _new_conn(base):
+        def new_conn(self):
+            original = self._dns_host
+            # 仅替换实际连接的地址，TLS 的 SNI 与证书校验仍使用原主机名
+            self._dns_host = dns_cache.resolve(original, self.port)
+            try:
+                conn = base._new_conn(self)
+            finally:
+                self._dns_host = original
+            stats.add_connection()
+            return conn
+        return new_conn
+
+    def _get_conn(base):
+        def get_conn(self, timeout=None):
+            return base._get_conn(self, timeout=pool_timeout if timeout is None else timeout)
+        return get_conn
+
+    http_conn = type("CachedHTTPConnection", (HTTPConnection,), {"_new_conn": _new_conn(HTTPConnection)})
+    https_conn = type("CachedHTTPSConnection", (HTTPSConnection,), {"_new_conn": _new_conn(HTTPSConnection)})
+    return {
+        "http": type("CachedHTTPConnectionPool", (HTTPConnectionPool,), {
+            "ConnectionCls": http_conn, "_get_conn": _get_conn(HTTPConnectionPool)}),
+        "https": type("CachedHTTPSConnectionPool", (HTTPSConnectionPool,), {
+            "ConnectionCls": https_conn, "_get_conn": _get_conn(HTTPSConnectionPool)}),
+    }
+
+
+class _PooledAdapter(HTTPAdapter):
+
+    def __init__(self, pool_classes: Dict[str, type], **kwargs):
+        self._pool_classes = pool_classes
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = dict(self._pool_classes)
+
+
+class MediaServerSessionPool:
+    """
+    按服务器名称持有 requests.Session，所有媒体服务器请求经此发出。
+    服务实例缺少地址或密钥时返回 None，由调用方回退到 MoviePilot 自带的请求方法
+    """
+
+    def __init__(self, pool_size: int = 4, connect_timeout: float = 5.0, read_timeout: float = 30.0,
+                 dns_ttl: float = 300.0, pool_timeout: Optional[float] = None):
+        self.pool_size = max(1, int(pool_size))
+        self.connect_timeout = float(connect_timeout)
+        self.read_timeout = float(read_timeout)
+        # 等待空闲连接的上限，默认与一次完整请求的超时相同；未关闭的响应最多让后续请求等待这么久
+        self.pool_timeout = float(pool_timeout) if pool_timeout else self.connect_timeout + self.read_timeout
+        self._dns_cache = DnsCache(dns_ttl)
+        self._sessions: Dict[str, requests.Session] = {}
+        self._stats: Dict[str, ConnectionStats] = {}
+        self._lock = threading.Lock()
+
+    def _get_session(self, server: str) -> requests.Session:
+        with self._lock:
+            session = self._sessions.get(server)
+            if session is None:
+                stats = self._stats.setdefault(server, ConnectionStats())
+                adapter = _PooledAdapter(
+                    _build_pool_classes(self._dns_cache, stats, self.pool_timeout),
+                    pool_connections=1,
+                    pool_maxsize=self.pool_size,
+                    # 连接数达到上限时等待空闲连接，而不是临时新建后丢弃
+                    pool_block=True,
+                    max_retries=0,
+                )
+                session = requests.Session()
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.verify = False
+                session.trust_env = False
+                session.headers.update({
+                    "User-Agent": "MoviePilot-MediaCoverGeneratorAshan/1.0",
+                    "Connection": "keep-alive",
+                })
+                self._sessions[server] = session
+            return session
+
+    @staticmethod
+    def _resolve_url(service: Any, url: str) -> Optional[str]:
+        """按 MoviePilot 媒体服务器模块的规则替换 [HOST]/[APIKEY] 占位符"""
+        instance = getattr(service, "instance", None)
+        host = getattr(instance, "_host", None)
+        apikey = getattr(instance, "_apikey", None)
+        if not host or not apikey:
+            return None
+        if not host.endswith("/"):
+            host = f"{host}/"
+        return url.replace("[HOST]", host).replace("[APIKEY]", apikey)
+
+    def request(self, service: Any, method: str, url: str, read_timeout: Optional[float] = None,
+                **kwargs) -> Optional[requests.Response]:
+        """
+        发送请求，无法使用连接池时返回 None；网络异常记录日志后返回 None，与 get_data/post_data 一致
+        """
+        real_url = self._resolve_url(service, url)
+        if not real_url:
+            return None
+        server = getattr(service, "name", "") or ""
+        session = self._get_session(server)
+        self._stats[server].add_request()
+        timeout = (self.connect_timeout, read_timeout or self.read_timeout)
+        try:
+            return session.request(method, real_url, timeout=timeout, **kwargs)
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"请求媒体服务器 {server} 失败: {e}")
+            return None
+        except urllib3.exceptions.EmptyPoolError:
+            # requests 不包装连接池等待超时
+            logger.warning(f"请求媒体服务器 {server} 失败: 等待空闲连接超过 {self.pool_timeout:g} 秒")
+            return None
+
+    def get(self, service: Any, url: str, **kwargs) -> Optional[requests.Response]:
+        return self.request(service, "GET", url, **kwargs)
+
+    def post(self, service: Any, url: str, data=None, headers: Optional[dict] = None,
+             **kwargs) -> Optional[requests.Response]:
+        return self.request(service, "POST", url, data=data, headers=headers, **kwargs)
+
+    def supports(self, service: Any) -> bool:
+        return self._resolve_url(service, "[HOST]") is not None
+
+    def stats(self) -> Dict[str, Tuple[int, int, int]]:
+        """服务器 -> (请求数, 新建连接数, 复用次数)"""
+        with self._lock:
+            items = list(self._stats.items())
+        return {server: (s.requests, s.new_connections, s.reused) for server, s in items}
+
+    def format_stats(self) -> str:
+        return "，".join(
+            f"{server} 请求 {requests_count} 次 新建连接 {new_count} 个 复用 {reused} 次"
+            for server, (requests_count, new_count, reused) in self.stats().items()
+            if requests_count
+        )
+
+    def reset_stats(self):
+        with self._lock:
+            for stats in self._stats.values():
+                stats.reset()
+
+    def close(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            try:
+                session.close()
+            except Exception as e:
+                logger.warning(f"关闭媒体服务器会话失败: {e}")
+
+
+def iter_json_array(response: Any, key: str = "Items", chunk_size: int = 16384) -> Iterator[dict]:
+    """
+    流式解析响应中顶层 key 对应的对象数组，逐个产出元素；调用方提前停止迭代时不再读取剩余内容
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+    key_pattern = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+    buffer = ""
+    in_array = False
+    for chunk in response.iter_content(chunk_size=chunk_size):
+        buffer += text_decoder.decode(chunk)
+        while True:
+            if not in_array:
+                match = key_pattern.search(buffer)
+                if not match:
+                    # 保留末尾少量字符，防止键名被分块截断
+                    buffer = buffer[-(len(key) + 16):]
+                    break
+                buffer = buffer[match.end():]
+                in_array = True
+            buffer = buffer.lstrip().lstrip(",").lstrip()
+            if buffer.startswith("]"):
+                return
+            if not buffer:
+                break
+            try:
+                obj, end = decoder.raw_decode(buffer)
+            except ValueError:
+                # 元素尚未完整接收
+                break
+            buffer = buffer[end:]
+            yield obj
@@ -0,0 +1,172 @@
+"""
+立即生成任务管理
+将“立即生成”改为后台任务：提交后立即返回任务 ID，由单个后台线程按顺序执行，
+可查询进度（完成数/总数、当前阶段、预计剩余时间）、取消任务并列出最近的任务
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from app.log import logger
+from app.plugins.mediacovergeneratorashan.utils.performance_helper import ProgressTracker
+
+
+class CoverJob:
+    """一次立即生成任务的参数与运行状态"""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    def __init__(self, libraries: Optional[List[str]] = None, style: str = ""):
+        self.id = uuid.uuid4().hex[:12]
+        # None 表示全部媒体库，否则为 "服务器-媒体库ID" 列表
+        self.libraries = libraries
+        self.style = style
+        self.status = self.QUEUED
+        self.message = ""
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.cancel_event = threading.Event()
+        self.progress: Optional[ProgressTracker] = None
+        # 运行中的流水线，用于读取各阶段占用
+        self.pipeline = None
+        self.stage = "排队中"
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (self.SUCCEEDED, self.FAILED, self.CANCELLED)
+
+    def start_progress(self, total: int):
+        self.progress = ProgressTracker(total, "封面生成任务")
+
+    def advance(self, step_name: str = ""):
+        if self.progress:
+            self.progress.update(step_name)
+
+    def current_stage(self) -> str:
+        pipeline = self.pipeline
+        if pipeline is None or self.finished:
+            return self.stage
+        busy = [f"{name} {info['busy']}" for name, info in pipeline.occupancy().items() if info["busy"]]
+        return "，".join(busy) if busy else self.stage
+
+    def to_dict(self) -> Dict[str, Any]:
+        progress = self.progress.snapshot() if self.progress else {
+            "done": 0, "total": None, "percent": 0.0, "elapsed": 0.0, "eta": None, "last_step": "",
+        }
+        end = self.finished_at or time.time()
+        return {
+            "id": self.id,
+            "status": self.status,
+            "style": self.style,
+            "libraries": self.libraries,
+            "stage": self.current_stage(),
+            "progress": progress,
+            "message": self.message,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration": round(end - self.started_at, 1) if self.started_at else None,
+        }
+
+
+class CoverJobManager:
+    """
+    立即生成任务队列：同一时间只执行一个任务，其余排队；保留最近 history 个任务供查询
+    """
+
+    def __init__(self, runner: Callable[[CoverJob], Optional[str]], history: int = 20):
+        self._runner = runner
+        self._history = max(1, int(history))
+        self._jobs: "OrderedDict[str, CoverJob]" = OrderedDict()
+        self._queue: List[CoverJob] = []
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, libraries: Optional[List[str]] = None, style: str = "") -> CoverJob:
+        job = CoverJob(libraries, style)
+        with self._cond:
+            self._jobs[job.id] = job
+            self._queue.append(job)
+            self._trim_locked()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="cover-job", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return job
+
+    def get(self, job_id: str) -> Optional[CoverJob]:
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[CoverJob]:
+        """最近的任务，新任务在前"""
+        with self._cond:
+            return list(reversed(self._jobs.values()))
+
+    def running(self) -> Optional[CoverJob]:
+        with self._cond:
+            return next((job for job in self._jobs.values() if job.status == CoverJob.RUNNING), None)
+
+    def cancel(self, job_id: str) -> Optional[CoverJob]:
+        """取消排队中的任务，或通知运行中的任务在当前阶段结束后停止"""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return job
+            job.cancel_event.set()
+            if job in self._queue:
+                self._queue.remove(job)
+                job.status = CoverJob.CANCELLED
+                job.stage = "已取消"
+                job.finished_at = time.time()
+            else:
+                job.stage = "正在取消"
+        return job
+
+    def cancel_all(self):
+        with self._cond:
+            job_ids = [job.id for job in self._jobs.values() if not job.finished]
+        for job_id in job_ids:
+            self.cancel(job_id)
+
+    def _trim_locked(self):
+        # 只淘汰已结束的任务
+        while len(self._jobs) > self._history:
+            expired = next((job_id for job_id, job in self._jobs.items() if job.finished), None)
+            if expired is None:
+                break
+            self._jobs.pop(expired)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._queue:
+                    self._thread = None
+                    return
+                job = self._queue.pop(0)
+                job.status = CoverJob.RUNNING
+                job.stage = "准备中"
+                job.started_at = time.time()
+            try:
+                job.message = self._runner(job) or ""
+                job.status = CoverJob.CANCELLED if job.cancel_event.is_set() else CoverJob.SUCCEEDED
+            except Exception as e:
+                logger.error(f"封面生成任务 {job.id} 执行失败: {e}", exc_info=True)
+                job.message = f"封面生成失败: {e}"
+                job.status = CoverJob.FAILED
+            finally:
+                job.pipeline = None
+                job.stage = {
+                    CoverJob.SUCCEEDED: "已完成",
+                    CoverJob.CANCELLED: "已取消",
+                }.get(job.status, "失败")
+                job.finished_at = time.time()
+                with self._cond:
+                    self._trim_locked()
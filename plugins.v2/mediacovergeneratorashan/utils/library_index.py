@@ -0,0 +1,87 @@
+"""
+媒体库列表缓存
+按服务器缓存 VirtualFolders 查询结果（带有效期，可主动失效），
+并基于媒体库路径构建前缀树，将媒体文件路径映射到所属媒体库
+"""
+import re
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+def _split_path(path: str) -> List[str]:
+    """统一分隔符并拆分路径，Windows 盘符路径按不区分大小写处理"""
+    if not path:
+        return []
+    normalized = str(path).replace("\\", "/")
+    if re.match(r"^[A-Za-z]:/", normalized) or normalized.startswith("//"):
+        normalized = normalized.lower()
+    return [part for part in normalized.split("/") if part and part != "."]
+
+
+class LibraryPathIndex:
+    """媒体库路径前缀树，按路径分段匹配，嵌套路径时取最深的媒体库"""
+
+    def __init__(self, libraries: List[dict]):
+        self._root: dict = {}
+        for library in libraries or []:
+            for location in library.get("Locations") or []:
+                node = self._root
+                for part in _split_path(location):
+                    node = node.setdefault(part, {})
+                # None 键存放以该节点为根路径的媒体库
+                node[None] = library
+
+    def find(self, path: str) -> Optional[dict]:
+        node = self._root
+        found = node.get(None)
+        for part in _split_path(path):
+            node = node.get(part)
+            if node is None:
+                break
+            found = node.get(None, found)
+        return found
+
+
+class LibraryCache:
+    """按服务器缓存媒体库列表与路径索引"""
+
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[float, List[dict], LibraryPathIndex]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, server: str, loader: Callable[[], List[dict]], refresh: bool = False) -> List[dict]:
+        return self._get_entry(server, loader, refresh)[0]
+
+    def find_by_path(self, server: str, path: str, loader: Callable[[], List[dict]]) -> Optional[dict]:
+        """
+        查找路径所属媒体库；缓存中找不到时刷新一次，以覆盖新建媒体库的情况
+        """
+        libraries, index, fresh = self._get_entry(server, loader)
+        library = index.find(path)
+        if library is None and not fresh:
+            library = self._get_entry(server, loader, refresh=True)[1].find(path)
+        return library
+
+    def _get_entry(self, server: str, loader: Callable[[], List[dict]],
+                   refresh: bool = False) -> Tuple[List[dict], LibraryPathIndex, bool]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(server)
+        if entry and not refresh and entry[0] > now:
+            return entry[1], entry[2], False
+        libraries = loader() or []
+        index = LibraryPathIndex(libraries)
+        # 查询失败时不缓存空结果
+        if libraries:
+            with self._lock:
+                self._entries[server] = (now + self.ttl, libraries, index)
+        return libraries, index, True
+
+    def invalidate(self, server: Optional[str] = None):
+        with self._lock:
+            if server is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(server, None)
@@ -132,12 +132,14 @@ class ProgressTracker:
         self.operation_name = operation_name
         self.start_time = time.time()
         self.last_report_time = self.start_time
+        self.last_step = ""
         self._lock = threading.Lock()
 
     def update(self, step_name: str = ""):
         """更新进度"""
         with self._lock:
             self.current_step += 1
+            self.last_step = step_name
             current_time = time.time()
 
             # 每5秒或完成时报告一次进度
@@ -162,6 +164,26 @@ class ProgressTracker:
         """检查是否完成"""
         return self.current_step >= self.total_steps
 
+    def snapshot(self) -> dict:
+        """当前进度、已用时间与按平均速度估算的剩余时间（尚无完成步骤时为 None）"""
+        with self._lock:
+            current, total = self.current_step, self.total_steps
+            elapsed = time.time() - self.start_time
+            last_step = self.last_step
+        eta = None
+        if 0 < current < total:
+            eta = elapsed / current * (total - current)
+        elif total and current >= total:
+            eta = 0.0
+        return {
+            "done": current,
+            "total": total,
+            "percent": round(current / total * 100, 1) if total else 100.0,
+            "elapsed": round(elapsed, 1),
+            "eta": round(eta, 1) if eta is not None else None,
+            "last_step": last_step,
+        }
+
 
 def memory_efficient_operation(func):
     """
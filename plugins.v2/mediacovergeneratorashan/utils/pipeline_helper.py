@@ -0,0 +1,182 @@
+"""
+分阶段流水线
+将批量封面更新拆分为 查询 -> 下载 -> 渲染 -> 上传 四个阶段，阶段之间用有界队列连接，
+使网络等待与图像计算重叠执行
+"""
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from app.log import logger
+
+
+_SENTINEL = object()
+
+
+class PipelineStage:
+    """流水线阶段定义"""
+
+    def __init__(self, name: str, func: Callable[[Any], Any], workers: int = 1, queue_size: int = 2):
+        self.name = name
+        self.func = func
+        self.workers = max(1, int(workers))
+        # 阶段输入队列，满时上游阶段阻塞，形成背压
+        self.queue: "queue.Queue" = queue.Queue(maxsize=max(1, int(queue_size)))
+        self.busy = 0
+        self.processed = 0
+        self.busy_seconds = 0.0
+        self.max_queued = 0
+        self.finished_workers = 0
+        self.lock = threading.Lock()
+
+
+class StagedPipeline:
+    """
+    有界队列连接的多阶段流水线。
+    每个阶段函数接收任务对象，返回真值则进入下一阶段，返回假值则任务以失败结束；
+    最后一个阶段的返回值作为任务结果。停止信号触发后剩余任务以 None 结束。
+    """
+
+    def __init__(self, stages: List[PipelineStage], stop_event: Optional[threading.Event] = None,
+                 on_done: Optional[Callable[[Any, Optional[bool]], None]] = None,
+                 report_interval: float = 10.0, name: str = "封面流水线"):
+        if not stages:
+            raise ValueError("流水线至少需要一个阶段")
+        self.stages = stages
+        self.stop_event = stop_event
+        self.on_done = on_done
+        self.report_interval = report_interval
+        self.name = name
+        self._all_done = threading.Event()
+
+    def _stopped(self) -> bool:
+        return bool(self.stop_event and self.stop_event.is_set())
+
+    def _finish(self, job: Any, result: Optional[bool]):
+        if self.on_done:
+            try:
+                self.on_done(job, result)
+            except Exception as e:
+                logger.error(f"{self.name} 任务完成回调异常: {e}")
+
+    def _put(self, stage: PipelineStage, item: Any):
+        stage.queue.put(item)
+        with stage.lock:
+            stage.max_queued = max(stage.max_queued, stage.queue.qsize())
+
+    def _worker(self, index: int):
+        stage = self.stages[index]
+        next_stage = self.stages[index + 1] if index + 1 < len(self.stages) else None
+        while True:
+            job = stage.queue.get()
+            if job is _SENTINEL:
+                break
+            if self._stopped():
+                self._finish(job, None)
+                continue
+            with stage.lock:
+                stage.busy += 1
+            started = time.monotonic()
+            try:
+                result = stage.func(job)
+            except Exception as e:
+                logger.error(f"{self.name} 阶段 {stage.name} 处理 {job} 异常: {e}")
+                result = False
+            finally:
+                with stage.lock:
+                    stage.busy -= 1
+                    stage.processed += 1
+                    stage.busy_seconds += time.monotonic() - started
+            if self._stopped():
+                self._finish(job, None)
+            elif not result:
+                self._finish(job, False)
+            elif next_stage is None:
+                self._finish(job, True)
+            else:
+                self._put(next_stage, job)
+
+        # 本阶段最后一个退出的工作线程负责通知下游阶段结束
+        with stage.lock:
+            stage.finished_workers += 1
+            last = stage.finished_workers == stage.workers
+        if last:
+            if next_stage is None:
+                self._all_done.set()
+            else:
+                for _ in range(next_stage.workers):
+                    next_stage.queue.put(_SENTINEL)
+
+    def occupancy(self) -> Dict[str, Dict[str, int]]:
+        """各阶段当前排队数、处理中数量与已处理数量"""
+        snapshot = {}
+        for stage in self.stages:
+            with stage.lock:
+                snapshot[stage.name] = {
+                    "queued": stage.queue.qsize(),
+                    "capacity": stage.queue.maxsize,
+                    "busy": stage.busy,
+                    "workers": stage.workers,
+                    "processed": stage.processed,
+                }
+        return snapshot
+
+    def format_occupancy(self) -> str:
+        return "，".join(
+            f"{name} 排队 {info['queued']}/{info['capacity']} 处理中 {info['busy']}/{info['workers']} 已完成 {info['processed']}"
+            for name, info in self.occupancy().items()
+        )
+
+    def stage_stats(self) -> Dict[str, Dict[str, float]]:
+        """各阶段处理次数、累计耗时与峰值排队数"""
+        stats = {}
+        for stage in self.stages:
+            with stage.lock:
+                stats[stage.name] = {
+                    "processed": stage.processed,
+                    "busy_seconds": stage.busy_seconds,
+                    "workers": stage.workers,
+                    "max_queued": stage.max_queued,
+                    "capacity": stage.queue.maxsize,
+                }
+        return stats
+
+    def summary(self) -> str:
+        """各阶段累计耗时与峰值排队数，用于定位瓶颈"""
+        return "，".join(
+            f"{name} 处理 {info['processed']} 次 累计 {info['busy_seconds']:.1f}s "
+            f"峰值排队 {info['max_queued']}/{info['capacity']}"
+            for name, info in self.stage_stats().items()
+        )
+
+    def run(self, jobs: List[Any]):
+        """执行全部任务，阻塞直到所有阶段处理完毕"""
+        threads: List[threading.Thread] = []
+        for index, stage in enumerate(self.stages):
+            for n in range(stage.workers):
+                t = threading.Thread(target=self._worker, args=(index,),
+                                     name=f"{self.name}-{stage.name}-{n}", daemon=True)
+                t.start()
+                threads.append(t)
+
+        first = self.stages[0]
+
+        def _feed():
+            for job in jobs:
+                if self._stopped():
+                    self._finish(job, None)
+                    continue
+                self._put(first, job)
+            for _ in range(first.workers):
+                first.queue.put(_SENTINEL)
+
+        feeder = threading.Thread(target=_feed, name=f"{self.name}-feeder", daemon=True)
+        feeder.start()
+
+        while not self._all_done.wait(timeout=self.report_interval):
+            logger.info(f"{self.name} 队列状态：{self.format_occupancy()}")
+        feeder.join()
+        for t in threads:
+            t.join()
+        logger.info(f"{self.name} 阶段统计：{self.summary()}")
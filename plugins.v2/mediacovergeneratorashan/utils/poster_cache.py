@@ -0,0 +1,176 @@
+"""
+海报本地缓存
+以 (服务器, 媒体项 ID, 图片类型, 图片 tag, 请求尺寸) 为键按内容寻址保存下载过的图片，
+命中时直接硬链接到媒体库工作目录，超出容量时按最近使用时间淘汰
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+from app.log import logger
+
+
+class PosterCache:
+    """按内容寻址的海报缓存，index.json 记录每个文件的大小与最近使用时间"""
+
+    INDEX_FILE = "index.json"
+    _KEY_PATTERN = re.compile(r"[0-9a-f]{40}")
+
+    def __init__(self, root: Union[str, Path], max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max(0, int(max_bytes))
+        self._lock = threading.Lock()
+        self._index: Dict[str, dict] = {}
+        self._total = 0
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._load()
+
+    @staticmethod
+    def make_key(server: str, item_id: str, image_type: str, tag: str, size: Optional[str] = None) -> str:
+        raw = f"{server}|{item_id}|{image_type}|{tag}|{size or ''}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.jpg"
+
+    def _load(self):
+        index_path = self.root / self.INDEX_FILE
+        index = {}
+        if index_path.exists():
+            try:
+                index = json.loads(index_path.read_text(encoding="utf-8")) or {}
+            except Exception as e:
+                logger.warning(f"海报缓存索引损坏，将重建: {e}")
+        # 丢弃文件已不存在的记录；索引只在批量更新结束与插件停止时保存，
+        # 异常退出后索引之外的缓存文件按修改时间补回索引，只删除未写完的临时文件与无法识别的文件
+        valid = {}
+        for key, record in index.items():
+            path = self._path(key)
+            if path.exists():
+                record["size"] = path.stat().st_size
+                valid[key] = record
+        adopted = 0
+        for sub in self.root.iterdir():
+            if not sub.is_dir():
+                continue
+            for file in sub.iterdir():
+                key = file.stem
+                if key in valid:
+                    continue
+                if file.suffix == ".jpg" and self._KEY_PATTERN.fullmatch(key) and key[:2] == sub.name:
+                    stat = file.stat()
+                    valid[key] = {"size": stat.st_size, "atime": stat.st_mtime}
+                    adopted += 1
+                else:
+                    file.unlink(missing_ok=True)
+        if adopted:
+            logger.info(f"海报缓存索引中缺少 {adopted} 个已缓存的文件，已重新加入索引")
+        self._index = valid
+        self._total = sum(r.get("size", 0) for r in valid.values())
+        self._dirty = len(valid) != len(index)
+        self._evict_locked()
+
+    def get(self, key: str) -> Optional[Path]:
+        """命中时返回缓存文件路径并刷新使用时间"""
+        with self._lock:
+            record = self._index.get(key)
+            path = self._path(key)
+            if record and path.exists():
+                record["atime"] = time.time()
+                self._dirty = True
+                self.hits += 1
+                return path
+            if record:
+                self._total -= record.get("size", 0)
+                self._index.pop(key, None)
+                self._dirty = True
+            self.misses += 1
+            return None
+
+    def put(self, key: str, content: bytes) -> Optional[Path]:
+        """写入缓存，返回缓存文件路径；单个文件超过容量时不缓存"""
+        if not content or len(content) > self.max_bytes:
+            return None
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+        with self._lock:
+            old = self._index.get(key)
+            if old:
+                self._total -= old.get("size", 0)
+            self._index[key] = {"size": len(content), "atime": time.time()}
+            self._total += len(content)
+            self._dirty = True
+            self._evict_locked()
+        return path
+
+    @staticmethod
+    def link(source: Path, dest: Union[str, Path]):
+        """
+        将缓存文件放入工作目录：先删除目标再硬链接，避免写穿共享 inode；跨文件系统时复制
+        """
+        dest = Path(dest)
+        dest.unlink(missing_ok=True)
+        try:
+            os.link(source, dest)
+        except OSError:
+            shutil.copyfile(source, dest)
+
+    def _evict_locked(self):
+        if self._total <= self.max_bytes:
+            return
+        removed = 0
+        for key, record in sorted(self._index.items(), key=lambda kv: kv[1].get("atime", 0)):
+            if self._total <= self.max_bytes:
+                break
+            self._path(key).unlink(missing_ok=True)
+            self._total -= record.get("size", 0)
+            self._index.pop(key, None)
+            removed += 1
+        if removed:
+            logger.info(f"海报缓存超过 {self.max_bytes // (1024 * 1024)}MB，已淘汰 {removed} 个最久未使用的文件")
+
+    def flush(self):
+        """保存索引"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps(self._index)
+            self._dirty = False
+        index_path = self.root / self.INDEX_FILE
+        tmp_path = index_path.with_suffix(".tmp")
+        try:
+            tmp_path.write_text(data, encoding="utf-8")
+            os.replace(tmp_path, index_path)
+        except Exception as e:
+            logger.warning(f"保存海报缓存索引失败: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._index = {}
+            self._total = 0
+            self._dirty = False
+            shutil.rmtree(self.root, ignore_errors=True)
+            self.root.mkdir(parents=True, exist_ok=True)
+
+    def format_stats(self) -> str:
+        with self._lock:
+            return f"命中 {self.hits} 次，未命中 {self.misses} 次，" \
+                   f"占用 {self._total / (1024 * 1024):.1f}MB / {self.max_bytes // (1024 * 1024)}MB"
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
@@ -0,0 +1,333 @@
+"""
+渲染后端
+支持在插件进程内直接渲染，或将 create_style_* 分派到独立的常驻进程池，
+避免图像计算与 MoviePilot 主进程争抢 GIL，并隔离卡死/崩溃的渲染任务
+"""
+import base64
+import importlib
+import multiprocessing
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import CancelledError, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.log import logger
+from app.plugins.mediacovergeneratorashan.utils.font_helper import load_font
+from app.plugins.mediacovergeneratorashan.utils.frame_parallel import disable_process_pool
+from app.plugins.mediacovergeneratorashan.utils.image_manager import ResolutionConfig
+from app.plugins.mediacovergeneratorashan.utils.worker_bootstrap import worker_initializer
+
+
+# 风格名称 -> (模块, 函数)
+STYLE_FUNCTIONS: Dict[str, Tuple[str, str]] = {
+    "static_1": ("app.plugins.mediacovergeneratorashan.style.style_static_1", "create_style_static_1"),
+    "static_2": ("app.plugins.mediacovergeneratorashan.style.style_static_2", "create_style_static_2"),
+    "static_3": ("app.plugins.mediacovergeneratorashan.style.style_static_3", "create_style_static_3"),
+    "static_4": ("app.plugins.mediacovergeneratorashan.style.style_static_4", "create_style_static_4"),
+    "animated_1": ("app.plugins.mediacovergeneratorashan.style.style_animated_1", "create_style_animated_1"),
+    "animated_2": ("app.plugins.mediacovergeneratorashan.style.style_animated_2", "create_style_animated_2"),
+    "animated_3": ("app.plugins.mediacovergeneratorashan.style.style_animated_3", "create_style_animated_3"),
+    "animated_4": ("app.plugins.mediacovergeneratorashan.style.style_animated_4", "create_style_animated_4"),
+}
+
+
+def resolve_style_function(style: str) -> Callable:
+    module_name, func_name = STYLE_FUNCTIONS[style]
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+class RenderResult:
+    """渲染结果：图片字节与格式，直接用于上传，仅在旧版兼容上传时才编码为 base64"""
+
+    # 文件头 -> (格式, MIME, 扩展名)
+    _SIGNATURES = (
+        (b"GIF8", ("gif", "image/gif", "gif")),
+        (b"\x89PNG", ("png", "image/png", "png")),
+        (b"\xff\xd8\xff", ("jpeg", "image/jpeg", "jpg")),
+    )
+
+    __slots__ = ("data", "format", "mime", "extension")
+
+    def __init__(self, data: bytes, format: Optional[str] = None, mime: Optional[str] = None,
+                 extension: Optional[str] = None):
+        self.data = data
+        sniffed = self.sniff(data)
+        self.format = format or sniffed[0]
+        self.mime = mime or sniffed[1]
+        self.extension = extension or sniffed[2]
+
+    @classmethod
+    def sniff(cls, data: bytes) -> Tuple[str, str, str]:
+        head = bytes(data[:12])
+        if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+            return "webp", "image/webp", "webp"
+        for signature, info in cls._SIGNATURES:
+            if head.startswith(signature):
+                return info
+        return "png", "image/png", "png"
+
+    @classmethod
+    def from_output(cls, output: Any) -> Optional["RenderResult"]:
+        """将风格函数的返回值（字节，或旧版的 base64 字符串）转换为渲染结果"""
+        if not output:
+            return None
+        if isinstance(output, RenderResult):
+            return output
+        if isinstance(output, str):
+            return cls(base64.b64decode(output))
+        return cls(bytes(output))
+
+    def to_base64(self) -> str:
+        return base64.b64encode(self.data).decode("utf-8")
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+    def __bool__(self):
+        return bool(self.data)
+
+    def __repr__(self):
+        return f"RenderResult({self.format}, {self.size} bytes)"
+
+
+# ---------------------------------------------------------------------------
+# 子进程侧
+# ---------------------------------------------------------------------------
+
+def _worker_init(font_paths: Tuple[str, ...]):
+    """
+    子进程初始化（由 worker_bootstrap 登记插件包后调用）：预先导入所有风格模块并预热字体，
+    之后同一进程内的多次渲染通过 load_font 复用已加载的 FreeType 字体对象。
+    渲染进程内不再创建动图帧进程池，避免进程数随渲染进程数成倍增加
+    """
+    disable_process_pool()
+    for style in STYLE_FUNCTIONS:
+        try:
+            resolve_style_function(style)
+        except Exception as e:
+            logger.warning(f"渲染进程预加载风格 {style} 失败: {e}")
+
+    for font_path in font_paths or ():
+        try:
+            if font_path and os.path.exists(font_path):
+                load_font(font_path, 12)
+        except Exception as e:
+            logger.warning(f"渲染进程预热字体失败 {font_path}: {e}")
+
+
+def _worker_render(style: str, args: tuple, kwargs: dict) -> Optional[Tuple[str, int]]:
+    """
+    子进程中执行渲染，结果写入共享内存，返回 (共享内存名称, 字节数)
+    """
+    resolution_size = kwargs.pop("resolution_size", None)
+    if resolution_size:
+        kwargs["resolution_config"] = ResolutionConfig(tuple(resolution_size))
+
+    result = RenderResult.from_output(resolve_style_function(style)(*args, **kwargs))
+    if not result:
+        return None
+    data = result.data
+
+    shm = shared_memory.SharedMemory(create=True, size=len(data))
+    try:
+        shm.buf[:len(data)] = data
+        name = shm.name
+        tracked_name = getattr(shm, "_name", name)
+    finally:
+        shm.close()
+    # 共享内存由主进程读取后释放，子进程不再跟踪，避免退出时被提前回收
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(tracked_name, "shared_memory")
+    except Exception:
+        pass
+    return name, len(data)
+
+
+def _read_shared_result(name: str, size: int) -> bytes:
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        return bytes(shm.buf[:size])
+    finally:
+        shm.close()
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+# ---------------------------------------------------------------------------
+# 主进程侧
+# ---------------------------------------------------------------------------
+
+# 渲染因其他任务超时/停止重建进程池而被终止时，最多重新提交的次数
+MAX_RESUBMITS = 3
+
+# __wait_render 的返回值：本任务被其他任务重建进程池时连带终止，需要重新提交
+_RESUBMIT = object()
+
+
+class RenderBackend:
+    """
+    渲染后端，mode 为 thread（进程内）或 process（独立进程池）。
+    进程模式下同时提交的渲染不超过进程数，任务提交即开始执行，超时从此刻计算；
+    超时或停止的渲染只能通过重建整个进程池终止，同时被终止的其他渲染会重新提交
+    """
+
+    def __init__(self, mode: str = "thread", processes: int = 2, timeout: int = 600,
+                 font_paths: Tuple[str, ...] = ()):
+        self.mode = mode if mode in ["thread", "process"] else "thread"
+        self.processes = max(1, int(processes))
+        self.timeout = max(10, int(timeout))
+        self.font_paths = tuple(str(p) for p in font_paths if p)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.processes)
+        # 因超时/停止被主动终止的进程池，其上的其他任务属于连带终止
+        self._terminated: "weakref.WeakSet[ProcessPoolExecutor]" = weakref.WeakSet()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn 避免在多线程的主进程中 fork 导致死锁
+                ctx = multiprocessing.get_context("spawn")
+                initializer, initargs = worker_initializer(f"{__name__}:_worker_init", self.font_paths)
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=ctx,
+                    initializer=initializer,
+                    initargs=initargs,
+                )
+                logger.info(f"渲染进程池已启动，进程数 {self.processes}")
+            return self._executor
+
+    def _reset_executor(self, reason: str, executor: Optional[ProcessPoolExecutor], terminate: bool = False):
+        """
+        终止指定进程池的全部渲染进程，下次渲染时重建；进程池已被其他任务重建时不重复处理。
+        terminate 表示因超时/停止主动终止，池中其他任务会被重新提交
+        """
+        with self._lock:
+            if executor is None or self._executor is not executor:
+                return
+            self._executor = None
+            if terminate:
+                self._terminated.add(executor)
+        logger.warning(f"重建渲染进程池: {reason}")
+        processes = list((getattr(executor, "_processes", None) or {}).values())
+        for proc in processes:
+            try:
+                proc.terminate()
+            except Exception:
+                pass
+        try:
+            executor.shutdown(wait=False, cancel_futures=True)
+        except Exception:
+            pass
+        for proc in processes:
+            try:
+                proc.join(timeout=2)
+                if proc.is_alive():
+                    proc.kill()
+            except Exception:
+                pass
+
+    def render(self, style: str, *args, stop_event: Optional[threading.Event] = None, **kwargs) -> Any:
+        """
+        渲染封面，成功返回 RenderResult，失败返回 False
+        """
+        if style not in STYLE_FUNCTIONS:
+            logger.error(f"未知的封面风格: {style}")
+            return False
+        if self.mode != "process":
+            func = resolve_style_function(style)
+            if style.startswith("animated"):
+                kwargs["stop_event"] = stop_event
+            return RenderResult.from_output(func(*args, **kwargs)) or False
+        return self.__render_in_process(style, args, kwargs, stop_event)
+
+    def __render_in_process(self, style: str, args: tuple, kwargs: dict,
+                            stop_event: Optional[threading.Event]) -> Any:
+        # 进程间仅传递路径与基础类型
+        args = tuple(str(a) if isinstance(a, os.PathLike) else a for a in args)
+        resolution_config = kwargs.pop("resolution_config", None)
+        if resolution_config is not None:
+            kwargs["resolution_size"] = tuple(resolution_config.size)
+
+        for attempt in range(MAX_RESUBMITS + 1):
+            if not self.__acquire_slot(stop_event):
+                return False
+            try:
+                result = self.__wait_render(style, args, kwargs, stop_event)
+            finally:
+                self._slots.release()
+            if result is not _RESUBMIT:
+                break
+            logger.info(f"风格 {style} 的渲染随进程池重建被终止，重新提交 ({attempt + 1}/{MAX_RESUBMITS})")
+        else:
+            logger.error(f"风格 {style} 的渲染多次随进程池重建被终止，放弃")
+            return False
+
+        if not result:
+            return False
+        name, size = result
+        return RenderResult(_read_shared_result(name, size))
+
+    def __acquire_slot(self, stop_event: Optional[threading.Event]) -> bool:
+        """等待空闲的渲染进程，排队时间不计入渲染超时"""
+        while not self._slots.acquire(timeout=0.5):
+            if stop_event and stop_event.is_set():
+                return False
+        if stop_event and stop_event.is_set():
+            self._slots.release()
+            return False
+        return True
+
+    def __wait_render(self, style: str, args: tuple, kwargs: dict, stop_event: Optional[threading.Event]) -> Any:
+        executor = self._get_executor()
+        try:
+            future = executor.submit(_worker_render, style, args, kwargs)
+        except (BrokenProcessPool, RuntimeError) as e:
+            self._reset_executor(f"提交失败: {e}", executor)
+            executor = self._get_executor()
+            future = executor.submit(_worker_render, style, args, kwargs)
+
+        # 已持有空闲进程的槽位，任务提交后立即开始执行
+        deadline = time.monotonic() + self.timeout
+        while True:
+            if stop_event and stop_event.is_set():
+                future.cancel()
+                self._reset_executor("收到停止信号", executor, terminate=True)
+                return False
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._reset_executor(f"风格 {style} 渲染超时 ({self.timeout}s)", executor, terminate=True)
+                return False
+            try:
+                return future.result(timeout=min(0.5, remaining))
+            except FutureTimeoutError:
+                continue
+            except (BrokenProcessPool, CancelledError) as e:
+                with self._lock:
+                    collateral = executor in self._terminated
+                if collateral:
+                    return _RESUBMIT
+                self._reset_executor(f"渲染进程异常退出: {e}", executor)
+                return False
+            except Exception as e:
+                logger.error(f"渲染进程执行风格 {style} 失败: {e}")
+                return False
+
+    def shutdown(self):
+        with self._lock:
+            executor = self._executor
+            self._executor = None
+        if executor:
+            try:
+                executor.shutdown(wait=False, cancel_futures=True)
+            except Exception as e:
+                logger.warning(f"关闭渲染进程池失败: {e}")
@@ -0,0 +1,222 @@
+"""
+媒体服务器健康度跟踪
+按服务器记录请求耗时与失败率，按 AIMD 方式自适应调整并发请求数，
+连续失败达到阈值时熔断，冷却期结束后放行单个探测请求，成功即恢复。
+接口调用、图片下载与封面上传的耗时相差几个数量级，按请求类型分别统计耗时基线
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Optional, Tuple
+
+from app.log import logger
+
+
+REQUEST_KINDS = ("api", "image", "upload")
+_KIND_NAMES = {"api": "接口", "image": "图片", "upload": "上传"}
+
+
+class CircuitOpenError(Exception):
+    """服务器处于熔断状态，请求未发出"""
+
+
+class LatencyStats:
+    """单类请求耗时的指数移动平均，以及观察到的较快基线"""
+
+    def __init__(self):
+        self.avg: Optional[float] = None
+        self.base: Optional[float] = None
+
+    def update(self, latency: float, alpha: float, drift: float):
+        if self.avg is None:
+            self.avg = latency
+            self.base = latency
+            return
+        self.avg += alpha * (latency - self.avg)
+        # 基线取较快的耗时，并缓慢回升以适应服务器整体变慢
+        self.base = min(latency, self.base + drift * (self.avg - self.base))
+
+
+class ServerHealth:
+    """单台服务器的健康状态，所有字段由 ServerHealthTracker 的条件变量保护"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, max_limit: int, window: int):
+        self.max_limit = max_limit
+        # 当前并发上限，允许为小数，取整后生效
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        # 请求类型 -> 耗时统计
+        self.latency: Dict[str, LatencyStats] = {}
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.last_decrease = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.trips = 0
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1 - sum(self.outcomes) / len(self.outcomes)
+
+
+class ServerHealthTracker:
+    """
+    替代固定的单服务器信号量：
+    - 请求正常且耗时未明显高于同类请求的基线时，每个请求为并发上限加 1/上限（加性增）
+    - 请求失败或耗时超过同类请求基线的 slow_factor 倍时上限减半（乘性减），同一轮耗时内只减一次
+    - 连续失败 failure_threshold 次后熔断 cooldown 秒，期间请求直接失败
+    """
+
+    # 耗时均值的平滑系数、基线回升速度
+    LATENCY_ALPHA = 0.2
+    BASE_DRIFT = 0.01
+
+    def __init__(self, limit: int = 3, failure_threshold: int = 5, cooldown: float = 60.0,
+                 slow_factor: float = 3.0, window: int = 50):
+        self._max_limit = max(1, int(limit))
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.cooldown = max(1.0, float(cooldown))
+        self.slow_factor = max(1.5, float(slow_factor))
+        self._window = max(5, int(window))
+        self._servers: Dict[str, ServerHealth] = {}
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        """配置的单服务器并发上限"""
+        return self._max_limit
+
+    def _get(self, server: str) -> ServerHealth:
+        health = self._servers.get(server)
+        if health is None:
+            health = ServerHealth(self._max_limit, self._window)
+            self._servers[server] = health
+        return health
+
+    def current_limit(self, server: str) -> int:
+        with self._cond:
+            return max(1, int(self._get(server or "").limit))
+
+    def _refresh_state(self, health: ServerHealth, now: float):
+        if health.state == ServerHealth.OPEN and now - health.opened_at >= self.cooldown:
+            health.state = ServerHealth.HALF_OPEN
+
+    def is_open(self, server: str) -> bool:
+        """服务器是否处于熔断中（冷却期结束后转为半开，不再视为熔断）"""
+        with self._cond:
+            health = self._get(server or "")
+            self._refresh_state(health, time.monotonic())
+            return health.state == ServerHealth.OPEN
+
+    def acquire(self, server: str):
+        """
+        占用一个请求槽位，需与 release 成对调用；熔断中抛出 CircuitOpenError，半开时只放行一个探测请求
+        """
+        server = server or ""
+        with self._cond:
+            health = self._get(server)
+            while True:
+                self._refresh_state(health, time.monotonic())
+                if health.state == ServerHealth.OPEN:
+                    raise CircuitOpenError(server)
+                limit = 1 if health.state == ServerHealth.HALF_OPEN else max(1, int(health.limit))
+                if health.in_flight < limit:
+                    break
+                self._cond.wait(timeout=1.0)
+            health.in_flight += 1
+
+    def release(self, server: str):
+        with self._cond:
+            self._get(server or "").in_flight -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, server: str):
+        """在 with 语句内占用一个请求槽位"""
+        self.acquire(server)
+        try:
+            yield
+        finally:
+            self.release(server)
+
+    def record(self, server: str, success: bool, latency: float, kind: str = "api"):
+        """记录一次请求结果并调整并发上限与熔断状态，kind 为请求类型（api/image/upload）"""
+        server = server or ""
+        now = time.monotonic()
+        with self._cond:
+            health = self._get(server)
+            health.requests += 1
+            health.outcomes.append(success)
+            latency_stats = health.latency.setdefault(kind, LatencyStats())
+            slow = False
+            if success:
+                health.consecutive_failures = 0
+                latency_stats.update(latency, self.LATENCY_ALPHA, self.BASE_DRIFT)
+                slow = latency_stats.avg > latency_stats.base * self.slow_factor
+                if health.state == ServerHealth.HALF_OPEN:
+                    health.state = ServerHealth.CLOSED
+                    health.limit = 1.0
+                    logger.info(f"媒体服务器 {server} 探测请求成功，解除熔断")
+            else:
+                health.failures += 1
+                health.consecutive_failures += 1
+                if health.state == ServerHealth.HALF_OPEN \
+                        or health.consecutive_failures >= self.failure_threshold:
+                    if health.state != ServerHealth.OPEN:
+                        health.trips += 1
+                        logger.warning(f"媒体服务器 {server} 连续失败 {health.consecutive_failures} 次，"
+                                       f"熔断 {self.cooldown:.0f} 秒")
+                    health.state = ServerHealth.OPEN
+                    health.opened_at = now
+            if not success or slow:
+                # 距上次减半不足一个平均耗时的请求多半是同一批拥塞的结果，不重复减
+                interval = latency_stats.avg or 1.0
+                if now - health.last_decrease >= interval:
+                    health.limit = max(1.0, health.limit / 2)
+                    health.last_decrease = now
+            elif health.limit < health.max_limit:
+                health.limit = min(float(health.max_limit), health.limit + 1 / health.limit)
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Tuple[int, int, float, Dict[str, float], int, int]]:
+        """服务器 -> (请求数, 失败数, 近期失败率, 各类请求平均耗时, 当前并发上限, 熔断次数)"""
+        with self._cond:
+            return {
+                server: (h.requests, h.failures, h.error_rate,
+                         {kind: s.avg for kind, s in h.latency.items() if s.avg is not None},
+                         max(1, int(h.limit)), h.trips)
+                for server, h in self._servers.items()
+            }
+
+    def format_stats(self) -> str:
+        parts = []
+        for server, (requests, failures, error_rate, latency, limit, trips) in self.stats().items():
+            if not requests:
+                continue
+            latency_text = " ".join(
+                f"{_KIND_NAMES.get(kind, kind)} {latency[kind] * 1000:.0f}ms"
+                for kind in sorted(latency, key=lambda k: REQUEST_KINDS.index(k) if k in REQUEST_KINDS else 99)
+            ) or "-"
+            text = f"{server} 请求 {requests} 次 失败 {failures} 次（近期失败率 {error_rate:.0%}），" \
+                   f"平均耗时 {latency_text}，并发上限 {limit}"
+            if trips:
+                text += f"，熔断 {trips} 次"
+            parts.append(text)
+        return "；".join(parts)
+
+    def reset_stats(self):
+        """清零计数，保留熔断状态与已学到的并发上限"""
+        with self._cond:
+            for health in self._servers.values():
+                health.requests = 0
+                health.failures = 0
+                health.trips = 0
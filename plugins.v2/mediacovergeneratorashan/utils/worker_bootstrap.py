@@ -0,0 +1,58 @@
+"""
+渲染子进程引导
+spawn 出的子进程按模块路径反序列化任务函数，直接导入 app.plugins.mediacovergeneratorashan.* 时
+会先执行 MoviePilot 插件包与本插件的 __init__，把整个 MoviePilot 加载进每个渲染进程。
+进程池以标准库的 runpy.run_path 执行本文件作为 initializer（反序列化时不会导入插件），
+先登记不执行 __init__ 的插件包，之后的任务与风格模块只加载渲染实际用到的子模块。
+本模块只依赖标准库，在子进程中作为独立脚本执行
+"""
+import importlib
+import os
+import runpy
+import sys
+import types
+from typing import Any, Callable, Optional, Tuple
+
+
+PLUGIN_PACKAGE = "app.plugins.mediacovergeneratorashan"
+
+# 在子进程中执行本文件时使用的模块名，用于区分主进程中的正常导入
+_RUN_NAME = "__mediacover_worker_bootstrap__"
+
+_PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def worker_initializer(setup: Optional[str] = None, *args: Any) -> Tuple[Callable, tuple]:
+    """
+    返回进程池的 (initializer, initargs)；setup 为 "模块:函数"，在登记插件包后以 args 调用
+    """
+    init_globals = {"WORKER_SETUP": setup, "WORKER_SETUP_ARGS": args}
+    return runpy.run_path, (os.path.abspath(__file__), init_globals, _RUN_NAME)
+
+
+def _register_packages():
+    """登记 app.plugins 与本插件包，只设置 __path__ 以便导入子模块，不执行包的 __init__"""
+    package_dirs = (
+        ("app.plugins", os.path.dirname(_PLUGIN_DIR)),
+        (PLUGIN_PACKAGE, _PLUGIN_DIR),
+    )
+    for name, path in package_dirs:
+        if name in sys.modules:
+            continue
+        parent_name, _, child = name.rpartition(".")
+        module = types.ModuleType(name)
+        module.__path__ = [path]
+        module.__package__ = name
+        sys.modules[name] = module
+        setattr(importlib.import_module(parent_name), child, module)
+
+
+def _run_setup(setup: Optional[str], args: tuple):
+    _register_packages()
+    if setup:
+        module_name, func_name = setup.split(":")
+        getattr(importlib.import_module(module_name), func_name)(*args)
+
+
+if __name__ == _RUN_NAME:
+    _run_setup(globals().get("WORKER_SETUP"), globals().get("WORKER_SETUP_ARGS") or ())